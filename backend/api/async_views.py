@@ -0,0 +1,67 @@
+"""Асинхронные версии эндпоинтов чтения писем и посылок для ASGI.
+
+В Django 3.2 синхронные представления под ASGI выполняются в одном
+общем потоке, поэтому запросы обрабатываются по одному. Здесь
+представления DRF (список и отдельная запись) вызываются в ограниченном
+пуле из ``ASYNC_VIEWS_MAX_WORKERS`` потоков, и ответ там же рендерится.
+Поток занят только работой с БД и сериализацией: ожидание в очереди
+и отдача ответа медленному клиенту выполняются в цикле событий.
+У каждого потока пула своё соединение с БД (с учётом ``CONN_MAX_AGE``).
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .views import LetterViewSet, PackageViewSet
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_VIEWS_MAX_WORKERS,
+            thread_name_prefix='async-views',
+        )
+    return _executor
+
+
+def call_view(view, request, *args, **kwargs):
+    """Выполнение синхронного представления в потоке пула
+    с обслуживанием соединений, как на границах запроса."""
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        # Ответ 304 на условный запрос не требует рендеринга
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def as_async_view(viewset, actions):
+    """Асинхронное представление для действий ``actions`` ViewSet."""
+    view = viewset.as_view(actions)
+
+    async def async_view(request, *args, **kwargs):
+        # Контекст (маршрутизация чтения по репликам) передаётся в поток
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            get_executor(),
+            functools.partial(context.run, call_view, view, request,
+                              *args, **kwargs),
+        )
+
+    return async_view
+
+
+letters_list = as_async_view(LetterViewSet, {'get': 'list'})
+letters_detail = as_async_view(LetterViewSet, {'get': 'retrieve'})
+packages_list = as_async_view(PackageViewSet, {'get': 'list'})
+packages_detail = as_async_view(PackageViewSet, {'get': 'retrieve'})
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache_backend(app_configs, **kwargs):
+    """Номера поколений кэша ответов и кэшей справочников должны
+    храниться в общем кэше: иначе записи и команды сбрасывают эти кэши
+    только в своём процессе."""
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in LOCAL_CACHE_BACKENDS:
+        return []
+    caches, timeouts = 'Кэши справочников', 'REFERENCE_CACHE_TIMEOUT'
+    if getattr(settings, 'RESPONSE_CACHE', True):
+        caches += ' и кэш ответов списков'
+        timeouts += ' и RESPONSE_CACHE_TIMEOUT'
+    return [Warning(
+        f'{caches} сбрасываются через локальный кэш процесса: изменения '
+        f'из других процессов и команд становятся видны только через '
+        f'{timeouts} секунд.',
+        hint='Укажите в CACHES общий бэкенд (Memcached, Redis).',
+        id='api.W001',
+    )]
@@ -0,0 +1,72 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from packages.models import PostOffice
+
+# Поддерживаемые фильтры писем и посылок:
+# имя параметра -> (поле модели, условие).
+# Каждой комбинации соответствует составной индекс в packages/models.py.
+SHIPMENT_FILTERS = {
+    'category': ('category', 'exact'),
+    'sender': ('sender', 'exact'),
+    'recipient': ('recipient', 'exact'),
+    'departure_office': ('departure_office', 'exact'),
+    'arrival_office': ('arrival_office', 'exact'),
+    'departure_index': ('departure_office', 'postal_index'),
+    'arrival_index': ('arrival_office', 'postal_index'),
+    'weight_min': ('weight', 'gte'),
+    'weight_max': ('weight', 'lte'),
+    'cost_min': ('cost', 'gte'),
+    'cost_max': ('cost', 'lte'),
+}
+
+
+def get_model_filters(model):
+    """Фильтры, применимые к модели (вес — только для писем,
+    сумма платежа — только для посылок)."""
+    filters = {}
+    for name, (field_name, lookup) in SHIPMENT_FILTERS.items():
+        try:
+            filters[name] = (model._meta.get_field(field_name), lookup)
+        except FieldDoesNotExist:
+            continue
+    return filters
+
+
+def filter_shipments(queryset, params, strict=True):
+    """Фильтрация писем/посылок (или записей модели чтения)
+    по словарю параметров. Некорректные значения вызывают ошибку
+    валидации, неизвестные параметры — только при ``strict``."""
+    filters = get_model_filters(queryset.model)
+    if strict:
+        unknown = set(params) - set(filters)
+        if unknown:
+            raise ValidationError(
+                {'filter': f'Неизвестные параметры: '
+                           f'{", ".join(sorted(unknown))}'}
+            )
+    lookups = {}
+    for name, (field, lookup) in filters.items():
+        if name not in params:
+            continue
+        value = params[name]
+        if lookup == 'postal_index':
+            lookups[f'{field.name}__in'] = PostOffice.objects.filter(
+                postal_index=value).values('pk')
+            continue
+        try:
+            value = field.to_python(value)
+        except DjangoValidationError:
+            raise ValidationError({name: 'Некорректное значение'})
+        lookups[f'{field.name}__{lookup}'] = value
+    return queryset.filter(**lookups)
+
+
+class ShipmentFilterBackend(BaseFilterBackend):
+    """Фильтрация списков писем и посылок по параметрам запроса
+    (см. ``SHIPMENT_FILTERS``)."""
+
+    def filter_queryset(self, request, queryset, view):
+        return filter_shipments(queryset, request.query_params, strict=False)
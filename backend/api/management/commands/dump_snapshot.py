@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from packages import snapshot
+
+
+class Command(BaseCommand):
+    help = ('Выгрузка клиентов, почтовых пунктов, писем и посылок '
+            'в двоичный снимок (см. restore_snapshot)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл снимка')
+        parser.add_argument(
+            '--block-size', type=int, default=snapshot.BLOCK_SIZE,
+            help='Количество строк в блоке снимка')
+
+    def handle(self, *args, **options):
+        if options['block_size'] < 1:
+            raise CommandError('--block-size должен быть больше 0')
+        start = time.perf_counter()
+        with open(options['path'], 'wb') as file:
+            counts = snapshot.dump(file, block_size=options['block_size'])
+            size = file.tell()
+        elapsed = time.perf_counter() - start
+        for model, count in counts.items():
+            self.stdout.write(f'{model.__name__}: {count}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Снимок {options["path"]} записан: '
+                f'{size / 1024 / 1024:.1f} МБ за {elapsed:.2f} с'
+            )
+        )
@@ -1,36 +1,106 @@
 import csv
+import os
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
 
 from letters_packages.settings import BASE_DIR
-from packages.models import Client, PostOffice
+from packages.importers import (BATCH_SIZE, IMPORTERS, MAX_STORED_ERRORS,
+                                ShipmentImporter)
 
 path = str(BASE_DIR / 'static/data/')
 
-models = {
-    Client: 'clients.csv',
-    PostOffice: 'post_offices.csv',
+# Файлы, импортируемые без указания путей
+files = {
+    'clients': 'clients.csv',
+    'post_offices': 'post_offices.csv',
+    'letters': 'letters.csv',
+    'packages': 'packages.csv',
 }
 
 
 class Command(BaseCommand):
-    help = 'Импорт клиентов и почтовых пунктов из CSV-файла в базу данных'
+    help = ('Импорт клиентов, почтовых пунктов, писем и посылок '
+            'из CSV-файлов в базу данных')
+
+    def add_arguments(self, parser):
+        for name in IMPORTERS:
+            parser.add_argument(
+                f'--{name.replace("_", "-")}',
+                dest=name,
+                metavar='CSV',
+                help=f'Путь к файлу {files[name]} (если указан хотя бы '
+                     f'один файл, импортируются только указанные)')
+        parser.add_argument(
+            '--append', action='store_true',
+            help='Добавлять письма и посылки в непустые таблицы (у них '
+                 'нет естественного ключа, повторный импорт файла '
+                 'создаёт дубликаты)')
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Количество строк в одной транзакции')
+        parser.add_argument(
+            '--delimiter', default=';', help='Разделитель столбцов')
+        parser.add_argument(
+            '--max-errors', type=int, default=MAX_STORED_ERRORS,
+            help='Количество ошибочных строк, выводимых в отчёте')
 
     def handle(self, *args, **options):
-        for model, csv_file in models.items():
-            with open(path + '/' + csv_file, 'r', encoding='utf-8') as file:
-                try:
-                    rows = csv.DictReader(file, delimiter=';')
-                    records = [model(**row) for row in rows]
-                    model.objects.bulk_create(records)
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'База заполнена (модель {model.__name__})'
-                        )
-                    )
-                except Exception as error:
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f'Ошибка {error} при записи {model.__name__}'
-                        )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        paths = {name: options[name] for name in IMPORTERS if options[name]}
+        if not paths:
+            paths = {name: os.path.join(path, csv_file)
+                     for name, csv_file in files.items()
+                     if os.path.exists(os.path.join(path, csv_file))}
+        for name, csv_path in paths.items():
+            importer = IMPORTERS[name]()
+            model = importer.model.__name__
+            try:
+                if (isinstance(importer, ShipmentImporter)
+                        and not options['append']
+                        and importer.model.objects.exists()):
+                    self.stdout.write(self.style.WARNING(
+                        f'Модель {model} уже заполнена, файл {csv_path} '
+                        f'пропущен (--append — добавить записи)'))
+                    continue
+                with open(csv_path, 'r', encoding='utf-8',
+                          newline='') as file:
+                    result = importer.run(
+                        file,
+                        batch_size=options['batch_size'],
+                        delimiter=options['delimiter'],
+                        max_errors=options['max_errors'],
+                        progress=self.progress(options['verbosity']),
                     )
+            except (OSError, UnicodeDecodeError, csv.Error,
+                    DatabaseError) as error:
+                self.stdout.write(
+                    self.style.ERROR(f'Ошибка {error} при записи {model}')
+                )
+                continue
+            self.report(result)
+
+    def progress(self, verbosity):
+        if verbosity < 2:
+            return None
+
+        def write(result):
+            self.stdout.write(
+                f'  {result.model.__name__}: обработано {result.rows} строк')
+        return write
+
+    def report(self, result):
+        model = result.model.__name__
+        summary = (f'создано {result.created}, ошибок {result.error_count}, '
+                   f'{result.elapsed:.2f} с, '
+                   f'{result.rows_per_second:.0f} строк/с')
+        style = (self.style.WARNING if result.error_count
+                 else self.style.SUCCESS)
+        self.stdout.write(
+            style(f'База заполнена (модель {model}): {summary}'))
+        for error in result.errors:
+            self.stdout.write(f'  строка {error.line}: {error.message}')
+        hidden = result.error_count - len(result.errors)
+        if hidden > 0:
+            self.stdout.write(f'  ... и ещё {hidden} ошибок')
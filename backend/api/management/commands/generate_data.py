@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+
+from api import response_cache
+from letters_packages.transactions import atomic_write
+from packages import generator, snapshot
+from packages.models import Client
+
+
+class Command(BaseCommand):
+    help = ('Генерация синтетических клиентов, почтовых пунктов, писем '
+            'и посылок заданного объёма')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=10000)
+        parser.add_argument('--offices', type=int, default=1000)
+        parser.add_argument('--letters', type=int, default=100000)
+        parser.add_argument('--packages', type=int, default=100000)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора (одинаковое зерно — одинаковые данные)')
+        parser.add_argument(
+            '--skew', type=float, default=generator.SKEW,
+            help='Показатель распределения Ципфа для клиентов и пунктов '
+                 '(0 — равномерное)')
+        parser.add_argument(
+            '--batch-size', type=int, default=generator.BATCH_SIZE,
+            help='Количество строк в одной транзакции')
+        parser.add_argument(
+            '--flush', action='store_true',
+            help='Удалить текущие данные перед генерацией')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        if options['skew'] < 0:
+            raise CommandError('--skew не может быть отрицательным')
+        connection = connections[router.db_for_write(Client)]
+        if options['flush']:
+            with atomic_write(using=connection.alias):
+                snapshot.flush(connection)
+        elif not snapshot.is_empty(connection.alias):
+            raise CommandError('БД не пуста: используйте --flush')
+
+        data_generator = generator.DataGenerator(
+            seed=options['seed'],
+            skew=options['skew'],
+            batch_size=options['batch_size'],
+            progress=self.progress(options['verbosity']),
+        )
+        start = time.perf_counter()
+        try:
+            timings = data_generator.run(
+                options['clients'], options['offices'],
+                options['letters'], options['packages'])
+        except ValueError as error:
+            raise CommandError(error)
+        response_cache.invalidate_all()
+        for model, (count, elapsed) in timings.items():
+            self.stdout.write(
+                f'{model.__name__}: {count} за {elapsed:.2f} с, '
+                f'{count / elapsed if elapsed else 0:.0f} строк/с')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Данные сгенерированы за '
+                f'{time.perf_counter() - start:.2f} с '
+                f'(с перестроением поискового индекса и модели чтения)'
+            )
+        )
+
+    def progress(self, verbosity):
+        if verbosity < 2:
+            return None
+
+        def write(model, rows):
+            self.stdout.write(f'  {model.__name__}: {rows}')
+        return write
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from packages import read_model
+
+
+class Command(BaseCommand):
+    help = 'Перестроение денормализованной модели чтения писем и посылок'
+
+    def handle(self, *args, **options):
+        for model, count in read_model.rebuild().items():
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Модель чтения перестроена ({model.__name__}: {count})'
+                )
+            )
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import response_cache
+from packages import snapshot
+
+
+class Command(BaseCommand):
+    help = ('Загрузка клиентов, почтовых пунктов, писем и посылок '
+            'из двоичного снимка (см. dump_snapshot)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл снимка')
+        parser.add_argument(
+            '--flush', action='store_true',
+            help='Удалить текущие данные перед загрузкой')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as file:
+                counts = snapshot.restore(file, replace=options['flush'])
+        except (OSError, snapshot.SnapshotError) as error:
+            raise CommandError(f'Снимок не загружен: {error}')
+        response_cache.invalidate_all()
+        elapsed = time.perf_counter() - start
+        for model, count in counts.items():
+            self.stdout.write(f'{model.__name__}: {count}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Снимок {options["path"]} загружен за {elapsed:.2f} с'
+            )
+        )
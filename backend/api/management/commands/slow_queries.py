@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from letters_packages.slow_queries import read_log
+
+SORT_KEYS = {
+    'total': lambda group: group['total_ms'],
+    'count': lambda group: group['count'],
+    'max': lambda group: group['max_ms'],
+}
+
+
+class Command(BaseCommand):
+    help = ('Сводка журнала медленных запросов к БД: запросы '
+            'группируются по нормализованному тексту (fingerprint)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default=str(settings.SLOW_QUERY_LOG),
+            help='Файл журнала (по умолчанию SLOW_QUERY_LOG)')
+        parser.add_argument(
+            '--sort', choices=SORT_KEYS, default='total',
+            help='Порядок групп: суммарное время, количество '
+                 'или максимальное время')
+        parser.add_argument(
+            '--limit', type=int, default=20, help='Количество групп')
+
+    def handle(self, *args, **options):
+        groups = {}
+        for entry in read_log(options['path']):
+            group = groups.get(entry['fingerprint'])
+            if group is None:
+                group = groups[entry['fingerprint']] = {
+                    'sql': entry['sql'],
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'sources': {},
+                }
+            group['count'] += 1
+            group['total_ms'] += entry['duration_ms']
+            if entry['duration_ms'] >= group['max_ms']:
+                # План самого медленного выполнения
+                group['max_ms'] = entry['duration_ms']
+                group['plan'] = entry['plan']
+            sources = group['sources']
+            sources[entry['source']] = sources.get(entry['source'], 0) + 1
+        if not groups:
+            self.stdout.write('Медленных запросов нет')
+            return
+        ordered = sorted(groups.items(), key=lambda item: SORT_KEYS[
+            options['sort']](item[1]), reverse=True)
+        for number, (key, group) in enumerate(
+                ordered[:options['limit']], 1):
+            self.report(number, key, group)
+        hidden = len(groups) - options['limit']
+        if hidden > 0:
+            self.stdout.write(f'... и ещё {hidden} групп')
+
+    def report(self, number, key, group):
+        self.stdout.write(self.style.WARNING(
+            f'#{number} {key}: {group["count"]} раз, всего '
+            f'{group["total_ms"]:.1f} мс, среднее '
+            f'{group["total_ms"] / group["count"]:.1f} мс, максимум '
+            f'{group["max_ms"]:.1f} мс'))
+        sources = sorted(group['sources'].items(),
+                         key=lambda item: item[1], reverse=True)
+        self.stdout.write('  источники: ' + ', '.join(
+            f'{source} ({count})' for source, count in sources))
+        self.stdout.write(f'  {group["sql"]}')
+        if group['plan']:
+            self.stdout.write('  план:')
+            for line in group['plan']:
+                self.stdout.write(f'    {line}')
@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from api import response_cache
+
+
+class Command(BaseCommand):
+    help = ('Копирование основной БД в реплики для чтения '
+            '(онлайн-резервное копирование SQLite)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help='Псевдонимы реплик (по умолчанию все из DATABASE_REPLICAS)',
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.DATABASE_REPLICAS
+        if not aliases:
+            raise CommandError('Реплики не настроены (DATABASE_REPLICAS)')
+        primary = connections[DEFAULT_DB_ALIAS]
+        for alias in (DEFAULT_DB_ALIAS, *aliases):
+            if alias not in connections:
+                raise CommandError(f'Нет базы данных {alias} в DATABASES')
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(
+                    f'{alias}: копирование поддерживается только для SQLite, '
+                    f'для других СУБД используйте их репликацию')
+
+        primary.ensure_connection()
+        for alias in aliases:
+            replica = connections[alias]
+            replica.ensure_connection()
+            start = time.perf_counter()
+            # Согласованный снимок основной БД: в режиме WAL запись
+            # в основную БД во время копирования не блокируется
+            primary.connection.backup(replica.connection)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Реплика {alias} обновлена '
+                    f'за {time.perf_counter() - start:.2f} с'
+                )
+            )
+        # Кэшированные ответы могли быть построены по старым данным реплик
+        response_cache.invalidate_all()
@@ -0,0 +1,15 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ShipmentCursorPagination(CursorPagination):
+    """Keyset-пагинация писем и посылок по первичному ключу.
+
+    Позиция страницы передаётся непрозрачным токеном ``cursor``
+    и переводится в условие ``id > N``, поэтому стоимость любой страницы
+    одинакова и не требует подсчёта всех записей (COUNT(*)).
+    Размер страницы задаётся в настройках (``PAGE_SIZE``)
+    и может быть изменён параметром ``page_size`` в пределах ``max_page_size``.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
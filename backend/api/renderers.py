@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+# Количество строк, накапливаемых перед отправкой очередного куска ответа
+STREAM_BATCH_SIZE = 500
+
+
+class StreamingRenderer(BaseRenderer):
+    """Базовый рендерер построчной выгрузки.
+
+    ``render_stream`` принимает итератор словарей и отдаёт байтовые куски,
+    что позволяет использовать его в ``StreamingHttpResponse``
+    без накопления всего ответа в памяти.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = [data]
+        fields = list(data[0]) if data else []
+        return b''.join(self.render_stream(data, fields))
+
+    def render_stream(self, rows, fields):
+        buffer = io.StringIO()
+        write_row = self.get_writer(buffer, fields)
+        for number, row in enumerate(rows, start=1):
+            write_row(row)
+            if number % STREAM_BATCH_SIZE == 0:
+                yield buffer.getvalue().encode(self.charset)
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode(self.charset)
+
+    def get_writer(self, buffer, fields):
+        """Возвращает функцию записи одной строки в буфер."""
+        raise NotImplementedError
+
+
+class NDJSONRenderer(StreamingRenderer):
+    """Выгрузка в формате NDJSON (один JSON-объект на строку)."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def get_writer(self, buffer, fields):
+        def write_row(row):
+            buffer.write(json.dumps(row, ensure_ascii=False))
+            buffer.write('\n')
+        return write_row
+
+
+class CSVRenderer(StreamingRenderer):
+    """Выгрузка в формате CSV с заголовком из имён полей."""
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def get_writer(self, buffer, fields):
+        writer = csv.DictWriter(buffer, fieldnames=fields, delimiter=';')
+        writer.writeheader()
+        return writer.writerow
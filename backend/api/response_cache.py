@@ -0,0 +1,201 @@
+"""Кэш ответов списков писем и посылок.
+
+Ключ ответа — URL запроса, источник данных (модель чтения, реплики)
+и номера поколений моделей, от которых зависит список (отправления,
+клиенты, почтовые пункты); кэшируются только ответы в формате JSON.
+Любое изменение записей модели увеличивает номер её поколения
+(сигналы, см. api/signals.py): старые ключи больше не запрашиваются
+и вытесняются по LRU, поэтому сброс выполняется за O(1).
+Номера поколений хранятся в кэше Django (при общем кэше сброс действует
+во всех процессах), тела ответов — в памяти процесса с ограничением
+суммарного размера и временем жизни ``RESPONSE_CACHE_TIMEOUT``.
+С локальным кэшем Django (``LocMemCache``) каждый процесс видит только
+свои изменения и сбросы команд, выполненных в нём же: ответы других
+процессов устаревают не дольше чем на ``RESPONSE_CACHE_TIMEOUT`` секунд.
+Для нескольких процессов нужен общий бэкенд кэша (проверка api.W001).
+Ответ из кэша воспроизводит заголовки исходного ответа (Vary, Allow).
+"""
+import random
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from letters_packages import routers
+from packages import read_model
+from packages.cache import LRUCache
+from packages.models import Client, Letter, Package, PostOffice
+
+# Суммарный размер тел ответов в кэше процесса, байт
+RESPONSE_CACHE_MAX_BYTES = getattr(settings, 'RESPONSE_CACHE_MAX_BYTES',
+                                   64 * 1024 * 1024)
+# Ответы больше этого размера не кэшируются, байт
+RESPONSE_CACHE_MAX_ITEM_BYTES = getattr(settings,
+                                        'RESPONSE_CACHE_MAX_ITEM_BYTES',
+                                        1024 * 1024)
+# Время жизни ответа в кэше процесса, секунд
+RESPONSE_CACHE_TIMEOUT = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60)
+
+# Заголовки ответа 304, воспроизводимые из кэша (как в
+# ``django.middleware.http.ConditionalGetMiddleware``)
+NOT_MODIFIED_HEADERS = ('Cache-Control', 'Content-Location', 'ETag',
+                        'Expires', 'Last-Modified', 'Vary')
+
+# Модели, от данных которых зависит список
+DEPENDENCIES = {
+    Letter: (Letter, Client, PostOffice),
+    Package: (Package, Client, PostOffice),
+}
+
+GENERATION_KEY = 'response_cache_generation:{}'
+
+# headers — остальные заголовки ответа, expires — момент устаревания
+# по ``time.monotonic()`` (None — без ограничения)
+CachedResponse = namedtuple('CachedResponse',
+                            'content content_type etag headers expires',
+                            defaults=((), None))
+
+
+class ResponseCache(LRUCache):
+    """LRU-кэш ответов с ограничением суммарного размера тел в байтах."""
+
+    def __init__(self, max_bytes, max_item_bytes):
+        super().__init__(max_size=None)
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.size = 0
+
+    def get(self, key, default=None):
+        """Ответ по ключу; устаревший ответ удаляется и считается
+        промахом."""
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None and (value.expires is None
+                                      or value.expires > time.monotonic()):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            if value is not None:
+                del self._data[key]
+                self.size -= len(value.content)
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        size = len(value.content)
+        if size > self.max_item_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous.content)
+            self._data[key] = value
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted.content)
+
+    def delete(self, key):
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous.content)
+
+    def clear(self):
+        super().clear()
+        self.size = 0
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES,
+                               RESPONSE_CACHE_MAX_ITEM_BYTES)
+
+
+def is_enabled():
+    return getattr(settings, 'RESPONSE_CACHE', True)
+
+
+def generation_key(model):
+    return GENERATION_KEY.format(model._meta.label_lower)
+
+
+def get_generations(models):
+    """Текущие номера поколений ``models`` (один запрос к кэшу Django).
+    Отсутствующий номер создаётся случайным, чтобы после вытеснения
+    из кэша Django не совпасть с одним из прежних."""
+    keys = [generation_key(model) for model in models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, random.getrandbits(48), None)
+            generations[key] = cache.get(key)
+    return tuple(generations[key] for key in keys)
+
+
+def bump_generation(model):
+    key = generation_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, random.getrandbits(48), None)
+
+
+def invalidate(model):
+    """Новое поколение ``model`` сейчас и после фиксации транзакции:
+    иначе параллельный запрос мог бы закэшировать ещё
+    не зафиксированные старые данные под новым поколением."""
+    bump_generation(model)
+    transaction.on_commit(lambda: bump_generation(model))
+
+
+def invalidate_all():
+    """Новое поколение всех моделей (например, после обновления реплик,
+    из которых читаются списки)."""
+    for model in {model for models in DEPENDENCIES.values()
+                  for model in models}:
+        bump_generation(model)
+
+
+def get_key(request, model):
+    """Ключ ответа со списком ``model`` или None, если ответ
+    не кэшируется (кэш выключен, формат не JSON)."""
+    if not is_enabled() or request.accepted_renderer.format != 'json':
+        return None
+    return (request.build_absolute_uri(), read_model.is_enabled(),
+            routers.reads_from_replicas(),
+            get_generations(DEPENDENCIES[model]))
+
+
+def get_response(request, key):
+    """Готовый ответ из кэша (или 304 по If-None-Match) либо None."""
+    cached = response_cache.get(key)
+    if cached is None:
+        return None
+    response = get_conditional_response(request, etag=cached.etag)
+    if response is None:
+        response = HttpResponse(cached.content,
+                                content_type=cached.content_type)
+        headers = cached.headers
+    else:
+        headers = [(name, value) for name, value in cached.headers
+                   if name in NOT_MODIFIED_HEADERS]
+    for name, value in headers:
+        response[name] = value
+    response['ETag'] = cached.etag
+    return response
+
+
+def store(key, response):
+    """Сохранение отрендеренного успешного ответа."""
+    if response.status_code != 200:
+        return
+    response.render()
+    headers = tuple((name, value) for name, value in response.items()
+                    if name not in ('Content-Type', 'Content-Length',
+                                    'ETag'))
+    response_cache.set(key, CachedResponse(
+        response.content, response['Content-Type'], response['ETag'],
+        headers, time.monotonic() + RESPONSE_CACHE_TIMEOUT))
@@ -1,10 +1,101 @@
 from rest_framework import serializers
 
-from packages.models import Letter, Package
+from packages.cache import (attach_related, clients_cache, get_references,
+                            post_offices_cache)
+from packages.models import (OFFICES_ERROR, SENDER_RECIPIENT_ERROR, Letter,
+                             Package)
+
+# Пары полей, которые должны различаться (CheckConstraint моделей)
+DIFFERENT_FIELDS = (
+    ('sender', 'recipient', SENDER_RECIPIENT_ERROR),
+    ('departure_office', 'arrival_office', OFFICES_ERROR),
+)
+
+
+def load_related_objects(model, items):
+    """Загрузка всех объектов, на которые ссылаются записи ``items``,
+    для проверки ссылок при записи: одним запросом к БД на все таблицы
+    (см. ``get_references`` с ``verify=True``), а не из кэша
+    справочников — иначе удалённый в другом процессе объект пройдёт
+    проверку, и INSERT завершится ошибкой целостности вместо ответа 400.
+
+    Возвращает словарь вида ``{Модель: {pk: объект}}`` для передачи
+    в контекст сериализатора под ключом ``related_objects``.
+    """
+    ids = {}
+    for field in model._meta.concrete_fields:
+        if not field.is_relation:
+            continue
+        related_ids = ids.setdefault(field.related_model, set())
+        for item in items:
+            try:
+                related_ids.add(int(item[field.name]))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return get_references(ids, verify=True)
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Поле связи по первичному ключу, которое берёт объекты
+    из заранее загруженного словаря ``context['related_objects']``
+    (см. ``load_related_objects``) вместо отдельного запроса к БД.
+    Без словаря в контексте работает как обычное поле."""
+
+    def to_internal_value(self, data):
+        related_objects = self.context.get('related_objects', {}).get(
+            self.get_queryset().model
+        )
+        if related_objects is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return related_objects[int(data)]
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+class ShipmentListSerializer(serializers.ListSerializer):
+    """Сериализатор списка писем/посылок: перед выводом подставляет
+    связанные объекты из кэша справочников для всех записей сразу."""
+
+    def to_representation(self, data):
+        instances = list(data.all() if hasattr(data, 'all') else data)
+        attach_related(instances)
+        return super().to_representation(instances)
 
 
 class LetterSerializer(serializers.ModelSerializer):
     """Сериализатор для писем CRUD"""
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+    # Столбцы быстрого вывода списков (см. represent_rows);
+    # версия и время изменения в конце — только для ETag
+    values_fields = ('id',
+                     'sender_id',
+                     'recipient_id',
+                     'departure_office_id',
+                     'arrival_office_id',
+                     'category',
+                     'weight',
+                     'version',
+                     'updated_at',)
+    category_labels = dict(Letter.LetterType.choices)
+    # Столбцы модели чтения в порядке полей Meta.fields
+    # (и так же версия и время изменения в конце)
+    listing_fields = ('id',
+                      'sender_name',
+                      'recipient_name',
+                      'departure_address',
+                      'arrival_address',
+                      'departure_index',
+                      'arrival_index',
+                      'category_label',
+                      'weight',
+                      'version',
+                      'updated_at',)
+
     departure_index = serializers.CharField(
         source='departure_office.postal_index',
         read_only=True,
@@ -25,9 +116,12 @@ class LetterSerializer(serializers.ModelSerializer):
                   'arrival_index',
                   'category',
                   'weight',)
+        list_serializer_class = ShipmentListSerializer
 
     def to_representation(self, instance):
-        """Отображение текстовых данных из связанных моделей."""
+        """Отображение текстовых данных из связанных моделей
+        (связанные объекты берутся из кэша справочников)."""
+        attach_related([instance])
         ret = super().to_representation(instance)
         ret['sender'] = instance.sender.full_name
         ret['recipient'] = instance.recipient.full_name
@@ -36,19 +130,36 @@ class LetterSerializer(serializers.ModelSerializer):
         ret['category'] = instance.get_category_display()
         return ret
 
+    def to_internal_value(self, data):
+        """Загрузка клиентов и пунктов из тела запроса и текущих связей
+        изменяемой записи (для проверки пар и ответа) до проверки полей:
+        не более одного запроса вместо запроса на каждое поле."""
+        if 'related_objects' not in self.context and isinstance(data, dict):
+            items = [data]
+            if self.instance is not None:
+                items.append({
+                    field.name: getattr(self.instance, field.attname)
+                    for field in self.Meta.model._meta.concrete_fields
+                    if field.is_relation
+                })
+            self.context['related_objects'] = load_related_objects(
+                self.Meta.model, items)
+        return super().to_internal_value(data)
+
     def validate(self, data):
         """Валидация условия разных данных в парах:
         Отправитель/Получатель и пункт отправки/пункт получения.
         Предусмотрено использование метода PATCH.
         """
         instance = getattr(self, 'instance', None)
+        if instance:
+            attach_related([instance])
 
         sender = data.get('sender', instance.sender if instance else None)
         recipient = data.get('recipient',
                              instance.recipient if instance else None)
         if sender == recipient:
-            raise serializers.ValidationError(
-                'Отправитель и получатель должны быть разные')
+            raise serializers.ValidationError(SENDER_RECIPIENT_ERROR)
 
         departure_office = data.get(
             'departure_office',
@@ -59,10 +170,62 @@ class LetterSerializer(serializers.ModelSerializer):
             instance.arrival_office if instance else None
         )
         if departure_office == arrival_office:
-            raise serializers.ValidationError(
-                'Пункты отправления и получения должны быть разные')
+            raise serializers.ValidationError(OFFICES_ERROR)
         return data
 
+    @classmethod
+    def represent_rows(cls, rows):
+        """Быстрый вывод списка без создания экземпляров моделей.
+        ``rows`` — кортежи ``values_list(*values_fields)``,
+        результат совпадает с ``to_representation`` для каждой записи."""
+        rows = list(rows)
+        clients = clients_cache.get_many(
+            {pk for row in rows for pk in (row[1], row[2])})
+        offices = post_offices_cache.get_many(
+            {pk for row in rows for pk in (row[3], row[4])})
+        return [cls.represent_row(row, clients, offices) for row in rows]
+
+    @classmethod
+    def represent_listings(cls, rows):
+        """Вывод списка из модели чтения: ``rows`` — кортежи
+        ``values_list(*listing_fields)``."""
+        return [dict(zip(cls.Meta.fields, row)) for row in rows]
+
+    @classmethod
+    def represent_row(cls, row, clients, offices):
+        pk, sender, recipient, departure, arrival, category, weight, *_ = row
+        departure = offices[departure]
+        arrival = offices[arrival]
+        return {
+            'id': pk,
+            'sender': clients[sender].full_name,
+            'recipient': clients[recipient].full_name,
+            'departure_office': departure.address,
+            'arrival_office': arrival.address,
+            'departure_index': departure.postal_index,
+            'arrival_index': arrival.postal_index,
+            'category': cls.category_labels.get(category, category),
+            'weight': weight,
+        }
+
+    def validate_bulk_update(self, queryset, attrs):
+        """Проверка, что массовое изменение ``queryset`` значениями ``attrs``
+        не нарушит условия разных данных в парах полей.
+        Если изменяется только одно поле пары, ищутся записи,
+        у которых второе поле совпадает с новым значением."""
+        for first, second, message in DIFFERENT_FIELDS:
+            if first in attrs and second in attrs:
+                conflict = attrs[first] == attrs[second]
+            elif first in attrs:
+                conflict = queryset.filter(**{second: attrs[first]}).exists()
+            elif second in attrs:
+                conflict = queryset.filter(**{first: attrs[second]}).exists()
+            else:
+                continue
+            if conflict:
+                raise serializers.ValidationError(message)
+        return attrs
+
 
 class PackageSerializer(LetterSerializer):
     """Сериализатор для посылок CRUD.
@@ -71,6 +234,28 @@ class PackageSerializer(LetterSerializer):
         source='recipient.phone_number',
         read_only=True,
     )
+    values_fields = ('id',
+                     'sender_id',
+                     'recipient_id',
+                     'departure_office_id',
+                     'arrival_office_id',
+                     'category',
+                     'cost',
+                     'version',
+                     'updated_at',)
+    category_labels = dict(Package.PackageType.choices)
+    listing_fields = ('id',
+                      'sender_name',
+                      'recipient_name',
+                      'departure_address',
+                      'arrival_address',
+                      'departure_index',
+                      'arrival_index',
+                      'recipient_phone',
+                      'category_label',
+                      'cost',
+                      'version',
+                      'updated_at',)
 
     class Meta:
         model = Package
@@ -84,3 +269,23 @@ class PackageSerializer(LetterSerializer):
                   'phone_number',
                   'category',
                   'cost',)
+        list_serializer_class = ShipmentListSerializer
+
+    @classmethod
+    def represent_row(cls, row, clients, offices):
+        pk, sender, recipient, departure, arrival, category, cost, *_ = row
+        departure = offices[departure]
+        arrival = offices[arrival]
+        recipient = clients[recipient]
+        return {
+            'id': pk,
+            'sender': clients[sender].full_name,
+            'recipient': recipient.full_name,
+            'departure_office': departure.address,
+            'arrival_office': arrival.address,
+            'departure_index': departure.postal_index,
+            'arrival_index': arrival.postal_index,
+            'phone_number': recipient.phone_number,
+            'category': cls.category_labels.get(category, category),
+            'cost': cost,
+        }
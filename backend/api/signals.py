@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from packages.models import Client, Letter, Package, PostOffice
+from packages.signals import references_changed, shipments_changed
+from . import response_cache
+
+
+@receiver(post_save, sender=Letter)
+@receiver(post_save, sender=Package)
+@receiver((post_save, post_delete), sender=Client)
+@receiver((post_save, post_delete), sender=PostOffice)
+@receiver(shipments_changed)
+@receiver(references_changed)
+def invalidate_response_cache(sender, **kwargs):
+    """Удаление писем и посылок — через ``shipments_changed``,
+    каскадное удаление — через поколение клиентов и пунктов, от которых
+    зависят списки (см. ``response_cache.DEPENDENCIES``)."""
+    response_cache.invalidate(sender)
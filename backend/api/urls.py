@@ -1,7 +1,9 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import LetterViewSet, PackageViewSet
+from . import async_views
+from .views import (LetterViewSet, MetricsView, PackageViewSet,
+                    PhoneShipmentsView, SearchView, StatsView)
 
 app_name = 'api'
 
@@ -11,5 +13,17 @@ router.register(r'packages', PackageViewSet, basename='packages')
 
 
 urlpatterns = [
+    path('async/letters/', async_views.letters_list,
+         name='async-letters-list'),
+    path('async/letters/<int:pk>/', async_views.letters_detail,
+         name='async-letters-detail'),
+    path('async/packages/', async_views.packages_list,
+         name='async-packages-list'),
+    path('async/packages/<int:pk>/', async_views.packages_detail,
+         name='async-packages-detail'),
+    path('phone/<str:phone>/', PhoneShipmentsView.as_view(), name='phone'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('stats/', StatsView.as_view(), name='stats'),
+    path('_metrics', MetricsView.as_view(), name='metrics'),
     path('', include(router.urls)),
 ]
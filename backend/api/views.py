@@ -1,16 +1,491 @@
-from rest_framework import viewsets
+import hashlib
 
-from packages.models import Letter, Package
-from .serializers import LetterSerializer, PackageSerializer
+from django.db import IntegrityError
+from django.db.models import F, Q, Value
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+from django.views import View
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from letters_packages import metrics
+from letters_packages.transactions import atomic_write
+from packages import read_model, search, stats
+from packages.cache import attach_related, clients_cache, post_offices_cache
+from packages.models import (Client, Letter, Package, PostOffice,
+                             VersionConflict, normalize_phone)
+from packages.signals import shipments_changed
+from . import response_cache
+from .filters import ShipmentFilterBackend, filter_shipments
+from .renderers import CSVRenderer, NDJSONRenderer
+from .serializers import (LetterSerializer, PackageSerializer,
+                          load_related_objects)
 
-class LetterViewSet(viewsets.ModelViewSet):
+# Размер порции строк, читаемых из БД при выгрузке
+EXPORT_CHUNK_SIZE = 2000
+
+# Максимальное количество записей (или id) в одном массовом запросе
+BULK_MAX_SIZE = 10000
+
+# Количество результатов поиска по умолчанию и максимальное
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = ('Запись изменена: ETag из заголовка If-Match '
+                      'не совпадает с текущим')
+    default_code = 'precondition_failed'
+
+
+class Conflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Запись одновременно изменена другим запросом'
+    default_code = 'conflict'
+
+
+def timestamp_us(updated_at):
+    return int(updated_at.timestamp() * 1000000)
+
+
+def shipment_etag(version, updated_at):
+    """Строгий ETag записи: версия меняется при каждом изменении записи
+    (см. VersionedModel), а время изменения учитывает и выводимых в ней
+    клиентов и пункты (см. ``shipment_updated_at``)."""
+    return f'"{version}-{timestamp_us(updated_at):x}"'
+
+
+def shipment_updated_at(instance):
+    """Время изменения записи или её клиентов и пунктов
+    (см. ReferenceModel), что новее; связи берутся из кэша справочников.
+    Модель чтения хранит то же значение в ``updated_at``."""
+    attach_related([instance])
+    return max(instance.updated_at, instance.sender.updated_at,
+               instance.recipient.updated_at,
+               instance.departure_office.updated_at,
+               instance.arrival_office.updated_at)
+
+
+def rows_updated_at(rows):
+    """Строки ``values_list(*values_fields)`` со временем изменения
+    по ``shipment_updated_at``."""
+    clients = clients_cache.get_many(
+        {pk for row in rows for pk in (row.sender_id, row.recipient_id)})
+    offices = post_offices_cache.get_many(
+        {pk for row in rows
+         for pk in (row.departure_office_id, row.arrival_office_id)})
+    return [row._replace(updated_at=max(
+        row.updated_at, clients[row.sender_id].updated_at,
+        clients[row.recipient_id].updated_at,
+        offices[row.departure_office_id].updated_at,
+        offices[row.arrival_office_id].updated_at,
+    )) for row in rows]
+
+
+def rows_etag(rows, *links):
+    """Строгий ETag страницы списка по ключам и версиям её строк
+    и ссылкам на соседние страницы — без сериализации строк."""
+    digest = hashlib.sha1(repr(links).encode())
+    for row in rows:
+        digest.update(
+            f'{row.id}:{row.version}:{timestamp_us(row.updated_at)};'.encode()
+        )
+    return f'"{digest.hexdigest()}"'
+
+
+def get_changed_pks(queryset):
+    """Ключи записей массового изменения для синхронизации модели
+    чтения; без неё ключи не нужны и не выбираются (None)."""
+    if not read_model.is_enabled():
+        return None
+    return list(queryset.values_list('pk', flat=True))
+
+
+class ShipmentViewSet(viewsets.ModelViewSet):
+    """Базовый ViewSet для писем и посылок.
+    Клиенты и почтовые пункты берутся из кэша справочников,
+    поэтому выборки не соединяются со справочными таблицами.
+    При включённой модели чтения (``SHIPMENT_READ_MODEL``) списки
+    и отдельные записи читаются из денормализованных таблиц."""
+    filter_backends = (ShipmentFilterBackend,)
+
+    def get_values_queryset(self):
+        """Выборка кортежей для быстрого вывода списков."""
+        serializer_class = self.get_serializer_class()
+        if read_model.is_enabled():
+            model = serializer_class.Meta.model
+            queryset = read_model.READ_MODELS[model].objects.all()
+            fields = serializer_class.listing_fields
+        else:
+            queryset = self.get_queryset()
+            fields = serializer_class.values_fields
+        return self.filter_queryset(queryset).values_list(*fields,
+                                                          named=True)
+
+    def represent_rows(self, rows):
+        serializer_class = self.get_serializer_class()
+        if read_model.is_enabled():
+            return serializer_class.represent_listings(rows)
+        return serializer_class.represent_rows(rows)
+
+    def conditional_response(self, etag, updated_at=None):
+        """Заголовки ETag/Last-Modified ответа. Если условие запроса
+        (If-None-Match, If-Modified-Since, If-Match) требует, возвращает
+        ответ 304/412, и данные можно не сериализовать."""
+        self.headers['ETag'] = etag
+        last_modified = None
+        if updated_at is not None:
+            last_modified = int(updated_at.timestamp())
+            self.headers['Last-Modified'] = http_date(last_modified)
+        return get_conditional_response(self.request, etag=etag,
+                                        last_modified=last_modified)
+
+    def list(self, request, *args, **kwargs):
+        """Список записей через быстрый путь ``values_list``:
+        без создания экземпляров моделей и полей сериализатора.
+        Готовые ответы берутся из кэша ответов без обращения к БД."""
+        cache_key = response_cache.get_key(
+            request, self.get_serializer_class().Meta.model)
+        if cache_key is not None:
+            cached = response_cache.get_response(request, cache_key)
+            if cached is not None:
+                return cached
+            self.response_cache_key = cache_key
+        queryset = self.get_values_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            rows, links = list(queryset), ()
+        else:
+            rows, links = page, (self.paginator.get_next_link(),
+                                 self.paginator.get_previous_link())
+        if not read_model.is_enabled():
+            rows = rows_updated_at(rows)
+        not_modified = self.conditional_response(rows_etag(rows, *links))
+        if not_modified is not None:
+            return not_modified
+        if page is None:
+            return Response(self.represent_rows(rows))
+        return self.get_paginated_response(self.represent_rows(rows))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response,
+                                             *args, **kwargs)
+        cache_key = getattr(self, 'response_cache_key', None)
+        if cache_key is not None:
+            response_cache.store(cache_key, response)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        if read_model.is_enabled():
+            instance = get_object_or_404(self.get_values_queryset(),
+                                         pk=self.kwargs[self.lookup_field])
+            updated_at = instance.updated_at
+        else:
+            instance = self.get_object()
+            updated_at = shipment_updated_at(instance)
+        not_modified = self.conditional_response(
+            shipment_etag(instance.version, updated_at), updated_at)
+        if not_modified is not None:
+            return not_modified
+        if read_model.is_enabled():
+            return Response(self.represent_rows([instance])[0])
+        return Response(self.get_serializer(instance).data)
+
+    def perform_create(self, serializer):
+        instance = serializer.save()
+        self.headers['ETag'] = shipment_etag(instance.version,
+                                             shipment_updated_at(instance))
+
+    def perform_update(self, serializer):
+        """Изменение записи. С заголовком If-Match запись изменяется,
+        только если её текущий ETag совпадает с переданным, иначе — 412.
+        Проверка версии повторяется в UPDATE (см. VersionedModel),
+        поэтому параллельное изменение между чтением и записью
+        тоже не будет перезаписано."""
+        instance = serializer.instance
+        if_match = self.request.headers.get('If-Match')
+        if if_match is not None:
+            etags = parse_etags(if_match)
+            etag = shipment_etag(instance.version,
+                                 shipment_updated_at(instance))
+            if '*' not in etags and etag not in etags:
+                raise PreconditionFailed()
+        try:
+            instance = serializer.save()
+        except VersionConflict:
+            raise PreconditionFailed() if if_match is not None else Conflict()
+        self.headers['ETag'] = shipment_etag(instance.version,
+                                             shipment_updated_at(instance))
+
+    @action(detail=False, renderer_classes=(NDJSONRenderer, CSVRenderer))
+    def export(self, request):
+        """Потоковая выгрузка всех записей в NDJSON или CSV
+        (выбор формата: заголовок Accept или параметр ?format=csv)."""
+        renderer = request.accepted_renderer
+        queryset = self.get_values_queryset().order_by('id')
+        rows = (row
+                for chunk in self.iterate_chunks(queryset)
+                for row in self.represent_rows(chunk))
+        response = StreamingHttpResponse(
+            renderer.render_stream(rows,
+                                   self.get_serializer_class().Meta.fields),
+            content_type=f'{renderer.media_type}; '
+                         f'charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.basename}.{renderer.format}"'
+        )
+        return response
+
+    @staticmethod
+    def iterate_chunks(queryset):
+        """Чтение выборки порциями через серверный итератор."""
+        chunk = []
+        for row in queryset.iterator(EXPORT_CHUNK_SIZE):
+            chunk.append(row)
+            if len(chunk) == EXPORT_CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        yield chunk
+
+    @action(detail=False, methods=('post',))
+    def bulk(self, request):
+        """Массовое создание записей из JSON-массива.
+
+        Связанные клиенты и почтовые пункты загружаются одним запросом
+        на таблицу, корректные записи сохраняются одной транзакцией,
+        для некорректных возвращаются ошибки с индексом в исходном массиве.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'detail': 'Ожидается список объектов'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > BULK_MAX_SIZE:
+            return Response(
+                {'detail': f'Не более {BULK_MAX_SIZE} объектов за запрос'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer_class = self.get_serializer_class()
+        model = serializer_class.Meta.model
+        context = self.get_serializer_context()
+        context['related_objects'] = load_related_objects(model, items)
+
+        instances, errors = [], []
+        for index, item in enumerate(items):
+            serializer = serializer_class(data=item, context=context)
+            if serializer.is_valid():
+                instances.append(model(**serializer.validated_data))
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+        with atomic_write():
+            last_pk = read_model.get_last_pk(model)
+            model.objects.bulk_create(instances)
+            shipments_changed.send(
+                sender=model, pks=read_model.pks_created_after(model, last_pk))
+
+        return Response(
+            {'created': len(instances), 'errors': errors},
+            status=(status.HTTP_201_CREATED if instances or not errors
+                    else status.HTTP_400_BAD_REQUEST),
+        )
+
+    def get_bulk_queryset(self):
+        """Выборка записей для массового изменения/удаления
+        по списку ``ids`` и/или словарю ``filter`` из тела запроса."""
+        if not isinstance(self.request.data, dict):
+            raise ValidationError({'detail': 'Ожидается объект'})
+        ids = self.request.data.get('ids')
+        filters = self.request.data.get('filter')
+        if not ids and not filters:
+            raise ValidationError(
+                {'detail': 'Укажите список ids или условия filter'})
+
+        queryset = self.get_queryset().model.objects.all()
+        if ids:
+            if (not isinstance(ids, list) or len(ids) > BULK_MAX_SIZE
+                    or not all(type(pk) is int for pk in ids)):
+                raise ValidationError(
+                    {'ids': f'Ожидается список не более чем из '
+                            f'{BULK_MAX_SIZE} целых чисел'})
+            queryset = queryset.filter(pk__in=ids)
+        if filters:
+            if not isinstance(filters, dict):
+                raise ValidationError({'filter': 'Ожидается объект'})
+            queryset = filter_shipments(queryset, filters)
+        return queryset
+
+    @bulk.mapping.patch
+    def bulk_update(self, request):
+        """Массовое изменение записей одним запросом UPDATE.
+        Тело запроса: ``ids`` и/или ``filter`` и новые значения ``data``."""
+        queryset = self.get_bulk_queryset()
+        data = request.data.get('data')
+        if not isinstance(data, dict) or not data:
+            raise ValidationError({'data': 'Укажите изменяемые поля'})
+
+        serializer = self.get_serializer(data=data, partial=True)
+        attrs = serializer.to_internal_value(data)
+        if not attrs:
+            raise ValidationError({'data': 'Укажите изменяемые поля'})
+        try:
+            with atomic_write():
+                serializer.validate_bulk_update(queryset, attrs)
+                pks = get_changed_pks(queryset)
+                updated = queryset.update(**attrs)
+                shipments_changed.send(sender=queryset.model, pks=pks)
+        except IntegrityError as error:
+            raise ValidationError({'detail': str(error)})
+        return Response({'updated': updated})
+
+    @bulk.mapping.delete
+    def bulk_destroy(self, request):
+        """Массовое удаление записей одним запросом DELETE.
+        Тело запроса: ``ids`` и/или ``filter``."""
+        queryset = self.get_bulk_queryset()
+        with atomic_write():
+            deleted, _ = queryset.delete()
+        return Response({'deleted': deleted})
+
+
+class LetterViewSet(ShipmentViewSet):
     """ViewSet для обработки всех типов запросов с письмами"""
     queryset = Letter.objects.all()
     serializer_class = LetterSerializer
 
 
-class PackageViewSet(viewsets.ModelViewSet):
+class PackageViewSet(ShipmentViewSet):
     """ViewSet для обработки всех типов запросов с посылками"""
     queryset = Package.objects.all()
     serializer_class = PackageSerializer
+
+
+class PhoneShipmentsView(APIView):
+    """Письма и посылки, отправленные клиентом с номером телефона
+    ``phone`` или полученные им. Номер нормализуется (``8XXXXXXXXXX``,
+    ``+7 (XXX) XXX-XX-XX`` и т.п.), обе выборки объединяются
+    в один запрос ``UNION ALL`` по индексам отправителя и получателя."""
+    shipment_types = (
+        ('letters', Letter, 'weight', LetterSerializer),
+        ('packages', Package, 'cost', PackageSerializer),
+    )
+
+    @classmethod
+    def get_queryset(cls, phone_key):
+        """Кортежи ``values_fields`` всех отправлений по ключу номера
+        с номером типа отправления последним столбцом."""
+        clients = Client.objects.filter(phone_key=phone_key).values('pk')
+        querysets = [
+            model.objects
+            .filter(Q(sender__in=clients) | Q(recipient__in=clients))
+            .annotate(amount=F(amount), kind=Value(kind))
+            .values_list('id', 'sender_id', 'recipient_id',
+                         'departure_office_id', 'arrival_office_id',
+                         'category', 'amount', 'kind')
+            for kind, (_, model, amount, _) in enumerate(cls.shipment_types)
+        ]
+        return querysets[0].union(*querysets[1:], all=True).order_by('kind',
+                                                                     'id')
+
+    def get(self, request, phone):
+        phone_key = normalize_phone(phone)
+        if phone_key is None:
+            raise ValidationError(
+                {'phone': 'Введите номер телефона в формате +7XXXXXXXXXX'})
+
+        rows = self.get_queryset(phone_key)
+        rows_by_kind = [[] for _ in self.shipment_types]
+        for *row, kind in rows:
+            rows_by_kind[kind].append(row)
+
+        results = {'phone': phone_key}
+        for (name, _, _, serializer), rows in zip(self.shipment_types,
+                                                  rows_by_kind):
+            results[name] = serializer.represent_rows(rows)
+        return Response(results)
+
+
+class StatsView(APIView):
+    """Сводная статистика по письмам, посылкам и почтовым пунктам
+    (кэшируется до изменения данных)."""
+
+    def get(self, request):
+        return Response(stats.get_stats())
+
+
+class SearchView(APIView):
+    """Полнотекстовый поиск почтовых пунктов по адресу и клиентов по ФИО.
+    Параметры: ``q`` — строка поиска, ``type`` — ``post_offices``
+    или ``clients`` (по умолчанию оба), ``limit`` — число результатов."""
+    search_types = {
+        'post_offices': (PostOffice, post_offices_cache,
+                         lambda office: {'id': office.pk,
+                                         'address': office.address,
+                                         'postal_index': office.postal_index}),
+        'clients': (Client, clients_cache,
+                    lambda client: {'id': client.pk,
+                                    'full_name': client.full_name,
+                                    'phone_number': client.phone_number}),
+    }
+
+    def get(self, request):
+        text = request.query_params.get('q', '')
+        types = request.query_params.get('type')
+        if types is None:
+            types = list(self.search_types)
+        elif types in self.search_types:
+            types = [types]
+        else:
+            raise ValidationError(
+                {'type': f'Допустимые значения: '
+                         f'{", ".join(self.search_types)}'})
+        try:
+            limit = int(request.query_params.get('limit', SEARCH_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= SEARCH_MAX_LIMIT:
+            raise ValidationError(
+                {'limit': f'Целое число от 1 до {SEARCH_MAX_LIMIT}'})
+
+        results = {}
+        for search_type in types:
+            model, cache, represent = self.search_types[search_type]
+            pks = search.search(model, text, limit)
+            objects = cache.get_many(pks)
+            results[search_type] = [represent(objects[pk])
+                                    for pk in pks if pk in objects]
+        return Response(results)
+
+
+class MetricsView(View):
+    """Метрики HTTP-запросов и кэшей процесса в текстовом формате
+    Prometheus (представление Django: ответ не зависит от заголовка
+    Accept, как и ожидает сборщик метрик)."""
+    caches = (
+        ('clients', clients_cache),
+        ('post_offices', post_offices_cache),
+        ('responses', response_cache.response_cache),
+    )
+
+    def get(self, request):
+        lines = [metrics.registry.render()]
+        for name, kind, help_text, value in (
+                ('cache_hits_total', 'counter', 'Попадания в кэш',
+                 lambda cache: cache.hits),
+                ('cache_misses_total', 'counter', 'Промахи кэша',
+                 lambda cache: cache.misses),
+                ('cache_entries', 'gauge', 'Количество элементов кэша',
+                 len),
+        ):
+            lines.append(f'# HELP {name} {help_text}\n'
+                         f'# TYPE {name} {kind}\n')
+            lines.extend(f'{name}{{cache="{label}"}} {value(cache)}\n'
+                         for label, cache in self.caches)
+        return HttpResponse(''.join(lines),
+                            content_type=metrics.CONTENT_TYPE)
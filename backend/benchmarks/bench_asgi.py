@@ -0,0 +1,168 @@
+"""Пропускная способность чтения при множестве одновременных
+соединений: WSGI (синхронные эндпоинты, пул из ``--workers`` потоков,
+как у gunicorn --threads) против ASGI (асинхронные эндпоинты
+``/api/async/`` с пулом потоков того же размера).
+
+Каждое соединение в цикле запрашивает страницу списка писем и затем
+«медленно» принимает ответ (``--client-delay`` мс). В WSGI поток
+отдаёт ответ сам и всё это время занят, в ASGI отдача ответа —
+ожидание в цикле событий, а поток пула уже обслуживает другой запрос.
+Серверы эмулируются в процессе, без сети.
+
+Запуск: ``python -m benchmarks.bench_asgi --connections 100``
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from benchmarks.common import file_database, seed, setup_django
+
+PATH = 'letters/'
+
+
+def check_status(status):
+    if int(str(status).split()[0]) != 200:
+        raise RuntimeError(f'Ответ {status} вместо 200')
+
+
+def wsgi_environ(path):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.input': BytesIO(),
+        'wsgi.url_scheme': 'http',
+    }
+
+
+def run_wsgi(connections, workers, duration, client_delay):
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def handle():
+        body = application(wsgi_environ(f'/api/{PATH}'),
+                           lambda status, headers: check_status(status))
+        b''.join(body)
+        # Поток отдаёт ответ медленному клиенту и всё это время занят
+        time.sleep(client_delay)
+        body.close()
+
+    def connection(executor):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            executor.submit(handle).result()
+            finish = time.perf_counter()
+            # Учитываются только запросы, завершённые за время прогона
+            if finish < deadline:
+                with lock:
+                    latencies.append(finish - start)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        clients = [threading.Thread(target=connection, args=(executor,))
+                   for _ in range(connections)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+    return latencies
+
+
+def run_asgi(connections, duration, client_delay):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+    latencies = []
+
+    async def request():
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': f'/api/async/{PATH}',
+            'query_string': b'',
+            'headers': [(b'host', b'localhost')],
+            'server': ('localhost', 80),
+        }
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                check_status(message['status'])
+            if (message['type'] == 'http.response.body'
+                    and not message.get('more_body')):
+                # Медленный клиент: ожидание в цикле событий
+                await asyncio.sleep(client_delay)
+
+        await application(scope, receive, send)
+
+    async def connection(deadline):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await request()
+            finish = time.perf_counter()
+            if finish < deadline:
+                latencies.append(finish - start)
+
+    async def main():
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(connection(deadline)
+                               for _ in range(connections)))
+
+    asyncio.run(main())
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--connections', type=int, default=100,
+                        help='Количество одновременных соединений')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='Потоков WSGI и пула асинхронных эндпоинтов')
+    parser.add_argument('--client-delay', type=float, default=100,
+                        help='Время приёма ответа клиентом, мс')
+    parser.add_argument('--duration', type=float, default=5,
+                        help='Длительность прогона, секунд')
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    settings.ASYNC_VIEWS_MAX_WORKERS = args.workers
+    client_delay = args.client_delay / 1000
+
+    print(f'{"сервер":<8}{"соединений":>12}{"запросов/с":>12}'
+          f'{"p50, мс":>10}{"p95, мс":>10}')
+    with file_database(ENGINE='letters_packages.sqlite3', CONN_MAX_AGE=60):
+        seed(letters=args.rows)
+        results = {
+            'WSGI': run_wsgi(args.connections, args.workers, args.duration,
+                             client_delay),
+            'ASGI': run_asgi(args.connections, args.duration, client_delay),
+        }
+    for name, latencies in results.items():
+        latencies = sorted(latencies)
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f'{name:<8}{args.connections:>12}'
+              f'{len(latencies) / args.duration:>12.0f}'
+              f'{statistics.median(latencies) * 1000:>10.0f}'
+              f'{p95 * 1000:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Пропускная способность SQLite при конкурентных чтениях и записях:
+стандартный бэкенд (журнал DELETE, новое соединение на запрос,
+транзакции DEFERRED) против профиля ``letters_packages.sqlite3``.
+
+Каждый поток выполняет операции как отдельные запросы: до и после
+операции вызывается ``close_old_connections`` (как на сигналах
+``request_started``/``request_finished``). Запись — транзакция,
+которая сначала читает клиента, затем создаёт письмо.
+
+Запуск: ``python -m benchmarks.bench_concurrency --threads 8``
+"""
+import argparse
+import random
+import threading
+import time
+
+from benchmarks.common import file_database, seed, setup_django
+
+PROFILES = {
+    'стандартный': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {},
+    },
+    'профиль WAL': {
+        'ENGINE': 'letters_packages.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+    },
+}
+
+
+def worker(seed_value, deadline, write_ratio, client_ids, office_ids,
+           counters, lock):
+    from django.db import (OperationalError, close_old_connections,
+                           connection, transaction)
+
+    from packages.models import Client, Letter
+
+    rnd = random.Random(seed_value)
+    reads = writes = errors = 0
+    while time.perf_counter() < deadline:
+        close_old_connections()
+        try:
+            if rnd.random() < write_ratio:
+                with transaction.atomic():
+                    sender, recipient = Client.objects.filter(
+                        pk__in=rnd.sample(client_ids, 2)).values_list(
+                        'pk', flat=True)
+                    departure, arrival = rnd.sample(office_ids, 2)
+                    Letter.objects.create(sender_id=sender,
+                                          recipient_id=recipient,
+                                          departure_office_id=departure,
+                                          arrival_office_id=arrival,
+                                          category=1,
+                                          weight=rnd.randint(1, 1000))
+                writes += 1
+            else:
+                list(Letter.objects
+                     .filter(departure_office_id=rnd.choice(office_ids))
+                     .values_list('id', 'sender_id', 'recipient_id',
+                                  'category', 'weight')[:100])
+                reads += 1
+        except OperationalError:
+            errors += 1
+        finally:
+            close_old_connections()
+    connection.close()
+    with lock:
+        counters['reads'] += reads
+        counters['writes'] += writes
+        counters['errors'] += errors
+
+
+def run(threads, duration, write_ratio):
+    from packages.models import Client, PostOffice
+
+    client_ids = list(Client.objects.values_list('id', flat=True))
+    office_ids = list(PostOffice.objects.values_list('id', flat=True))
+    counters = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    workers = [
+        threading.Thread(target=worker,
+                         args=(i, deadline, write_ratio, client_ids,
+                               office_ids, counters, lock))
+        for i in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5,
+                        help='Длительность прогона профиля, секунд')
+    parser.add_argument('--write-ratio', type=float, default=0.2,
+                        help='Доля операций записи')
+    parser.add_argument('--rows', type=int, default=20000,
+                        help='Количество писем перед прогоном')
+    args = parser.parse_args()
+
+    setup_django()
+
+    print(f'{"профиль":<14}{"чтений/с":>10}{"записей/с":>11}{"ошибок":>8}')
+    for name, settings in PROFILES.items():
+        with file_database(**settings):
+            seed(letters=args.rows)
+            counters = run(args.threads, args.duration, args.write_ratio)
+        print(f'{name:<14}{counters["reads"] / args.duration:>10.0f}'
+              f'{counters["writes"] / args.duration:>11.0f}'
+              f'{counters["errors"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""Задержка, количество SQL-запросов и пиковая память эндпоинтов
+писем и посылок (список, запись, создание, изменение, удаление)
+с проверкой регрессий относительно сохранённых базовых значений.
+
+Запросы выполняются тестовым клиентом DRF через все middleware
+на файловой БД, наполненной ``seed``. Каждый сценарий выполняется
+тремя проходами: замер задержки (p50/p95), подсчёт запросов к БД
+и замер пиковой памяти (``tracemalloc``). Задержка замеряется
+несколькими раундами с отключённой сборкой мусора, в результат
+попадает медиана по раундам — это снижает влияние посторонней
+нагрузки.
+Кэш ответов отключается, чтобы измерять работу эндпоинтов, а не кэша.
+
+Базовые значения хранятся в ``benchmarks/baselines.json`` отдельно
+для каждого объёма данных. Регрессия — рост задержки или памяти больше
+чем на ``--threshold`` (и больше абсолютного допуска ``MIN_DELTA``)
+или рост количества запросов. При регрессии код возврата 1.
+Задержка зависит от машины: базовые значения обновляются
+(``--update-baselines``) на той же машине, где выполняется проверка.
+
+Запуск: ``python -m benchmarks.bench_endpoints --size 100k``
+"""
+import argparse
+import gc
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.common import file_database, seed, setup_django
+
+# Объём данных: количество писем и количество посылок
+SIZES = {
+    '1k': 1000,
+    '100k': 100000,
+    '1m': 1000000,
+}
+
+SCENARIOS = ('list', 'retrieve', 'create', 'update', 'delete')
+
+EXPECTED_STATUS = {
+    'list': 200,
+    'retrieve': 200,
+    'create': 201,
+    'update': 200,
+    'delete': 204,
+}
+
+BASELINES_PATH = Path(__file__).with_name('baselines.json')
+
+# Допустимый относительный рост задержки и памяти
+THRESHOLD = 0.35
+
+# Абсолютные допуски: меньшие отклонения считаются шумом измерений
+MIN_DELTA = {
+    'p50_ms': 1.0,
+    'p95_ms': 2.0,
+    'peak_kb': 64,
+}
+
+# Количество раундов замера задержки
+ROUNDS = 5
+
+# Количество выполнений сценария при подсчёте запросов и памяти
+QUERY_REPEAT = 3
+MEMORY_REPEAT = 3
+
+
+class EndpointBenchmark:
+    """Сценарии одного эндпоинта на случайных записях."""
+
+    def __init__(self, endpoint, model, amount_field, api_client, rnd):
+        from packages.models import Client, PostOffice
+
+        self.url = f'/api/{endpoint}/'
+        self.model = model
+        self.amount_field = amount_field
+        self.client = api_client
+        self.rnd = rnd
+        self.ids = list(model.objects.values_list('id', flat=True))
+        self.client_ids = list(Client.objects.values_list('id', flat=True))
+        self.office_ids = list(
+            PostOffice.objects.values_list('id', flat=True))
+        self.categories = model._meta.get_field('category').choices
+        self.created = []
+        self.next_page = None
+
+    def list(self):
+        """Страницы списка по очереди (по ссылке ``next``)."""
+        response = self.client.get(self.next_page or self.url)
+        self.next_page = response.json()['next']
+        return response
+
+    def retrieve(self):
+        return self.client.get(f'{self.url}{self.rnd.choice(self.ids)}/')
+
+    def create(self):
+        sender, recipient = self.rnd.sample(self.client_ids, 2)
+        departure, arrival = self.rnd.sample(self.office_ids, 2)
+        response = self.client.post(self.url, {
+            'sender': sender,
+            'recipient': recipient,
+            'departure_office': departure,
+            'arrival_office': arrival,
+            'category': self.rnd.choice(self.categories)[0],
+            self.amount_field: self.rnd.randint(1, 10000),
+        }, format='json')
+        self.created.append(response.json()['id'])
+        return response
+
+    def update(self):
+        return self.client.patch(
+            f'{self.url}{self.rnd.choice(self.ids)}/',
+            {'category': self.rnd.choice(self.categories)[0]},
+            format='json',
+        )
+
+    def delete(self):
+        """Удаление записей, созданных сценарием ``create``."""
+        return self.client.delete(f'{self.url}{self.created.pop()}/')
+
+    def run(self, scenario, repeat):
+        """Время выполнения каждого запроса в миллисекундах."""
+        action = getattr(self, scenario)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = action()
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != EXPECTED_STATUS[scenario]:
+                raise RuntimeError(
+                    f'{self.url} {scenario}: ответ {response.status_code}')
+        return timings
+
+
+def percentile(values, percent):
+    return statistics.quantiles(values, n=100, method='inclusive')[
+        percent - 1]
+
+
+def measure_latency(benchmark, scenario, repeat, rounds):
+    """Медианы по раундам p50 и p95 в миллисекундах."""
+    p50, p95 = [], []
+    for _ in range(rounds):
+        gc.collect()
+        gc.disable()
+        try:
+            timings = benchmark.run(scenario, repeat)
+        finally:
+            gc.enable()
+        p50.append(statistics.median(timings))
+        p95.append(percentile(timings, 95))
+    return statistics.median(p50), statistics.median(p95)
+
+
+def measure_scenario(benchmark, scenario, repeat, rounds):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    p50, p95 = measure_latency(benchmark, scenario, repeat, rounds)
+
+    with CaptureQueriesContext(connection) as queries:
+        benchmark.run(scenario, 1)
+    query_count = len(queries)
+    for _ in range(QUERY_REPEAT - 1):
+        with CaptureQueriesContext(connection) as queries:
+            benchmark.run(scenario, 1)
+        query_count = max(query_count, len(queries))
+
+    tracemalloc.start()
+    try:
+        current, _ = tracemalloc.get_traced_memory()
+        benchmark.run(scenario, MEMORY_REPEAT)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'p50_ms': round(p50, 2),
+        'p95_ms': round(p95, 2),
+        'queries': query_count,
+        'peak_kb': round((peak - current) / 1024),
+    }
+
+
+def run_benchmarks(rows, repeat, rounds, seed_value):
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    from packages.models import Letter, Package
+
+    seed(letters=rows, packages=rows, clients=max(1000, rows // 100),
+         offices=max(100, rows // 10000), seed_value=seed_value)
+    api_client = APIClient(SERVER_NAME='localhost')
+    rnd = random.Random(seed_value)
+    results = {}
+    with override_settings(RESPONSE_CACHE=False):
+        for endpoint, model, amount_field in (
+                ('letters', Letter, 'weight'),
+                ('packages', Package, 'cost'),
+        ):
+            benchmark = EndpointBenchmark(endpoint, model, amount_field,
+                                          api_client, rnd)
+            # Прогрев: кэши справочников, соединение, импорт модулей
+            benchmark.run('list', 3)
+            benchmark.run('retrieve', 3)
+            for scenario in SCENARIOS:
+                results[f'{endpoint}.{scenario}'] = measure_scenario(
+                    benchmark, scenario, repeat, rounds)
+    return results
+
+
+def find_regressions(results, baseline, threshold):
+    """Список описаний регрессий относительно ``baseline``."""
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if metrics['queries'] > base['queries']:
+            regressions.append(f'{name} queries: {base["queries"]} -> '
+                               f'{metrics["queries"]}')
+        for metric, min_delta in MIN_DELTA.items():
+            old, new = base[metric], metrics[metric]
+            if new > old * (1 + threshold) and new - old > min_delta:
+                regressions.append(
+                    f'{name} {metric}: {old} -> {new} '
+                    f'(+{(new / old - 1) * 100 if old else 100:.0f}%)')
+    return regressions
+
+
+def load_baselines(path):
+    if not path.exists():
+        return {}
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_baselines(path, baselines):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(baselines, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def print_results(results, baseline):
+    print(f'{"сценарий":<20}{"p50, мс":>9}{"p95, мс":>9}{"запросов":>10}'
+          f'{"память, КБ":>12}{"база p95":>10}')
+    for name, metrics in results.items():
+        base = baseline.get(name, {}).get('p95_ms', '-')
+        print(f'{name:<20}{metrics["p50_ms"]:>9.2f}{metrics["p95_ms"]:>9.2f}'
+              f'{metrics["queries"]:>10}{metrics["peak_kb"]:>12}{base:>10}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', choices=SIZES, default='1k',
+                        help='Объём данных (писем и посылок)')
+    parser.add_argument('--repeat', type=int, default=100,
+                        help='Количество запросов в раунде')
+    parser.add_argument('--rounds', type=int, default=ROUNDS,
+                        help='Количество раундов замера задержки')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='Допустимый относительный рост метрик')
+    parser.add_argument('--baselines', type=Path, default=BASELINES_PATH)
+    parser.add_argument('--update-baselines', action='store_true',
+                        help='Записать результаты как базовые значения')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    with file_database():
+        results = run_benchmarks(SIZES[args.size], args.repeat,
+                                 args.rounds, args.seed)
+
+    baselines = load_baselines(args.baselines)
+    baseline = baselines.get(args.size, {})
+    print(f'объём: {args.size} писем и {args.size} посылок')
+    print_results(results, baseline)
+
+    if args.update_baselines:
+        baselines[args.size] = results
+        save_baselines(args.baselines, baselines)
+        print(f'Базовые значения записаны в {args.baselines}')
+        return
+    if not baseline:
+        print(f'Нет базовых значений для {args.size} '
+              f'(запустите с --update-baselines)')
+        return
+    regressions = find_regressions(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f'РЕГРЕССИЯ {regression}')
+    if regressions:
+        sys.exit(1)
+    print('Регрессий нет')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Сравнение вывода списков через ModelSerializer и быстрый путь
+``values_list`` + ``represent_rows``.
+
+Запуск: ``python -m benchmarks.bench_serialization --rows 10000``
+"""
+import argparse
+
+from benchmarks.common import measure, seed, setup_django, temporary_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000,
+                        help='Количество писем и посылок')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from api.serializers import LetterSerializer, PackageSerializer
+    from packages.cache import REFERENCE_CACHES
+
+    with temporary_database():
+        seed(letters=args.rows, packages=args.rows)
+        for cache in REFERENCE_CACHES.values():
+            cache.preload()
+
+        print(f'{"сериализатор":<20}{"строк":>8}{"Model, мс":>12}'
+              f'{"values, мс":>12}{"ускорение":>11}')
+        for serializer_class in (LetterSerializer, PackageSerializer):
+            queryset = serializer_class.Meta.model.objects.all()
+            model_path = measure(
+                lambda: serializer_class(queryset.all(), many=True).data,
+                args.repeat,
+            )
+            fast_path = measure(
+                lambda: serializer_class.represent_rows(
+                    queryset.values_list(*serializer_class.values_fields)),
+                args.repeat,
+            )
+            print(f'{serializer_class.__name__:<20}{args.rows:>8}'
+                  f'{model_path:>12.1f}{fast_path:>12.1f}'
+                  f'{model_path / fast_path:>10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Сравнение выгрузки и загрузки всех данных: ``dumpdata``/``loaddata``
+(JSON) против двоичного снимка ``dump_snapshot``/``restore_snapshot``.
+
+Перед каждой загрузкой таблицы очищаются; после загрузки проверяется
+количество строк.
+
+Запуск: ``python -m benchmarks.bench_snapshot --rows 20000``
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.common import file_database, seed, setup_django
+
+MODELS = ('packages.Client', 'packages.PostOffice', 'packages.Letter',
+          'packages.Package')
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000,
+                        help='Количество писем и посылок')
+    parser.add_argument('--clients', type=int, default=10000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from django.db import connection, transaction
+
+    from packages import snapshot
+
+    def counts():
+        return [model.objects.count() for model in snapshot.SNAPSHOT_MODELS]
+
+    def flush():
+        with transaction.atomic():
+            snapshot.flush(connection)
+
+    with file_database(), tempfile.TemporaryDirectory() as directory:
+        seed(letters=args.rows, packages=args.rows, clients=args.clients)
+        expected = counts()
+        json_path = os.path.join(directory, 'data.json')
+        snapshot_path = os.path.join(directory, 'data.snapshot')
+        methods = (
+            ('dumpdata/loaddata', json_path,
+             lambda: call_command('dumpdata', *MODELS, output=json_path,
+                                  verbosity=0),
+             lambda: call_command('loaddata', json_path, verbosity=0)),
+            ('снимок', snapshot_path,
+             lambda: call_command('dump_snapshot', snapshot_path,
+                                  stdout=io.StringIO()),
+             lambda: call_command('restore_snapshot', snapshot_path,
+                                  stdout=io.StringIO())),
+        )
+
+        print(f'строк: {sum(expected)}')
+        print(f'{"способ":<20}{"размер, МБ":>12}{"выгрузка, с":>13}'
+              f'{"загрузка, с":>13}')
+        for name, path, dump, restore in methods:
+            dump_time = timed(dump)
+            size = os.path.getsize(path) / 1024 / 1024
+            flush()
+            restore_time = timed(restore)
+            assert counts() == expected, f'{name}: данные не совпадают'
+            print(f'{name:<20}{size:>12.1f}{dump_time:>13.2f}'
+                  f'{restore_time:>13.2f}')
+
+
+if __name__ == '__main__':
+    main()
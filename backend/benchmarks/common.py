@@ -0,0 +1,116 @@
+"""Общие инструменты бенчмарков: настройка Django, временная БД
+и наполнение её тестовыми данными.
+
+Бенчмарки запускаются из директории backend, например:
+``python -m benchmarks.bench_serialization --rows 10000``
+"""
+import contextlib
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import django
+
+SEED_BATCH_SIZE = 10000
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE',
+                          'letters_packages.settings')
+    django.setup()
+
+
+@contextlib.contextmanager
+def temporary_database():
+    """Временная БД с применёнными миграциями (как в тестах),
+    удаляется при выходе из контекста."""
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True,
+                                       serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@contextlib.contextmanager
+def file_database(**settings):
+    """Временная файловая БД с применёнными миграциями: в отличие от
+    ``temporary_database`` доступна нескольким соединениям (потокам).
+    ``settings`` заменяют ключи ``DATABASES['default']`` (ENGINE,
+    OPTIONS, CONN_MAX_AGE) на время контекста."""
+    from django.core.management import call_command
+    from django.db import connections
+
+    old_settings = connections.settings['default']
+    with tempfile.TemporaryDirectory() as directory:
+        connections['default'].close()
+        del connections['default']
+        connections.settings['default'] = {
+            **old_settings,
+            'NAME': str(Path(directory) / 'db.sqlite3'),
+            **settings,
+        }
+        try:
+            call_command('migrate', verbosity=0)
+            yield
+        finally:
+            connections['default'].close()
+            del connections['default']
+            connections.settings['default'] = old_settings
+
+
+def seed(letters=0, packages=0, clients=1000, offices=100, seed_value=0):
+    """Наполнение БД случайными клиентами, пунктами, письмами и посылками."""
+    from packages.models import Client, Letter, Package, PostOffice
+
+    rnd = random.Random(seed_value)
+    Client.objects.bulk_create(
+        Client(name=f'Имя{i}',
+               lastname=f'Фамилия{i}',
+               middle_name=f'Отчество{i}' if i % 3 else None,
+               phone_number=f'+7{i:010d}')
+        for i in range(clients)
+    )
+    PostOffice.objects.bulk_create(
+        PostOffice(address=f'г. Город, ул. Улица, д. {i}',
+                   postal_index=f'{100000 + i:06d}')
+        for i in range(offices)
+    )
+    client_ids = list(Client.objects.values_list('id', flat=True))
+    office_ids = list(PostOffice.objects.values_list('id', flat=True))
+
+    for model, count, categories, extra in (
+            (Letter, letters, Letter.LetterType.values, 'weight'),
+            (Package, packages, Package.PackageType.values, 'cost'),
+    ):
+        # Порциями, чтобы не держать в памяти миллионы объектов
+        for start in range(0, count, SEED_BATCH_SIZE):
+            shipments = []
+            for _ in range(min(SEED_BATCH_SIZE, count - start)):
+                sender, recipient = rnd.sample(client_ids, 2)
+                departure_office, arrival_office = rnd.sample(office_ids, 2)
+                shipments.append(model(
+                    sender_id=sender,
+                    recipient_id=recipient,
+                    departure_office_id=departure_office,
+                    arrival_office_id=arrival_office,
+                    category=rnd.choice(categories),
+                    **{extra: rnd.randint(1, 10000)},
+                ))
+            model.objects.bulk_create(shipments)
+
+
+def measure(func, repeat=5):
+    """Медианное время выполнения ``func`` в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
@@ -0,0 +1,178 @@
+"""Метрики HTTP-запросов в памяти процесса.
+
+``MetricsMiddleware`` для каждого маршрута (имени представления)
+и HTTP-метода собирает гистограммы длительности запроса, количества
+запросов к БД и размера ответа, а также суммарное время запросов к БД
+и количество ответов по статусам. Запросы к БД подсчитываются обёрткой
+``record_query``, которую бэкенд ``letters_packages.sqlite3``
+устанавливает в каждое соединение: статистика текущего HTTP-запроса
+хранится в контекстной переменной и поэтому видна и в потоках пула
+асинхронных представлений (см. ``api.async_views``).
+
+Агрегаты — счётчики в словаре под одной блокировкой, без хранения
+отдельных значений. Эндпоинт ``/api/_metrics`` отдаёт их в текстовом
+формате Prometheus.
+"""
+import contextlib
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Границы корзин гистограмм (значение попадает в корзину le >= значения)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                    5.0, 10.0)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Остальные методы учитываются как ``other``, чтобы произвольные
+# методы из запросов не порождали новые ряды
+METHODS = ('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Маршрут запросов, не сопоставленных ни одному представлению
+UNMATCHED_ROUTE = 'unmatched'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RequestStats:
+    """Запросы к БД в рамках одного HTTP-запроса."""
+    __slots__ = ('queries', 'query_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+_current = ContextVar('request_stats', default=None)
+
+
+def start_request():
+    """Начало подсчёта запросов к БД; возвращает статистику запроса."""
+    stats = RequestStats()
+    _current.set(stats)
+    return stats
+
+
+def finish_request():
+    _current.set(None)
+
+
+@contextlib.contextmanager
+def request_stats(stats):
+    """Подсчёт запросов к БД в статистику ``stats`` на время контекста:
+    для чтения потокового ответа после завершения обработки запроса."""
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка выполнения запроса к БД (``connection.execute_wrappers``):
+    вне HTTP-запроса только вызывает ``execute``."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - start
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # Последняя корзина — значения больше всех границ (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self, name, labels):
+        """Строки ``_bucket`` (накопленные), ``_sum`` и ``_count``."""
+        total = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {total}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {total}'
+
+
+class RouteMetrics:
+    """Агрегаты одного маршрута и метода."""
+
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERIES_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+        self.query_seconds = 0.0
+        self.statuses = {}
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, method, status, duration, stats, size):
+        """Учёт завершённого запроса."""
+        if method not in METHODS:
+            method = 'other'
+        with self._lock:
+            metrics = self._routes.get((route, method))
+            if metrics is None:
+                metrics = self._routes[route, method] = RouteMetrics()
+            metrics.duration.observe(duration)
+            metrics.queries.observe(stats.queries)
+            metrics.query_seconds += stats.query_seconds
+            metrics.size.observe(size)
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                '# HELP http_requests_total Количество ответов',
+                '# TYPE http_requests_total counter',
+            ]
+            for (route, method), metrics in routes:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(
+                        f'http_requests_total{{route="{route}",'
+                        f'method="{method}",status="{status}"}} {count}')
+            for name, attribute, kind, help_text in (
+                    ('http_request_duration_seconds', 'duration',
+                     'histogram', 'Длительность обработки запроса'),
+                    ('http_request_db_queries', 'queries', 'histogram',
+                     'Количество запросов к БД за HTTP-запрос'),
+                    ('http_response_size_bytes', 'size', 'histogram',
+                     'Размер тела ответа (кроме потоковых)'),
+                    ('http_request_db_seconds_total', 'query_seconds',
+                     'counter', 'Суммарное время запросов к БД'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for (route, method), metrics in routes:
+                    labels = f'route="{route}",method="{method}"'
+                    value = getattr(metrics, attribute)
+                    if kind == 'histogram':
+                        lines.extend(value.samples(name, labels))
+                    else:
+                        lines.append(f'{name}{{{labels}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
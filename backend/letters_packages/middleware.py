@@ -0,0 +1,92 @@
+import time
+from functools import partial
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+from . import metrics, routers
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    """Разрешает чтение из реплик в безопасных запросах и закрепляет
+    клиента за основной БД после запроса с записью.
+    Работает как в WSGI, так и в ASGI (без перехода в синхронный режим)."""
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def process_request(self, request):
+        routers.start_request(
+            use_replicas=(request.method in self.safe_methods
+                          and routers.REPLICA_PIN_COOKIE not in request.COOKIES)
+        )
+
+    def process_response(self, request, response):
+        if settings.DATABASE_REPLICAS and routers.has_written():
+            response.set_cookie(routers.REPLICA_PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True)
+        return response
+
+
+class MeteredStream:
+    """Содержимое потокового ответа для ``MetricsMiddleware``: запросы
+    к БД при чтении учитываются в статистике HTTP-запроса, а метрики
+    записываются (``finish(size)``), когда поток прочитан до конца
+    или закрыт сервером."""
+
+    def __init__(self, content, stats, finish):
+        self.content = iter(content)
+        self.stats = stats
+        self.finish = finish
+        self.size = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with metrics.request_stats(self.stats):
+            try:
+                chunk = next(self.content)
+            except StopIteration:
+                self.close()
+                raise
+        self.size += len(chunk)
+        return chunk
+
+    def close(self):
+        if self.finish is not None:
+            finish, self.finish = self.finish, None
+            finish(self.size)
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """Учёт длительности, запросов к БД и размера ответа каждого запроса
+    в метриках процесса (см. ``letters_packages.metrics``). Должна быть
+    первой в ``MIDDLEWARE``, чтобы учитывать работу остальных.
+    Потоковый ответ учитывается вместе с чтением его содержимого."""
+
+    def process_request(self, request):
+        request._metrics_start = time.perf_counter()
+        request._metrics_stats = metrics.start_request()
+
+    def process_response(self, request, response):
+        if getattr(request, '_metrics_start', None) is None:
+            return response
+        metrics.finish_request()
+        if response.streaming:
+            response.streaming_content = MeteredStream(
+                response.streaming_content, request._metrics_stats,
+                partial(self.record, request, response))
+        else:
+            self.record(request, response, len(response.content))
+        return response
+
+    def record(self, request, response, size):
+        match = request.resolver_match
+        metrics.registry.record(
+            route=match.view_name if match else metrics.UNMATCHED_ROUTE,
+            method=request.method,
+            status=response.status_code,
+            duration=time.perf_counter() - request._metrics_start,
+            stats=request._metrics_stats,
+            size=size,
+        )
@@ -0,0 +1,185 @@
+"""Профилирование отдельных запросов к API по требованию.
+
+Запрос к ``/api/`` профилируется, если в заголовке ``X-Profile`` передан
+токен ``PROFILE_TOKEN`` или он случайно выбран с вероятностью
+``PROFILE_SAMPLE_RATE``. Для такого запроса ``ProfilingMiddleware``
+сохраняет в ``PROFILE_DIR`` два файла с общим именем
+``<время>-<метод>-<маршрут>``:
+
+- ``.prof`` — статистика ``cProfile`` (``python -m pstats``, snakeviz);
+- ``.sql`` — выполненные запросы к БД с длительностью.
+
+Имя файлов возвращается в заголовке ответа ``X-Profile-Id``. В каталоге
+остаются файлы последних ``PROFILE_MAX_REQUESTS`` запросов.
+
+Без профилирования запрос стоит одной проверки заголовка и настроек,
+а каждый запрос к БД — одного чтения контекстной переменной
+(``record_query`` устанавливается бэкендом ``letters_packages.sqlite3``).
+``cProfile`` учитывает только поток middleware: работа асинхронных
+представлений в пуле потоков (``api.async_views``) попадает в профиль
+как ожидание, но их запросы к БД записываются.
+"""
+import asyncio
+import cProfile
+import hmac
+import logging
+import random
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.deprecation import MiddlewareMixin
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+# Профилируются только запросы к API
+PROFILE_PATH_PREFIX = '/api/'
+
+logger = logging.getLogger(__name__)
+
+_queries = ContextVar('profile_queries', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка выполнения запроса к БД (``connection.execute_wrappers``):
+    вне профилируемого запроса только вызывает ``execute``."""
+    queries = _queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.append((time.perf_counter() - start, sql, params, many))
+
+
+def token_matches(token, expected):
+    """Сравнение токена из заголовка с ``PROFILE_TOKEN`` за постоянное
+    время. Значения заголовков WSGI и ASGI — байты, декодированные как
+    latin-1, поэтому сравниваются байты: ``compare_digest`` не принимает
+    строки с символами вне ASCII."""
+    try:
+        token = token.encode('latin-1')
+    except UnicodeEncodeError:
+        return False
+    return hmac.compare_digest(token, expected.encode())
+
+
+def should_profile(request):
+    if not request.path.startswith(PROFILE_PATH_PREFIX):
+        return False
+    token = request.META.get(PROFILE_HEADER)
+    if token is not None:
+        expected = getattr(settings, 'PROFILE_TOKEN', None)
+        return bool(expected) and token_matches(token, expected)
+    rate = getattr(settings, 'PROFILE_SAMPLE_RATE', 0)
+    return rate > 0 and random.random() < rate
+
+
+def format_queries(queries):
+    """Текст файла ``.sql``: запросы в порядке выполнения."""
+    total = sum(duration for duration, *_ in queries)
+    lines = [f'-- {len(queries)} запросов, {total * 1000:.3f} мс']
+    for number, (duration, sql, params, many) in enumerate(queries, 1):
+        lines.append(f'\n-- #{number}: {duration * 1000:.3f} мс')
+        if many:
+            lines.append(f'-- executemany: {len(params)} наборов параметров')
+        elif params:
+            lines.append(f'-- параметры: {params!r}')
+        lines.append(f'{sql};')
+    return '\n'.join(lines) + '\n'
+
+
+def profile_name(request):
+    match = request.resolver_match
+    route = match.view_name.replace(':', '.') if match else 'unmatched'
+    return f'{timezone.now():%Y%m%dT%H%M%S%f}-{request.method}-{route}'
+
+
+def rotate(directory, keep):
+    """Удаление файлов всех запросов, кроме последних ``keep``."""
+    profiles = sorted(directory.glob('*.prof'))
+    for path in profiles[:max(len(profiles) - keep, 0)]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.sql').unlink(missing_ok=True)
+
+
+class RequestProfile:
+    """Профиль одного запроса: ``cProfile`` и запросы к БД."""
+
+    def __init__(self, request):
+        self.request = request
+        self.profiler = cProfile.Profile()
+        self.queries = []
+        self.token = None
+
+    def start(self):
+        """Запуск профилирования; False, если уже работает другой
+        профилировщик (Python 3.12+)."""
+        try:
+            self.profiler.enable()
+        except ValueError:
+            return False
+        self.token = _queries.set(self.queries)
+        return True
+
+    def stop(self):
+        self.profiler.disable()
+        _queries.reset(self.token)
+
+    def save(self, response):
+        """Запись файлов профиля и их имени в заголовок ответа."""
+        try:
+            directory = Path(settings.PROFILE_DIR)
+            directory.mkdir(parents=True, exist_ok=True)
+            name = profile_name(self.request)
+            self.profiler.dump_stats(directory / f'{name}.prof')
+            (directory / f'{name}.sql').write_text(
+                format_queries(self.queries), encoding='utf-8')
+            rotate(directory, settings.PROFILE_MAX_REQUESTS)
+        except OSError as error:
+            # Ошибка записи профиля не должна ломать ответ
+            logger.warning('Не удалось сохранить профиль запроса: %s', error)
+        else:
+            response[PROFILE_ID_HEADER] = name
+        return response
+
+
+def start_profile(request):
+    """Запущенный профиль запроса или None, если запрос
+    не профилируется."""
+    if not should_profile(request):
+        return None
+    profile = RequestProfile(request)
+    return profile if profile.start() else None
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """Профилирование выбранных запросов к API (см. модуль). Работает
+    как в WSGI, так и в ASGI: в ASGI профиль включает и другие
+    сопрограммы, выполняющиеся в цикле событий в это время."""
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        profile = start_profile(request)
+        if profile is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.stop()
+        return profile.save(response)
+
+    async def __acall__(self, request):
+        profile = start_profile(request)
+        if profile is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            profile.stop()
+        return profile.save(response)
@@ -0,0 +1,65 @@
+"""Маршрутизация запросов между основной БД и репликами.
+
+Запись всегда идёт в основную БД (``default``). Чтение направляется
+в случайную реплику из ``DATABASE_REPLICAS`` только внутри безопасного
+HTTP-запроса (GET, HEAD, OPTIONS), для которого ``ReplicaMiddleware``
+разрешила реплики. Первая запись в запросе переключает оставшиеся
+чтения этого запроса на основную БД, а cookie ``REPLICA_PIN_COOKIE``
+оставляет на ней следующие запросы клиента на ``REPLICA_PIN_SECONDS``
+секунд (пока реплики не догонят основную БД). Вне HTTP-запросов
+(команды, сигналы, тесты) всё читается из основной БД.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_PIN_COOKIE = 'db_primary'
+
+_use_replicas = ContextVar('use_replicas', default=False)
+_written = ContextVar('written', default=False)
+
+
+def start_request(use_replicas):
+    _use_replicas.set(use_replicas)
+    _written.set(False)
+
+
+def finish_request(**kwargs):
+    """Сброс состояния по окончании запроса (в том числе после отдачи
+    потокового ответа, который читает БД уже после middleware)."""
+    start_request(use_replicas=False)
+
+
+def reads_from_replicas():
+    """Читает ли текущий запрос из реплик."""
+    return bool(settings.DATABASE_REPLICAS) and _use_replicas.get()
+
+
+def has_written():
+    """Была ли в текущем запросе запись в БД."""
+    return _written.get()
+
+
+request_finished.connect(finish_request, dispatch_uid='replica_router')
+
+
+class PrimaryReplicaRouter:
+    """Чтение — из реплик (если разрешено в текущем запросе),
+    запись — в основную БД."""
+
+    def db_for_read(self, model, **hints):
+        if reads_from_replicas():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _use_replicas.set(False)
+        _written.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной БД, объекты из них взаимозаменяемы
+        return True
@@ -26,7 +26,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'letters_packages.middleware.MetricsMiddleware',
+    'letters_packages.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'letters_packages.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -56,13 +59,38 @@ TEMPLATES = [
 WSGI_APPLICATION = 'letters_packages.wsgi.application'
 
 
+# Бэкенд letters_packages.sqlite3 — стандартный SQLite с профилем
+# соединения: WAL, PRAGMA из OPTIONS['pragmas'] (по умолчанию
+# letters_packages.sqlite3.base.DEFAULT_PRAGMAS) и BEGIN IMMEDIATE
+# для транзакций записи (letters_packages.transactions.atomic_write),
+# остальные транзакции — в режиме OPTIONS['transaction_mode'].
+# Соединение переиспользуется CONN_MAX_AGE секунд.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'letters_packages.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'pragmas': {},
+            'transaction_mode': 'DEFERRED',
+        },
+    },
+    # Реплика для чтения (копируется командой sync_replicas):
+    # 'replica': {
+    #     'ENGINE': 'letters_packages.sqlite3',
+    #     'NAME': BASE_DIR / 'db_replica.sqlite3',
+    #     'CONN_MAX_AGE': 60,
+    # },
 }
 
+# Чтение в безопасных запросах распределяется по репликам
+# (псевдонимы из DATABASES), запись — в default
+DATABASE_ROUTERS = ['letters_packages.routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = []
+
+# Сколько секунд после записи клиент читает из основной БД, а не из реплик
+REPLICA_PIN_SECONDS = 60
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -94,4 +122,63 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.ShipmentCursorPagination',
+    'PAGE_SIZE': 100,
+}
+
+
+# Размер кэша справочников (клиенты, почтовые пункты) в процессе, объектов,
+# и время жизни объекта, секунд — предел устаревания при локальном кэше
+# Django (см. CACHES)
+REFERENCE_CACHE_MAX_SIZE = 100000
+REFERENCE_CACHE_TIMEOUT = 60
+
+# Чтение списков и записей из денормализованной модели чтения.
+# Перед включением необходимо выполнить команду rebuild_read_model.
+SHIPMENT_READ_MODEL = False
+
+# Размер пула потоков асинхронных эндпоинтов /api/async/ (ASGI):
+# не больше числа одновременных соединений с БД
+ASYNC_VIEWS_MAX_WORKERS = 8
+
+# Кэш Django: номера поколений кэша ответов и кэшей справочников,
+# статистика /api/stats/.
+# Локальный кэш действует только в своём процессе; при нескольких
+# процессах (gunicorn, uwsgi) и командах, меняющих данные, нужен общий
+# бэкенд (Memcached, Redis), иначе check --deploy выдаёт api.W001.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Кэш ответов списков писем и посылок: включение, размеры в байтах
+# (всего в процессе и одного ответа) и время жизни ответа, секунд —
+# предел устаревания при локальном кэше Django
+RESPONSE_CACHE = True
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+RESPONSE_CACHE_MAX_ITEM_BYTES = 1024 * 1024
+RESPONSE_CACHE_TIMEOUT = 60
+
+# Время жизни кэша статистики /api/stats/, секунд
+STATS_CACHE_TIMEOUT = 300
+
+# Профилирование запросов к /api/ (см. letters_packages.profiling):
+# доля случайно выбранных запросов (0 — выключено) и токен заголовка
+# X-Profile (None — профилирование по заголовку выключено)
+PROFILE_SAMPLE_RATE = 0
+PROFILE_TOKEN = None
+# Каталог профилей и количество хранимых профилей
+PROFILE_DIR = BASE_DIR / 'profiles'
+PROFILE_MAX_REQUESTS = 100
+
+# Журнал медленных запросов к БД (см. letters_packages.slow_queries):
+# порог в миллисекундах (None — выключен), файл журнала и его размер,
+# после которого журнал переносится в файл с суффиксом .1
+SLOW_QUERY_THRESHOLD_MS = None
+SLOW_QUERY_LOG = BASE_DIR / 'slow_queries.log'
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,178 @@
+"""Журнал медленных запросов к БД.
+
+``record_query`` (устанавливается бэкендом ``letters_packages.sqlite3``
+в каждое соединение) замеряет каждый запрос, если задан порог
+``SLOW_QUERY_THRESHOLD_MS``. Для запросов не быстрее порога в файл
+``SLOW_QUERY_LOG`` дописывается строка JSON:
+
+- ``duration_ms`` — длительность ``execute`` (для SELECT — до первой
+  строки результата, без последующего чтения);
+- ``source`` — представление (``LetterViewSet.list``), действие
+  администратора (``LetterAdmin.changelist_view``), команда
+  (``command:fill_db``) или строка кода проекта, выполнившая запрос;
+- ``sql`` — нормализованный текст запроса: значения заменены на ``?``,
+  списки значений свёрнуты, поэтому одинаковые по структуре запросы
+  имеют одинаковый ``fingerprint``;
+- ``plan`` — результат ``EXPLAIN QUERY PLAN`` (только SQLite).
+
+Значения параметров в журнал не попадают. Когда файл превышает
+``SLOW_QUERY_LOG_MAX_BYTES``, он переименовывается с суффиксом ``.1``.
+Сводка по журналу — команда ``slow_queries``.
+"""
+import hashlib
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Замены при нормализации запроса, по порядку
+NORMALIZE_PATTERNS = (
+    # Строковые литералы и числа
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    # Параметры запросов Django
+    (re.compile(r'%s'), '?'),
+    # Списки значений IN (...) и VALUES (...), (...)
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+# Запросы, для которых выполняется EXPLAIN QUERY PLAN
+EXPLAINABLE = re.compile(r'\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b',
+                         re.IGNORECASE)
+
+_lock = threading.Lock()
+
+
+def normalize(sql):
+    for pattern, replacement in NORMALIZE_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()[:16]
+
+
+def explain(connection, sql, params, many):
+    """Строки плана запроса с отступами по вложенности (как в sqlite3).
+    Для ``executemany`` план строится по первому набору параметров."""
+    if connection.vendor != 'sqlite' or not EXPLAINABLE.match(sql):
+        return []
+    if many:
+        # Итератор параметров уже прочитан при выполнении запроса
+        if not isinstance(params, (list, tuple)) or not params:
+            return []
+        params = params[0]
+    from django.db.backends.sqlite3.base import SQLiteCursorWrapper
+
+    # Курсор без обёрток соединения: EXPLAIN не учитывается
+    # как запрос ни в метриках, ни в этом журнале
+    cursor = connection.connection.cursor(factory=SQLiteCursorWrapper)
+    try:
+        rows = cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+    except connection.Database.Error:
+        return []
+    finally:
+        cursor.close()
+    depths = {0: -1}
+    plan = []
+    for node, parent, _, detail in rows:
+        depths[node] = depths.get(parent, -1) + 1
+        plan.append('  ' * depths[node] + detail)
+    return plan
+
+
+def find_source():
+    """Представление, действие администратора или команда, выполняющие
+    запрос; если их нет в стеке — ближайшая строка кода проекта
+    (кроме обёрток запросов из ``letters_packages``)."""
+    from django.contrib.admin.options import BaseModelAdmin
+    from django.core.management.base import BaseCommand
+    from django.views import View
+
+    base_dir = str(settings.BASE_DIR)
+    own_dir = str(Path(__file__).parent)
+    fallback = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        obj = frame.f_locals.get('self')
+        if isinstance(obj, BaseCommand):
+            return f'command:{type(obj).__module__.rsplit(".", 1)[-1]}'
+        if isinstance(obj, (View, BaseModelAdmin)):
+            action = getattr(obj, 'action', None) or frame.f_code.co_name
+            return f'{type(obj).__name__}.{action}'
+        filename = frame.f_code.co_filename
+        if (fallback is None and filename.startswith(base_dir)
+                and not filename.startswith(own_dir)):
+            fallback = (f'{Path(filename).relative_to(base_dir)}:'
+                        f'{frame.f_lineno}')
+        frame = frame.f_back
+    return fallback or 'unknown'
+
+
+def write_entry(entry):
+    path = Path(settings.SLOW_QUERY_LOG)
+    line = json.dumps(entry, ensure_ascii=False) + '\n'
+    with _lock:
+        if (path.exists() and path.stat().st_size + len(line)
+                > settings.SLOW_QUERY_LOG_MAX_BYTES):
+            path.replace(path.with_name(f'{path.name}.1'))
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write(line)
+
+
+def log_query(connection, sql, params, many, duration_ms):
+    normalized = normalize(sql)
+    entry = {
+        'time': timezone.now().isoformat(),
+        'database': connection.alias,
+        'duration_ms': round(duration_ms, 3),
+        'source': find_source(),
+        'fingerprint': fingerprint(normalized),
+        'sql': normalized,
+        'plan': explain(connection, sql, params, many),
+    }
+    try:
+        write_entry(entry)
+    except OSError as error:
+        # Ошибка записи журнала не должна ломать запрос
+        logger.warning('Не удалось записать медленный запрос: %s', error)
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка выполнения запроса к БД (``connection.execute_wrappers``):
+    без порога только вызывает ``execute``."""
+    threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None)
+    if threshold is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - start) * 1000
+    if duration_ms >= threshold:
+        log_query(context['connection'], sql, params, many, duration_ms)
+    return result
+
+
+def read_log(path):
+    """Записи журнала, начиная со старых (включая файл ``.1``);
+    повреждённые строки пропускаются."""
+    path = Path(path)
+    for log_path in (path.with_name(f'{path.name}.1'), path):
+        if not log_path.exists():
+            continue
+        with open(log_path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
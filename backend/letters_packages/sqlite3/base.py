@@ -0,0 +1,79 @@
+"""Бэкенд SQLite с профилем соединения для рабочей нагрузки.
+
+Для каждого нового соединения выполняются PRAGMA из ``DEFAULT_PRAGMAS``
+(переопределяются ключом ``pragmas`` в ``OPTIONS``, значение ``None``
+отключает PRAGMA), а транзакции ``atomic()`` открываются в режиме
+``transaction_mode`` (по умолчанию ``DEFERRED``), транзакции
+``atomic_write()`` — в режиме ``IMMEDIATE`` (см.
+``letters_packages.transactions``). Запросы соединения
+учитываются в метриках HTTP-запроса (``metrics.record_query``)
+и записываются в профиль запроса (``profiling.record_query``),
+медленные — в журнал медленных запросов (``slow_queries.record_query``).
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+from letters_packages import metrics, profiling, slow_queries
+
+DEFAULT_PRAGMAS = {
+    # Читатели не блокируют писателя и наоборот
+    'journal_mode': 'WAL',
+    # В режиме WAL данные не теряются при падении процесса,
+    # fsync выполняется только при контрольной точке
+    'synchronous': 'NORMAL',
+    # Ожидание блокировки, мс
+    'busy_timeout': 5000,
+    # Кэш страниц соединения: отрицательное значение — в КиБ (64 МиБ)
+    'cache_size': -64000,
+    # Чтение файла БД через отображение в память (256 МиБ)
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Режим следующей открываемой транзакции вместо transaction_mode
+    # (устанавливается ``atomic_write``)
+    begin_mode = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.execute_wrappers.append(metrics.record_query)
+        self.execute_wrappers.append(profiling.record_query)
+        self.execute_wrappers.append(slow_queries.record_query)
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # Собственные параметры профиля не передаются в sqlite3.connect()
+        kwargs.pop('pragmas', None)
+        kwargs.pop('transaction_mode', None)
+        return kwargs
+
+    @property
+    def pragmas(self):
+        pragmas = {**DEFAULT_PRAGMAS,
+                   **self.settings_dict['OPTIONS'].get('pragmas', {})}
+        return {name: value for name, value in pragmas.items()
+                if value is not None}
+
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode',
+                                                 'DEFERRED')
+        if mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'transaction_mode: допустимые значения '
+                f'{", ".join(TRANSACTION_MODES)}')
+        return mode.upper()
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(
+            f'BEGIN {self.begin_mode or self.transaction_mode}')
@@ -0,0 +1,33 @@
+"""Транзакции записи.
+
+``atomic()`` бэкенда ``letters_packages.sqlite3`` открывает транзакцию
+командой ``BEGIN DEFERRED``: блокировка записи берётся только при первой
+записи, и длинное чтение (например, выгрузка снимка) не мешает
+писателям. Транзакция, которая сначала читает, а затем пишет, в этом
+режиме не может дождаться блокировки записи — SQLite сразу возвращает
+«database is locked», не обращая внимания на ``busy_timeout``. Такие
+транзакции открываются через ``atomic_write()``: ``BEGIN IMMEDIATE``
+берёт блокировку записи в начале, и конкурирующие записи ждут её
+в пределах ``busy_timeout``.
+"""
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def atomic_write(using=None):
+    """``transaction.atomic()`` с блокировкой записи в начале внешней
+    транзакции. Внутри уже открытой транзакции работает как обычный
+    ``atomic()``: режим внешней транзакции не меняется. Для других
+    бэкендов БД — обычный ``atomic()``."""
+    connection = transaction.get_connection(using)
+    previous = getattr(connection, 'begin_mode', None)
+    connection.begin_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            # Режим нужен только для BEGIN этого блока
+            connection.begin_mode = previous
+            yield
+    finally:
+        connection.begin_mode = previous
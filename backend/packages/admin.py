@@ -1,21 +1,42 @@
 from django.contrib import admin
 
+from . import search
 from .models import Client, Letter, Package, PostOffice
 
 
+class FullTextSearchMixin:
+    """Поиск в админке через полнотекстовый индекс (packages/search.py)
+    вместо ``icontains`` по ``search_fields``.
+    ``fulltext_search_model`` — модель с индексом, ``fulltext_search_fields``
+    — поля (первичный или внешние ключи), ссылающиеся на неё."""
+    fulltext_search_model = None
+    fulltext_search_fields = ('pk',)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search.filter_queryset(queryset,
+                                      self.fulltext_search_model,
+                                      search_term,
+                                      self.fulltext_search_fields), False
+
+
 @admin.register(Client)
-class ClientAdmin(admin.ModelAdmin):
+class ClientAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('pk', 'name', 'lastname', 'middle_name', 'phone_number',)
+    search_fields = ('name', 'lastname', 'middle_name',)
+    fulltext_search_model = Client
 
 
 @admin.register(PostOffice)
-class PostOfficeAdmin(admin.ModelAdmin):
+class PostOfficeAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('pk', 'address', 'postal_index',)
     search_fields = ('address',)
+    fulltext_search_model = PostOffice
 
 
 @admin.register(Letter)
-class LetterAdmin(admin.ModelAdmin):
+class LetterAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('pk',
                     'sender',
                     'recipient',
@@ -26,10 +47,12 @@ class LetterAdmin(admin.ModelAdmin):
     search_fields = ('departure_office__address',
                      'arrival_office__address',)
     list_filter = ('category',)
+    fulltext_search_model = PostOffice
+    fulltext_search_fields = ('departure_office', 'arrival_office',)
 
 
 @admin.register(Package)
-class PackageAdmin(admin.ModelAdmin):
+class PackageAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('pk',
                     'sender',
                     'recipient',
@@ -40,3 +63,5 @@ class PackageAdmin(admin.ModelAdmin):
     search_fields = ('departure_office__address',
                      'arrival_office__address',)
     list_filter = ('category',)
+    fulltext_search_model = PostOffice
+    fulltext_search_fields = ('departure_office', 'arrival_office',)
@@ -0,0 +1,253 @@
+"""Кэши процесса: LRU-кэш и кэши справочных моделей (клиенты,
+почтовые пункты) по первичному ключу.
+
+Объект справочника сбрасывается из кэша при изменении в том же
+процессе (сигналы, см. packages/signals.py). Чтобы изменения из других
+процессов и команд тоже были видны, каждое изменение увеличивает номер
+поколения модели в кэше Django: кэш процесса, заметивший новый номер,
+очищается целиком. С локальным кэшем Django (``LocMemCache``) номер
+виден только своему процессу, поэтому объекты также устаревают через
+``REFERENCE_CACHE_TIMEOUT`` секунд (проверка api.W001).
+"""
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.db.models import CharField, F, IntegerField, Value
+
+from .models import Client, PostOffice
+
+# Максимальное количество объектов каждой справочной модели в кэше процесса
+REFERENCE_CACHE_MAX_SIZE = getattr(settings, 'REFERENCE_CACHE_MAX_SIZE',
+                                   100000)
+# Время жизни объекта справочника в кэше процесса, секунд
+REFERENCE_CACHE_TIMEOUT = getattr(settings, 'REFERENCE_CACHE_TIMEOUT', 60)
+
+GENERATION_KEY = 'reference_cache_generation:{}'
+
+# Количество ключей в одном условии ``IN`` (``get_references``, поиск
+# по естественным ключам при импорте; ограничение числа параметров
+# запроса SQLite)
+REFERENCES_QUERY_MAX_KEYS = 900
+
+
+class LRUCache:
+    """Потокобезопасный кэш с ограничением количества элементов
+    и вытеснением давно не использованных (LRU). Элементы старше
+    ``timeout`` секунд считаются отсутствующими (None — без ограничения)."""
+
+    def __init__(self, max_size, timeout=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        expires = (None if self.timeout is None
+                   else time.monotonic() + self.timeout)
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+
+class ReferenceCache(LRUCache):
+    """Кэш объектов справочной модели (клиенты, почтовые пункты)
+    по первичному ключу. Отсутствующие объекты дозагружаются
+    одним запросом на всю группу ключей."""
+
+    def __init__(self, model, max_size, timeout=None):
+        super().__init__(max_size, timeout)
+        self.model = model
+        self.generation = None
+
+    @property
+    def generation_key(self):
+        return GENERATION_KEY.format(self.model._meta.label_lower)
+
+    def check_generation(self):
+        """Очистка кэша, если номер поколения модели в кэше Django
+        изменился (объекты изменены в другом процессе). Отсутствующий
+        номер создаётся случайным, как в кэше ответов."""
+        generation = django_cache.get(self.generation_key)
+        if generation is None:
+            django_cache.add(self.generation_key, random.getrandbits(48),
+                             None)
+            generation = django_cache.get(self.generation_key)
+        if generation != self.generation:
+            with self._lock:
+                self._data.clear()
+            self.generation = generation
+
+    def invalidate(self, pk=None):
+        """Сброс объекта ``pk`` (всех объектов, если не задан) в этом
+        процессе и новый номер поколения для остальных процессов."""
+        if pk is None:
+            with self._lock:
+                self._data.clear()
+        else:
+            self.delete(pk)
+        try:
+            generation = django_cache.incr(self.generation_key)
+        except ValueError:
+            return
+        # Свой кэш уже сброшен: без чужих изменений между проверкой
+        # и увеличением номера очищать его снова не нужно
+        if generation == (self.generation or 0) + 1:
+            self.generation = generation
+
+    def get_many(self, pks):
+        """Словарь ``{pk: объект}`` для существующих ``pks``."""
+        self.check_generation()
+        objects, missing = {}, []
+        for pk in pks:
+            obj = self.get(pk)
+            if obj is None:
+                missing.append(pk)
+            else:
+                objects[pk] = obj
+        if missing:
+            loaded = self.model.objects.in_bulk(missing)
+            for pk, obj in loaded.items():
+                self.set(pk, obj)
+            objects.update(loaded)
+        return objects
+
+    def preload(self):
+        """Заполнение кэша первыми ``max_size`` объектами модели."""
+        self.check_generation()
+        for obj in self.model.objects.order_by('pk')[:self.max_size]:
+            self.set(obj.pk, obj)
+
+
+clients_cache = ReferenceCache(Client, REFERENCE_CACHE_MAX_SIZE,
+                               REFERENCE_CACHE_TIMEOUT)
+post_offices_cache = ReferenceCache(PostOffice, REFERENCE_CACHE_MAX_SIZE,
+                                    REFERENCE_CACHE_TIMEOUT)
+
+REFERENCE_CACHES = {
+    Client: clients_cache,
+    PostOffice: post_offices_cache,
+}
+
+
+def load_references(keys):
+    """Объекты справочников по парам ``(модель, pk)`` одним запросом
+    UNION ALL: строки всех моделей дополняются NULL до одинаковой
+    ширины, первый столбец — номер модели."""
+    pks_by_model = {}
+    for model, pk in keys:
+        pks_by_model.setdefault(model, []).append(pk)
+    models = list(pks_by_model)
+    fields = {model: [field.attname for field in model._meta.concrete_fields]
+              for model in models}
+    width = max(map(len, fields.values()))
+    queries = [
+        model.objects.filter(pk__in=pks_by_model[model]).values_list(
+            Value(index, output_field=IntegerField()),
+            *(F(name) for name in fields[model]),
+            *[Value(None, output_field=CharField())]
+            * (width - len(fields[model])),
+        )
+        for index, model in enumerate(models)
+    ]
+    # Значения всех строк преобразуются по полям первого запроса:
+    # общее поле updated_at (см. ReferenceModel) у всех моделей вторым
+    queryset = queries[0].union(*queries[1:], all=True)
+    for index, *values in queryset:
+        model = models[index]
+        yield model.from_db(queryset.db, fields[model],
+                            values[:len(fields[model])])
+
+
+def get_references(pks_by_model, verify=False):
+    """Объекты справочников ``{Модель: {pk: объект}}`` для ключей
+    ``{Модель: pks}``. Объекты берутся из кэша, а промахи всех моделей
+    загружаются одним запросом (см. ``load_references``) и кэшируются.
+
+    С ``verify=True`` (проверка ссылок при записи) все объекты читаются
+    из БД тем же одним запросом: кэш процесса не знает об удалениях
+    в других процессах. Отсутствующие в БД объекты удаляются из кэша."""
+    objects, missing = {}, []
+    for model, pks in pks_by_model.items():
+        cache = REFERENCE_CACHES[model]
+        cache.check_generation()
+        objects[model] = {}
+        for pk in pks:
+            obj = None if verify else cache.get(pk)
+            if obj is None:
+                missing.append((model, pk))
+            else:
+                objects[model][pk] = obj
+    for start in range(0, len(missing), REFERENCES_QUERY_MAX_KEYS):
+        chunk = missing[start:start + REFERENCES_QUERY_MAX_KEYS]
+        for obj in load_references(chunk):
+            REFERENCE_CACHES[type(obj)].set(obj.pk, obj)
+            objects[type(obj)][obj.pk] = obj
+    if verify:
+        for model, pk in missing:
+            if pk not in objects[model]:
+                REFERENCE_CACHES[model].delete(pk)
+    return objects
+
+
+def attach_related(instances):
+    """Подстановка клиентов и почтовых пунктов из кэша в связи
+    писем/посылок ``instances`` без обращения к БД (кроме промахов кэша:
+    не более одного запроса на справочную таблицу)."""
+    if not instances:
+        return
+    fields_by_model = {}
+    for field in type(instances[0])._meta.concrete_fields:
+        if field.is_relation and field.related_model in REFERENCE_CACHES:
+            fields_by_model.setdefault(field.related_model, []).append(field)
+
+    for related_model, fields in fields_by_model.items():
+        pending = [
+            (field, instance)
+            for field in fields for instance in instances
+            if not field.is_cached(instance)
+        ]
+        if not pending:
+            continue
+        objects = REFERENCE_CACHES[related_model].get_many(
+            {getattr(instance, field.attname) for field, instance in pending}
+        )
+        for field, instance in pending:
+            related = objects.get(getattr(instance, field.attname))
+            if related is not None:
+                field.set_cached_value(instance, related)
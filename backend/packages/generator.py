@@ -0,0 +1,294 @@
+"""Генерация синтетических клиентов, почтовых пунктов, писем и посылок
+для воспроизведения проблем на больших объёмах (команда
+``generate_data``).
+
+Данные генерируются по столбцам и вставляются порциями через
+``executemany`` (см. ``snapshot.insert_columns``) с заранее известными
+первичными ключами, без создания объектов моделей. На время вставки
+отключается проверка внешних ключей (данные корректны по построению)
+и удаляются составные индексы отправлений: построить индекс по готовой
+таблице быстрее, чем обновлять его при вставке каждой строки.
+Результат определяется зерном генератора: одинаковые параметры дают
+одинаковые данные.
+
+Отправители, получатели и пункты выбираются с распределением Ципфа:
+вес k-го по популярности объекта пропорционален 1 / k ** skew
+(``skew=0`` — равномерное распределение), поэтому небольшая часть
+клиентов и пунктов участвует в большинстве отправлений, как в реальных
+данных.
+
+Случайные столбцы отправлений строятся без кода Python на каждую
+строку: случайные числа порции генерируются одним вызовом
+``randbytes``, а ключи по ним выбираются двоичным поиском
+по накопленным весам через ``map`` (см. ``WeightedChoice``).
+"""
+import contextlib
+import math
+import operator
+import random
+import time
+from bisect import bisect_right
+from itertools import accumulate, compress, repeat
+
+from django.db import connections, router
+from django.utils import timezone
+
+from letters_packages.transactions import atomic_write
+
+from . import snapshot
+from .models import Client, Letter, Package, PostOffice
+
+# Количество строк в одной транзакции
+BATCH_SIZE = 50000
+
+# Показатель распределения Ципфа по умолчанию
+SKEW = 1.0
+
+MALE_NAMES = ('Александр', 'Алексей', 'Андрей', 'Дмитрий', 'Иван',
+              'Максим', 'Михаил', 'Никита', 'Павел', 'Сергей')
+FEMALE_NAMES = ('Анна', 'Дарья', 'Екатерина', 'Елена', 'Мария',
+                'Наталья', 'Ольга', 'Полина', 'Светлана', 'Татьяна')
+# Мужские формы фамилий с окончаниями -ов/-ев/-ин (женские: + «а»)
+LASTNAMES = ('Иванов', 'Петров', 'Смирнов', 'Кузнецов', 'Попов',
+             'Васильев', 'Соколов', 'Михайлов', 'Новиков', 'Фёдоров',
+             'Морозов', 'Волков', 'Алексеев', 'Лебедев', 'Семёнов',
+             'Егоров', 'Павлов', 'Козлов', 'Степанов', 'Никитин')
+# Основы отчеств: мужское + «ич», женское + «на»
+PATRONYMICS = ('Александров', 'Алексеев', 'Андреев', 'Дмитриев',
+               'Иванов', 'Михайлов', 'Павлов', 'Сергеев')
+CITIES = ('Москва', 'Санкт-Петербург', 'Новосибирск', 'Екатеринбург',
+          'Казань', 'Нижний Новгород', 'Челябинск', 'Самара', 'Омск',
+          'Ростов-на-Дону', 'Уфа', 'Красноярск', 'Воронеж', 'Пермь')
+STREETS = ('ул. Ленина', 'ул. Советская', 'ул. Мира', 'ул. Садовая',
+           'ул. Школьная', 'Центральная ул.', 'ул. Гагарина',
+           'Молодёжная ул.', 'Набережная ул.', 'проспект Победы')
+
+# Номера телефонов +79XXXXXXXXX и индексы перебираются с шагом,
+# взаимно простым с размером диапазона: значения уникальны
+# и не идут подряд
+PHONE_RANGE = 10 ** 9
+PHONE_STEP = 3 ** 18
+INDEX_START = 100000
+INDEX_RANGE = 900000
+INDEX_STEP = 7 ** 7
+
+# Параметры логнормального распределения веса письма (г)
+# и суммы платежа за посылку (руб.)
+AMOUNTS = {
+    Letter: ('weight', 3.0, 1.0),
+    Package: ('cost', 6.0, 1.0),
+}
+
+# Разрядность и формат ``memoryview.cast`` случайных чисел выборки
+# ``WeightedChoice``
+RANDOM_BITS = 32
+RANDOM_FORMAT = 'I'
+
+
+class WeightedChoice:
+    """Случайный выбор ключей по накопленным весам ``cum_weights``
+    для больших выборок. Веса масштабируются в целые границы
+    до 2 ** RANDOM_BITS: ключ с номером k выбирается, если случайное
+    целое попало между границами k - 1 и k."""
+
+    def __init__(self, keys, cum_weights, rnd):
+        self.keys = list(keys)
+        cum_weights = list(cum_weights)
+        scale = (1 << RANDOM_BITS) / cum_weights[-1]
+        self.bounds = [int(weight * scale) for weight in cum_weights]
+        self.bounds[-1] = 1 << RANDOM_BITS
+        self.rnd = rnd
+
+    def sample(self, count):
+        values = memoryview(
+            self.rnd.randbytes(RANDOM_BITS // 8 * count)).cast(RANDOM_FORMAT)
+        return list(map(self.keys.__getitem__,
+                        map(bisect_right, repeat(self.bounds), values)))
+
+
+class SkewedChoice(WeightedChoice):
+    """Случайный выбор ключей с распределением Ципфа. Популярность
+    ключей назначается случайной перестановкой, чтобы популярными
+    были не только первые записи."""
+
+    def __init__(self, keys, skew, rnd):
+        keys = list(keys)
+        rnd.shuffle(keys)
+        super().__init__(keys, accumulate(
+            1 / rank ** skew for rank in range(1, len(keys) + 1)), rnd)
+
+    def pairs(self, count):
+        """Пары различных ключей (отправитель/получатель,
+        пункт отправки/пункт получения)."""
+        first, second = self.sample(count), self.sample(count)
+        for index in compress(range(count),
+                              map(operator.eq, first, second)):
+            while second[index] == first[index]:
+                second[index] = self.rnd.choice(self.keys)
+        return first, second
+
+
+def lognormal_amounts(mu, sigma, rnd):
+    """Выбор целых значений ``int(x) + 1`` для логнормальной величины x
+    по точным вероятностям каждого значения; значения дальше шести
+    сигм (вероятность меньше 1e-9) не выбираются."""
+    last = math.ceil(math.exp(mu + 6 * sigma))
+    return WeightedChoice(range(1, last + 1), (
+        0.5 * math.erfc((mu - math.log(value)) / (sigma * math.sqrt(2)))
+        for value in range(1, last + 1)), rnd)
+
+
+@contextlib.contextmanager
+def indexes_dropped(connection, models):
+    """Удаление индексов ``Meta.indexes`` моделей на время контекста
+    и их построение заново при выходе."""
+    editor = connection.schema_editor()
+    indexes = [(model, index) for model in models
+               for index in model._meta.indexes]
+    with connection.cursor() as cursor:
+        for model, index in indexes:
+            cursor.execute(str(index.remove_sql(model, editor)))
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for model, index in indexes:
+                cursor.execute(str(index.create_sql(model, editor)))
+
+
+class DataGenerator:
+    """Генерация данных заданного объёма в пустую БД."""
+
+    def __init__(self, seed=0, skew=SKEW, batch_size=BATCH_SIZE,
+                 progress=None):
+        self.rnd = random.Random(seed)
+        self.skew = skew
+        self.batch_size = batch_size
+        self.progress = progress
+        self.phone_offset = self.rnd.randrange(PHONE_RANGE)
+        self.index_offset = self.rnd.randrange(INDEX_RANGE)
+        self.connection = connections[router.db_for_write(Client)]
+
+    def batches(self, count):
+        """Диапазоны первичных ключей порций (ключи начинаются с 1)."""
+        for start in range(1, count + 1, self.batch_size):
+            yield range(start, min(start + self.batch_size, count + 1))
+
+    def insert(self, model, names, columns):
+        with atomic_write(using=self.connection.alias):
+            snapshot.insert_columns(self.connection, model, names, columns)
+
+    def generate(self, model, count, make_columns):
+        """Вставка ``count`` строк ``model`` порциями: ``make_columns``
+        возвращает имена полей и столбцы для диапазона ключей.
+        Возвращает время в секундах."""
+        start = time.perf_counter()
+        for ids in self.batches(count):
+            names, columns = make_columns(ids)
+            self.insert(model, names, columns)
+            if self.progress is not None:
+                self.progress(model, ids[-1])
+        return time.perf_counter() - start
+
+    def updated_at(self, model, count):
+        """Столбец времени изменения: текущее время для всех строк."""
+        value = model._meta.get_field('updated_at').get_db_prep_save(
+            timezone.now(), self.connection)
+        return [value] * count
+
+    def client_columns(self, ids):
+        rnd = self.rnd
+        count = len(ids)
+        female = [rnd.random() < 0.5 for _ in ids]
+        first_names = [rnd.choice(FEMALE_NAMES if is_female
+                                  else MALE_NAMES)
+                       for is_female in female]
+        lastnames = [name + 'а' if is_female else name
+                     for name, is_female in zip(
+                         rnd.choices(LASTNAMES, k=count), female)]
+        middle_names = [
+            None if rnd.random() < 0.1
+            else name + ('на' if is_female else 'ич')
+            for name, is_female in zip(
+                rnd.choices(PATRONYMICS, k=count), female)]
+        phones = [
+            f'+79{(self.phone_offset + pk * PHONE_STEP) % PHONE_RANGE:09d}'
+            for pk in ids]
+        return (('id', 'name', 'lastname', 'middle_name', 'phone_number',
+                 'phone_key', 'updated_at'),
+                (ids, first_names, lastnames, middle_names, phones, phones,
+                 self.updated_at(Client, count)))
+
+    def post_office_columns(self, ids):
+        rnd = self.rnd
+        addresses = [f'г. {rnd.choice(CITIES)}, {rnd.choice(STREETS)}, '
+                     f'д. {rnd.randint(1, 150)}' for _ in ids]
+        indexes = [
+            str(INDEX_START
+                + (self.index_offset + pk * INDEX_STEP) % INDEX_RANGE)
+            for pk in ids]
+        return (('id', 'address', 'postal_index', 'updated_at'),
+                (ids, addresses, indexes,
+                 self.updated_at(PostOffice, len(ids))))
+
+    def shipment_choices(self, model):
+        """Выбор категорий и сумм (веса, платежа) отправлений ``model``."""
+        _, mu, sigma = AMOUNTS[model]
+        categories = model._meta.get_field('category').choices
+        # Чем «проще» категория, тем она чаще встречается
+        category_values = [value for value, _ in categories]
+        return (
+            WeightedChoice(category_values, accumulate(
+                1 / rank for rank in range(1, len(category_values) + 1)),
+                self.rnd),
+            lognormal_amounts(mu, sigma, self.rnd),
+        )
+
+    def shipment_columns(self, model, clients, offices, choices, ids):
+        count = len(ids)
+        categories, amounts = choices
+        senders, recipients = clients.pairs(count)
+        departures, arrivals = offices.pairs(count)
+        return (
+            ('id', 'sender_id', 'recipient_id', 'departure_office_id',
+             'arrival_office_id', 'category', AMOUNTS[model][0], 'version',
+             'updated_at'),
+            (ids, senders, recipients, departures, arrivals,
+             categories.sample(count), amounts.sample(count), [1] * count,
+             self.updated_at(model, count)),
+        )
+
+    def run(self, clients, offices, letters=0, packages=0):
+        """Генерация всех моделей. Возвращает ``{модель: (строк, с)}``."""
+        if clients < 2 or offices < 2:
+            raise ValueError('Нужно не меньше двух клиентов и двух пунктов')
+        if offices > INDEX_RANGE:
+            raise ValueError(f'Не больше {INDEX_RANGE} почтовых пунктов '
+                             f'(индекс пункта уникален)')
+        if clients > PHONE_RANGE:
+            raise ValueError(f'Не больше {PHONE_RANGE} клиентов')
+        with self.connection.constraint_checks_disabled():
+            timings = {
+                Client: (clients, self.generate(Client, clients,
+                                                self.client_columns)),
+                PostOffice: (offices, self.generate(
+                    PostOffice, offices, self.post_office_columns)),
+            }
+            client_choice = SkewedChoice(range(1, clients + 1), self.skew,
+                                         self.rnd)
+            office_choice = SkewedChoice(range(1, offices + 1), self.skew,
+                                         self.rnd)
+            for model, count in ((Letter, letters), (Package, packages)):
+                start = time.perf_counter()
+                choices = self.shipment_choices(model)
+                with indexes_dropped(self.connection, [model]):
+                    self.generate(
+                        model, count,
+                        lambda ids, model=model: self.shipment_columns(
+                            model, client_choice, office_choice, choices,
+                            ids))
+                timings[model] = (count, time.perf_counter() - start)
+        with atomic_write(using=self.connection.alias):
+            snapshot.finish_load(self.connection)
+        snapshot.drop_caches()
+        return timings
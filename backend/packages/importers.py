@@ -0,0 +1,318 @@
+"""Потоковый импорт клиентов, почтовых пунктов, писем и посылок
+из CSV-файлов (см. команду ``fill_db``).
+
+Файл читается построчно и сохраняется порциями: каждая порция — одна
+транзакция и один ``bulk_create``, поэтому объём памяти не зависит
+от размера файла. Внешние ключи задаются естественными ключами
+(номер телефона клиента, почтовый индекс пункта) и разрешаются одним
+запросом на справочную модель для всей порции. Ошибочные строки
+пропускаются и попадают в отчёт с номером строки файла.
+"""
+import csv
+import time
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db import connections, router
+from django.utils import timezone
+
+from letters_packages.transactions import atomic_write
+
+from . import read_model, search
+from .cache import REFERENCES_QUERY_MAX_KEYS
+from .models import (OFFICES_ERROR, SENDER_RECIPIENT_ERROR, Client, Letter,
+                     Package, PostOffice, normalize_phone)
+from .signals import shipments_changed
+
+# Количество строк, сохраняемых в одной транзакции
+BATCH_SIZE = 5000
+
+# Количество ошибок, сохраняемых для отчёта (остальные только считаются)
+MAX_STORED_ERRORS = 100
+
+RowError = namedtuple('RowError', 'line message')
+
+
+class ImportResult:
+    """Итог импорта одного файла."""
+
+    def __init__(self, model, max_errors=MAX_STORED_ERRORS):
+        self.model = model
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+        self.max_errors = max_errors
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows(self):
+        return self.created + self.error_count
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(RowError(line, message))
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+
+def error_message(error):
+    """Текст ошибки проверки строки в одну строку."""
+    if hasattr(error, 'error_dict'):
+        return '; '.join(f'{field}: {" ".join(messages)}'
+                         for field, messages in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+def lookup(model, field, values, *fields):
+    """Кортежи ``fields`` объектов ``model``, у которых значение ``field``
+    входит в ``values``; запрашиваются частями
+    по REFERENCES_QUERY_MAX_KEYS."""
+    values = list(values)
+    for start in range(0, len(values), REFERENCES_QUERY_MAX_KEYS):
+        yield from model.objects.filter(**{
+            f'{field}__in': values[start:start + REFERENCES_QUERY_MAX_KEYS]
+        }).values_list(*fields)
+
+
+class CSVImporter:
+    """Базовый импорт модели: ``resolve`` загружает данные, общие для
+    порции строк (например, внешние ключи), ``build`` создаёт объект
+    из строки или выбрасывает ``ValidationError``."""
+    model = None
+    columns = ()
+
+    def resolve(self, rows):
+        return None
+
+    def build(self, row, context):
+        raise NotImplementedError
+
+    def start(self):
+        """Действия перед загрузкой файла."""
+
+    def finish(self):
+        """Действия после загрузки всего файла."""
+
+    def run(self, file, batch_size=BATCH_SIZE, delimiter=';',
+            max_errors=MAX_STORED_ERRORS, progress=None):
+        result = ImportResult(self.model, max_errors)
+        reader = csv.DictReader(file, delimiter=delimiter)
+        missing = [column for column in self.columns
+                   if column not in (reader.fieldnames or ())]
+        if missing:
+            result.add_error(1, f'Нет столбцов: {", ".join(missing)}')
+            result.finish()
+            return result
+        self.start()
+        try:
+            batch = []
+            for row in reader:
+                batch.append((reader.line_num, row))
+                if len(batch) == batch_size:
+                    self.save_batch(batch, result)
+                    batch = []
+                    if progress is not None:
+                        progress(result)
+            if batch:
+                self.save_batch(batch, result)
+        finally:
+            # Порции, сохранённые до ошибки чтения файла или записи,
+            # уже зафиксированы: поиск и модель чтения обновляются
+            # и для них
+            self.finish()
+        result.finish()
+        return result
+
+    def save_batch(self, batch, result):
+        context = self.resolve([row for _, row in batch])
+        objs = []
+        for line, row in batch:
+            try:
+                objs.append(self.build(row, context))
+            except ValidationError as error:
+                result.add_error(line, error_message(error))
+        with atomic_write(using=router.db_for_write(self.model)):
+            self.insert(objs)
+        result.created += len(objs)
+
+    def insert(self, objs):
+        self.model.objects.bulk_create(objs)
+
+
+class ClientImporter(CSVImporter):
+    model = Client
+    columns = ('name', 'lastname', 'middle_name', 'phone_number')
+
+    def resolve(self, rows):
+        keys = {normalize_phone(row['phone_number']) for row in rows}
+        return {key for key, in lookup(Client, 'phone_key', keys,
+                                       'phone_key')}
+
+    def build(self, row, existing):
+        client = Client(name=row['name'],
+                        lastname=row['lastname'],
+                        middle_name=row['middle_name'] or None,
+                        phone_number=row['phone_number'])
+        client.clean_fields(exclude=['phone_key'])
+        client.phone_key = normalize_phone(client.phone_number)
+        if client.phone_key in existing:
+            raise ValidationError({'phone_number': ValidationError(
+                'Клиент с таким номером телефона уже существует',
+                code='unique')})
+        # Повтор номера в той же порции тоже считается дубликатом
+        existing.add(client.phone_key)
+        return client
+
+    def finish(self):
+        search.rebuild([Client])
+
+
+class PostOfficeImporter(CSVImporter):
+    """Импорт почтовых пунктов: индекс — естественный ключ пункта
+    в файлах отправлений, поэтому повторяющиеся индексы пропускаются."""
+    model = PostOffice
+    columns = ('address', 'postal_index')
+
+    def resolve(self, rows):
+        indexes = {row['postal_index'] for row in rows}
+        return {index for index, in lookup(PostOffice, 'postal_index',
+                                           indexes, 'postal_index')}
+
+    def build(self, row, existing):
+        office = PostOffice(address=row['address'],
+                            postal_index=row['postal_index'])
+        office.clean_fields()
+        if office.postal_index in existing:
+            raise ValidationError({'postal_index': ValidationError(
+                'Почтовый пункт с таким индексом уже существует',
+                code='unique')})
+        existing.add(office.postal_index)
+        return office
+
+    def finish(self):
+        search.rebuild([PostOffice])
+
+
+class ShipmentImporter(CSVImporter):
+    """Импорт писем/посылок: клиенты задаются номерами телефонов,
+    пункты — почтовыми индексами (индекс должен принадлежать
+    одному пункту).
+
+    Строка проверяется полями модели и сохраняется кортежем значений
+    одним ``executemany`` на порцию: создание объектов модели
+    и компиляция ``bulk_create`` занимают большую часть времени
+    импорта больших файлов."""
+    amount_field = None
+    relation_fields = ('sender', 'recipient', 'departure_office',
+                       'arrival_office')
+
+    @property
+    def columns(self):
+        return ('sender_phone', 'recipient_phone', 'departure_index',
+                'arrival_index', 'category', self.amount_field)
+
+    def resolve(self, rows):
+        phone_keys = {normalize_phone(row[column]) for row in rows
+                      for column in ('sender_phone', 'recipient_phone')}
+        indexes = {row[column] for row in rows
+                   for column in ('departure_index', 'arrival_index')}
+        clients = dict(lookup(Client, 'phone_key', phone_keys,
+                              'phone_key', 'pk'))
+        offices = {}
+        for index, pk in lookup(PostOffice, 'postal_index', indexes,
+                                'postal_index', 'pk'):
+            # None — индекс нескольких пунктов, ссылка неоднозначна
+            offices[index] = None if index in offices else pk
+        return clients, offices
+
+    def build(self, row, context):
+        clients, offices = context
+        errors = {}
+        values = {}
+        for field, column in (('sender', 'sender_phone'),
+                              ('recipient', 'recipient_phone')):
+            values[field] = clients.get(normalize_phone(row[column]))
+            if values[field] is None:
+                errors[field] = (f'Клиент с номером телефона '
+                                 f'{row[column]} не найден')
+        for field, column in (('departure_office', 'departure_index'),
+                              ('arrival_office', 'arrival_index')):
+            values[field] = offices.get(row[column])
+            if values[field] is None:
+                errors[field] = (
+                    f'Почтовый пункт с индексом {row[column]} '
+                    + ('не единственный' if row[column] in offices
+                       else 'не найден'))
+        for name in ('category', self.amount_field):
+            try:
+                values[name] = self.model._meta.get_field(name).clean(
+                    row[name], None)
+            except ValidationError as error:
+                errors[name] = error.messages
+        if errors:
+            raise ValidationError(errors)
+        if values['sender'] == values['recipient']:
+            raise ValidationError(SENDER_RECIPIENT_ERROR)
+        if values['departure_office'] == values['arrival_office']:
+            raise ValidationError(OFFICES_ERROR)
+        return tuple(values[name] for name in self.value_fields)
+
+    @property
+    def value_fields(self):
+        return (*self.relation_fields, 'category', self.amount_field)
+
+    def insert(self, rows):
+        if not rows:
+            return
+        opts = self.model._meta
+        connection = connections[router.db_for_write(self.model)]
+        quote = connection.ops.quote_name
+        # Новая запись: начальная версия и время изменения
+        version = opts.get_field('version').get_default()
+        updated_at = opts.get_field('updated_at').get_db_prep_save(
+            timezone.now(), connection)
+        columns = [opts.get_field(name).column
+                   for name in (*self.value_fields, 'version', 'updated_at')]
+        sql = (f'INSERT INTO {quote(opts.db_table)} '
+               f'({", ".join(quote(column) for column in columns)}) '
+               f'VALUES ({", ".join(["%s"] * len(columns))})')
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                sql, [(*row, version, updated_at) for row in rows])
+
+    def start(self):
+        self.last_pk = read_model.get_last_pk(self.model)
+
+    def finish(self):
+        # Вставка не вызывает сигналов сохранения: модель чтения
+        # (по диапазону ключей созданных записей), статистика и кэш
+        # ответов обновляются одним сигналом
+        shipments_changed.send(
+            sender=self.model,
+            pks=read_model.pks_created_after(self.model, self.last_pk))
+
+
+class LetterImporter(ShipmentImporter):
+    model = Letter
+    amount_field = 'weight'
+
+
+class PackageImporter(ShipmentImporter):
+    model = Package
+    amount_field = 'cost'
+
+
+# Порядок импорта: справочники раньше ссылающихся на них отправлений
+IMPORTERS = {
+    'clients': ClientImporter,
+    'post_offices': PostOfficeImporter,
+    'letters': LetterImporter,
+    'packages': PackageImporter,
+}
@@ -0,0 +1,62 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackageListing',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('sender_name', models.CharField(max_length=152)),
+                ('recipient_name', models.CharField(max_length=152)),
+                ('recipient_phone', models.CharField(max_length=50)),
+                ('departure_address', models.CharField(max_length=150)),
+                ('departure_index', models.CharField(max_length=6)),
+                ('arrival_address', models.CharField(max_length=150)),
+                ('arrival_index', models.CharField(max_length=6)),
+                ('category', models.IntegerField()),
+                ('category_label', models.CharField(max_length=50)),
+                ('cost', models.PositiveIntegerField()),
+                ('arrival_office', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.postoffice')),
+                ('departure_office', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.postoffice')),
+                ('recipient', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.client')),
+                ('sender', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.client')),
+            ],
+            options={
+                'verbose_name': 'Запись списка посылок',
+                'verbose_name_plural': 'Записи списка посылок',
+            },
+        ),
+        migrations.CreateModel(
+            name='LetterListing',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('sender_name', models.CharField(max_length=152)),
+                ('recipient_name', models.CharField(max_length=152)),
+                ('recipient_phone', models.CharField(max_length=50)),
+                ('departure_address', models.CharField(max_length=150)),
+                ('departure_index', models.CharField(max_length=6)),
+                ('arrival_address', models.CharField(max_length=150)),
+                ('arrival_index', models.CharField(max_length=6)),
+                ('category', models.IntegerField()),
+                ('category_label', models.CharField(max_length=50)),
+                ('weight', models.PositiveIntegerField()),
+                ('arrival_office', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.postoffice')),
+                ('departure_office', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.postoffice')),
+                ('recipient', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.client')),
+                ('sender', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.client')),
+            ],
+            options={
+                'verbose_name': 'Запись списка писем',
+                'verbose_name_plural': 'Записи списка писем',
+            },
+        ),
+    ]
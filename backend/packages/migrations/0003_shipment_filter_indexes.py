@@ -0,0 +1,180 @@
+# Generated by Django 3.2.3 on 2026-10-18 06:53
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0002_shipment_listings'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='letter',
+            name='arrival_office',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sent_letter_to', to='packages.postoffice', verbose_name='Пункт получения'),
+        ),
+        migrations.AlterField(
+            model_name='letter',
+            name='departure_office',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sent_letter_from', to='packages.postoffice', verbose_name='Пункт отправки'),
+        ),
+        migrations.AlterField(
+            model_name='letter',
+            name='recipient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='letter_recipient', to='packages.client', verbose_name='Получатель'),
+        ),
+        migrations.AlterField(
+            model_name='letter',
+            name='sender',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='letter_sender', to='packages.client', verbose_name='Отправитель'),
+        ),
+        migrations.AlterField(
+            model_name='letterlisting',
+            name='arrival_office',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.postoffice'),
+        ),
+        migrations.AlterField(
+            model_name='letterlisting',
+            name='departure_office',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.postoffice'),
+        ),
+        migrations.AlterField(
+            model_name='letterlisting',
+            name='recipient',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.client'),
+        ),
+        migrations.AlterField(
+            model_name='letterlisting',
+            name='sender',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.client'),
+        ),
+        migrations.AlterField(
+            model_name='package',
+            name='arrival_office',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sent_package_to', to='packages.postoffice', verbose_name='Пункт получения'),
+        ),
+        migrations.AlterField(
+            model_name='package',
+            name='departure_office',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sent_package_from', to='packages.postoffice', verbose_name='Пункт отправки'),
+        ),
+        migrations.AlterField(
+            model_name='package',
+            name='recipient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='package_recipient', to='packages.client', verbose_name='Получатель'),
+        ),
+        migrations.AlterField(
+            model_name='package',
+            name='sender',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='package_sender', to='packages.client', verbose_name='Отправитель'),
+        ),
+        migrations.AlterField(
+            model_name='packagelisting',
+            name='arrival_office',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.postoffice'),
+        ),
+        migrations.AlterField(
+            model_name='packagelisting',
+            name='departure_office',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.postoffice'),
+        ),
+        migrations.AlterField(
+            model_name='packagelisting',
+            name='recipient',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.client'),
+        ),
+        migrations.AlterField(
+            model_name='packagelisting',
+            name='sender',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='packages.client'),
+        ),
+        migrations.AlterField(
+            model_name='postoffice',
+            name='postal_index',
+            field=models.CharField(db_index=True, max_length=6, validators=[django.core.validators.RegexValidator(code='invalid_postal_index', message='Введите почтовый индекс из шести цифр', regex='^\\d{6}$')], verbose_name='Почтовый индекс'),
+        ),
+        migrations.AddIndex(
+            model_name='letter',
+            index=models.Index(fields=['departure_office', 'category', 'weight'], name='letter_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='letter',
+            index=models.Index(fields=['arrival_office', 'category', 'weight'], name='letter_arrival_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='letter',
+            index=models.Index(fields=['sender', 'category'], name='letter_sender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='letter',
+            index=models.Index(fields=['recipient', 'category'], name='letter_recipient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='letter',
+            index=models.Index(fields=['category', 'weight'], name='letter_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='letterlisting',
+            index=models.Index(fields=['departure_office', 'category', 'weight'], name='letterlisting_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='letterlisting',
+            index=models.Index(fields=['arrival_office', 'category', 'weight'], name='letterlisting_arrival_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='letterlisting',
+            index=models.Index(fields=['sender', 'category'], name='letterlisting_sender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='letterlisting',
+            index=models.Index(fields=['recipient', 'category'], name='letterlisting_recipient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='letterlisting',
+            index=models.Index(fields=['category', 'weight'], name='letterlisting_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['departure_office', 'category', 'cost'], name='package_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['arrival_office', 'category', 'cost'], name='package_arrival_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['sender', 'category'], name='package_sender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['recipient', 'category'], name='package_recipient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='package',
+            index=models.Index(fields=['category', 'cost'], name='package_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagelisting',
+            index=models.Index(fields=['departure_office', 'category', 'cost'], name='packagelisting_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagelisting',
+            index=models.Index(fields=['arrival_office', 'category', 'cost'], name='packagelisting_arrival_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagelisting',
+            index=models.Index(fields=['sender', 'category'], name='packagelisting_sender_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagelisting',
+            index=models.Index(fields=['recipient', 'category'], name='packagelisting_recipient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagelisting',
+            index=models.Index(fields=['category', 'cost'], name='packagelisting_category_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+FTS_TABLES = {
+    'packages_postoffice': ('packages_postoffice_fts', ('address',)),
+    'packages_client': ('packages_client_fts',
+                        ('name', 'lastname', 'middle_name')),
+}
+
+
+def create_fts_tables(apps, schema_editor):
+    """Создание и заполнение таблиц FTS5 (только для SQLite)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for source, (table, columns) in FTS_TABLES.items():
+        values = ', '.join(f"COALESCE({column}, '')" for column in columns)
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {table} '
+            f'USING fts5({", ".join(columns)}, tokenize="unicode61")'
+        )
+        schema_editor.execute(
+            f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+            f'SELECT id, {values} FROM {source}'
+        )
+
+
+def drop_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, _ in FTS_TABLES.values():
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0003_shipment_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_tables, drop_fts_tables),
+    ]
@@ -0,0 +1,85 @@
+import re
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# Количество клиентов, читаемых и обновляемых за один запрос
+BATCH_SIZE = 1000
+
+
+def normalize_phone(phone_number):
+    digits = re.sub(r'\D', '', phone_number or '')
+    if len(digits) == 11 and digits[0] in '78':
+        digits = digits[1:]
+    if len(digits) != 10:
+        return None
+    return f'+7{digits}'
+
+
+def fill_phone_keys(apps, schema_editor):
+    """Заполнение ключей номеров телефонов существующих клиентов.
+
+    Клиенты читаются порциями по первичному ключу. У пустых номеров
+    и номеров, которые не приводятся к +7XXXXXXXXXX, ключа нет (NULL),
+    такие клиенты друг другу не мешают. Ключ уникален: если у нескольких
+    клиентов один и тот же номер, миграция прерывается со списком всех
+    таких номеров и клиентов."""
+    Client = apps.get_model('packages', 'Client')
+    last_pk = 0
+    while True:
+        clients = list(Client.objects.filter(pk__gt=last_pk)
+                       .order_by('pk').only('id', 'phone_number')
+                       [:BATCH_SIZE])
+        if not clients:
+            break
+        for client in clients:
+            client.phone_key = normalize_phone(client.phone_number)
+        Client.objects.bulk_update(clients, ['phone_key'])
+        last_pk = clients[-1].pk
+    duplicates = (Client.objects.filter(phone_key__isnull=False)
+                  .values('phone_key').annotate(count=Count('id'))
+                  .filter(count__gt=1).values('phone_key'))
+    conflicts = {}
+    for phone_key, pk in (Client.objects
+                          .filter(phone_key__in=duplicates)
+                          .order_by('phone_key', 'pk')
+                          .values_list('phone_key', 'pk').iterator()):
+        conflicts.setdefault(phone_key, []).append(str(pk))
+    if conflicts:
+        raise ValueError(
+            'Номера телефонов повторяются у нескольких клиентов: '
+            + '; '.join(f'{phone_key} (клиенты {", ".join(pks)})'
+                        for phone_key, pks in conflicts.items())
+            + '. Объедините таких клиентов перед применением миграции.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0004_fulltext_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='phone_key',
+            field=models.CharField(editable=False, max_length=12, null=True,
+                                   verbose_name='Ключ номера телефона'),
+        ),
+        migrations.RunPython(fill_phone_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='client',
+            name='phone_key',
+            field=models.CharField(
+                editable=False,
+                help_text='Нормализованный номер телефона: один клиент на '
+                          'номер (пусто, если номер не приводится '
+                          'к +7XXXXXXXXXX)',
+                max_length=12,
+                null=True,
+                unique=True,
+                verbose_name='Ключ номера телефона',
+            ),
+        ),
+    ]
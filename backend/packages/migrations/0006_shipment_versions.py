@@ -0,0 +1,48 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+MODELS = ('Letter', 'Package', 'LetterListing', 'PackageListing')
+
+
+def set_updated_at(apps, schema_editor):
+    """Одинаковое время изменения у отправлений и записей модели чтения
+    (от него зависят ETag)."""
+    now = timezone.now()
+    for name in MODELS:
+        apps.get_model('packages', name).objects.update(updated_at=now)
+
+
+def versioned_fields(model_name, listing=False):
+    return [
+        migrations.AddField(
+            model_name=model_name,
+            name='version',
+            field=(models.PositiveIntegerField(default=1) if listing else
+                   models.PositiveIntegerField(default=1, editable=False,
+                                               verbose_name='Версия')),
+            preserve_default=not listing,
+        ),
+        migrations.AddField(
+            model_name=model_name,
+            name='updated_at',
+            field=(models.DateTimeField(default=timezone.now) if listing else
+                   models.DateTimeField(auto_now=True,
+                                        verbose_name='Время изменения')),
+            preserve_default=False,
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0005_client_phone_key'),
+    ]
+
+    operations = [
+        *versioned_fields('letter'),
+        *versioned_fields('package'),
+        *versioned_fields('letterlisting', listing=True),
+        *versioned_fields('packagelisting', listing=True),
+        migrations.RunPython(set_updated_at, migrations.RunPython.noop),
+    ]
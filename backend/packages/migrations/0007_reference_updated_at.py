@@ -0,0 +1,20 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packages', '0006_shipment_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name=model_name,
+            name='updated_at',
+            field=models.DateTimeField(default=timezone.now,
+                                       editable=False,
+                                       verbose_name='Время изменения'),
+        )
+        for model_name in ('client', 'postoffice')
+    ]
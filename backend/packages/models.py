@@ -1,9 +1,103 @@
+import re
+
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
+from django.utils import timezone
+
+
+def normalize_phone(phone_number):
+    """Ключ номера телефона: только цифры с ведущей +7
+    (допускаются форматы 8XXXXXXXXXX, 7XXXXXXXXXX и 10 цифр без кода).
+    Для пустого номера или номера другой длины ключа нет (``None``)."""
+    digits = re.sub(r'\D', '', phone_number or '')
+    if len(digits) == 11 and digits[0] in '78':
+        digits = digits[1:]
+    if len(digits) != 10:
+        return None
+    return f'+7{digits}'
+
+
+class ReferenceQuerySet(models.QuerySet):
+    """Массовое изменение справочных записей в обход ``save()``: если
+    меняются выводимые поля ``display_fields``, обновляется время
+    изменения (от него зависят ETag отправлений) и отправляется сигнал
+    ``references_changed`` с ключами изменённых записей."""
+
+    def update(self, **kwargs):
+        if kwargs.keys().isdisjoint(self.model.display_fields):
+            return super().update(**kwargs)
+        from .signals import references_changed
+
+        kwargs.setdefault('updated_at', timezone.now())
+        # Ключи до изменения: после него условие выборки может
+        # перестать выполняться
+        pks = list(self.values_list('pk', flat=True))
+        count = super().update(**kwargs)
+        references_changed.send(sender=self.model, pks=pks)
+        return count
+
+
+class ClientQuerySet(ReferenceQuerySet):
+    """Заполнение ключа номера телефона при массовых операциях,
+    которые не вызывают ``Client.save()``."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.phone_key = normalize_phone(obj.phone_number)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def update(self, **kwargs):
+        if isinstance(kwargs.get('phone_number'), str):
+            kwargs['phone_key'] = normalize_phone(kwargs['phone_number'])
+        return super().update(**kwargs)
+
+
+class ReferenceModel(models.Model):
+    """Справочная запись (клиент, почтовый пункт), данные которой
+    выводятся в письмах и посылках. Время изменения меняется, только
+    когда меняются выводимые поля ``display_fields``: от него зависят
+    ETag ссылающихся отправлений, поэтому сами отправления
+    при изменении справочника не обновляются."""
+    display_fields = ()
+
+    updated_at = models.DateTimeField(default=timezone.now,
+                                      editable=False,
+                                      verbose_name='Время изменения',)
+
+    class Meta:
+        abstract = True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_display = instance.display_values()
+        return instance
 
-class Client(models.Model):
+    def display_values(self):
+        return tuple(self.__dict__.get(name) for name in self.display_fields)
+
+    def save(self, *args, **kwargs):
+        """Сохранение записи; ``display_changed`` — изменились ли
+        выводимые поля (для новой записи — всегда)."""
+        self.display_changed = (
+            self._state.adding
+            or self.display_values() != getattr(self, '_loaded_display',
+                                                None))
+        if self.display_changed:
+            self.updated_at = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'updated_at'}
+        super().save(*args, **kwargs)
+        self._loaded_display = self.display_values()
+
+
+class Client(ReferenceModel):
     """Модель клиентов (отправитель/получатель)"""
+    display_fields = ('name', 'lastname', 'middle_name', 'phone_number')
+
     name = models.CharField(max_length=50, verbose_name='Имя',)
     lastname = models.CharField(max_length=50, verbose_name='Фамилия',)
     middle_name = models.CharField(max_length=50,
@@ -18,6 +112,17 @@ class Client(models.Model):
             message='Введите номер телефона в формате +7XXXXXXXXXX',
             code='invalid_phone_number')],
     )
+    phone_key = models.CharField(
+        max_length=12,
+        unique=True,
+        null=True,
+        editable=False,
+        verbose_name='Ключ номера телефона',
+        help_text='Нормализованный номер телефона: один клиент на номер '
+                  '(пусто, если номер не приводится к +7XXXXXXXXXX)',
+    )
+
+    objects = ClientQuerySet.as_manager()
 
     @property
     def full_name(self):
@@ -31,12 +136,33 @@ class Client(models.Model):
     def __str__(self):
         return self.full_name
 
+    def save(self, *args, **kwargs):
+        self.phone_key = normalize_phone(self.phone_number)
+        super().save(*args, **kwargs)
+
+    def validate_unique(self, exclude=None):
+        """Проверка уникальности номера телефона по нормализованному
+        ключу (сам ключ не редактируется и в формах не участвует)."""
+        super().validate_unique(exclude)
+        phone_key = normalize_phone(self.phone_number)
+        if exclude and 'phone_number' in exclude or phone_key is None:
+            return
+        duplicate = Client.objects.filter(
+            phone_key=phone_key).exclude(pk=self.pk)
+        if duplicate.exists():
+            raise ValidationError({'phone_number': ValidationError(
+                'Клиент с таким номером телефона уже существует',
+                code='unique')})
+
 
-class PostOffice(models.Model):
+class PostOffice(ReferenceModel):
     """Модель почтовых отделений (пункт отправки/пункт получения)"""
+    display_fields = ('address', 'postal_index')
+
     address = models.CharField(max_length=150, verbose_name='Адрес ПО',)
     postal_index = models.CharField(
         max_length=6,
+        db_index=True,
         verbose_name='Почтовый индекс',
         validators=[RegexValidator(
             regex=r'^\d{6}$',
@@ -44,6 +170,8 @@ class PostOffice(models.Model):
             code='invalid_postal_index')],
     )
 
+    objects = ReferenceQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Почтовое отделение'
         verbose_name_plural = 'Почтовые отделения'
@@ -52,23 +180,112 @@ class PostOffice(models.Model):
         return self.address
 
 
-class Letter(models.Model):
+class VersionConflict(Exception):
+    """Запись изменена другим запросом после её загрузки."""
+
+
+class VersionedQuerySet(models.QuerySet):
+    """Массовое изменение увеличивает версию и время изменения записей
+    (``update()`` без аргументов только обновляет версию). Массовое
+    удаление отправляет один сигнал ``shipments_changed``."""
+
+    def update(self, **kwargs):
+        kwargs.setdefault('version', models.F('version') + 1)
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+    def delete(self):
+        from . import read_model
+        from .signals import shipments_changed
+        pks = None
+        if read_model.is_enabled():
+            pks = list(self.values_list('pk', flat=True))
+        result = super().delete()
+        shipments_changed.send(sender=self.model, pks=pks)
+        return result
+
+
+class VersionedModel(models.Model):
+    """Запись с версией для условных запросов (ETag) и оптимистической
+    блокировки: сохранение изменяет запись, только если её версия в БД
+    не изменилась после загрузки, иначе — ``VersionConflict``."""
+    version = models.PositiveIntegerField(default=1,
+                                          editable=False,
+                                          verbose_name='Версия',)
+    updated_at = models.DateTimeField(auto_now=True,
+                                      verbose_name='Время изменения',)
+
+    objects = VersionedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version',
+                                       'updated_at'}
+        self.version += 1
+        try:
+            super().save(*args, **kwargs)
+        except VersionConflict:
+            self.version -= 1
+            raise
+
+    def delete(self, *args, **kwargs):
+        """Удаление записи с сигналом ``shipments_changed`` вместо
+        post_delete: обработчики post_delete писем и посылок отключили бы
+        быстрое каскадное удаление отправлений одним запросом при
+        удалении клиента или почтового пункта (см. packages/signals.py).
+        """
+        from .signals import shipments_changed
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        shipments_changed.send(sender=type(self), pks=[pk])
+        return result
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields,
+                   forced_update):
+        if self._state.adding:
+            return super()._do_update(base_qs, using, pk_val, values,
+                                      update_fields, forced_update)
+        base_qs = base_qs.filter(version=self.version - 1)
+        if not super()._do_update(base_qs, using, pk_val, values,
+                                  update_fields, forced_update):
+            raise VersionConflict(
+                f'{self._meta.verbose_name} {pk_val}: запись изменена '
+                f'или удалена другим запросом')
+        return True
+
+
+# Ошибки проверки различия полей отправлений (API и импорт CSV)
+SENDER_RECIPIENT_ERROR = 'Отправитель и получатель должны быть разные'
+OFFICES_ERROR = 'Пункты отправления и получения должны быть разные'
+
+
+class Letter(VersionedModel):
     """Модель писем"""
     sender = models.ForeignKey(Client,
                                related_name='letter_sender',
                                on_delete=models.CASCADE,
+                               db_index=False,
                                verbose_name='Отправитель',)
     recipient = models.ForeignKey(Client,
                                   related_name='letter_recipient',
                                   on_delete=models.CASCADE,
+                                  db_index=False,
                                   verbose_name='Получатель',)
     departure_office = models.ForeignKey(PostOffice,
                                          related_name='sent_letter_from',
                                          on_delete=models.CASCADE,
+                                         db_index=False,
                                          verbose_name='Пункт отправки',)
     arrival_office = models.ForeignKey(PostOffice,
                                        related_name='sent_letter_to',
                                        on_delete=models.CASCADE,
+                                       db_index=False,
                                        verbose_name='Пункт получения',)
 
     class LetterType(models.IntegerChoices):
@@ -89,6 +306,20 @@ class Letter(models.Model):
     class Meta:
         verbose_name = 'Письмо'
         verbose_name_plural = 'Письма'
+        # Составные индексы под фильтры API (см. api/filters.py);
+        # заменяют одиночные индексы внешних ключей.
+        indexes = [
+            models.Index(fields=['departure_office', 'category', 'weight'],
+                         name='letter_departure_idx'),
+            models.Index(fields=['arrival_office', 'category', 'weight'],
+                         name='letter_arrival_idx'),
+            models.Index(fields=['sender', 'category'],
+                         name='letter_sender_idx'),
+            models.Index(fields=['recipient', 'category'],
+                         name='letter_recipient_idx'),
+            models.Index(fields=['category', 'weight'],
+                         name='letter_category_idx'),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=~models.Q(sender=models.F('recipient')),
@@ -101,23 +332,27 @@ class Letter(models.Model):
         ]
 
 
-class Package(models.Model):
+class Package(VersionedModel):
     """Модель посылок"""
     sender = models.ForeignKey(Client,
                                related_name='package_sender',
                                on_delete=models.CASCADE,
+                               db_index=False,
                                verbose_name='Отправитель',)
     recipient = models.ForeignKey(Client,
                                   related_name='package_recipient',
                                   on_delete=models.CASCADE,
+                                  db_index=False,
                                   verbose_name='Получатель',)
     departure_office = models.ForeignKey(PostOffice,
                                          related_name='sent_package_from',
                                          on_delete=models.CASCADE,
+                                         db_index=False,
                                          verbose_name='Пункт отправки',)
     arrival_office = models.ForeignKey(PostOffice,
                                        related_name='sent_package_to',
                                        on_delete=models.CASCADE,
+                                       db_index=False,
                                        verbose_name='Пункт получения',)
 
     class PackageType(models.IntegerChoices):
@@ -140,6 +375,18 @@ class Package(models.Model):
     class Meta:
         verbose_name = 'Посылка'
         verbose_name_plural = 'Посылки'
+        indexes = [
+            models.Index(fields=['departure_office', 'category', 'cost'],
+                         name='package_departure_idx'),
+            models.Index(fields=['arrival_office', 'category', 'cost'],
+                         name='package_arrival_idx'),
+            models.Index(fields=['sender', 'category'],
+                         name='package_sender_idx'),
+            models.Index(fields=['recipient', 'category'],
+                         name='package_recipient_idx'),
+            models.Index(fields=['category', 'cost'],
+                         name='package_category_idx'),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=~models.Q(sender=models.F('recipient')),
@@ -150,3 +397,86 @@ class Package(models.Model):
                 name='package_and_arrival_different',
             ),
         ]
+
+
+class ShipmentListing(models.Model):
+    """Денормализованная запись для чтения списков писем/посылок:
+    отображаемые данные отправителя, получателя и пунктов хранятся
+    рядом с отправлением (см. packages/read_model.py)."""
+    id = models.BigIntegerField(primary_key=True)
+    sender = models.ForeignKey(Client,
+                               related_name='+',
+                               on_delete=models.DO_NOTHING,
+                               db_index=False,
+                               db_constraint=False,)
+    sender_name = models.CharField(max_length=152)
+    recipient = models.ForeignKey(Client,
+                                  related_name='+',
+                                  on_delete=models.DO_NOTHING,
+                                  db_index=False,
+                                  db_constraint=False,)
+    recipient_name = models.CharField(max_length=152)
+    recipient_phone = models.CharField(max_length=50)
+    departure_office = models.ForeignKey(PostOffice,
+                                         related_name='+',
+                                         on_delete=models.DO_NOTHING,
+                                         db_index=False,
+                                         db_constraint=False,)
+    departure_address = models.CharField(max_length=150)
+    departure_index = models.CharField(max_length=6)
+    arrival_office = models.ForeignKey(PostOffice,
+                                       related_name='+',
+                                       on_delete=models.DO_NOTHING,
+                                       db_index=False,
+                                       db_constraint=False,)
+    arrival_address = models.CharField(max_length=150)
+    arrival_index = models.CharField(max_length=6)
+    category = models.IntegerField()
+    category_label = models.CharField(max_length=50)
+    version = models.PositiveIntegerField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        abstract = True
+
+
+class LetterListing(ShipmentListing):
+    """Денормализованная запись письма"""
+    weight = models.PositiveIntegerField()
+
+    class Meta:
+        verbose_name = 'Запись списка писем'
+        verbose_name_plural = 'Записи списка писем'
+        indexes = [
+            models.Index(fields=['departure_office', 'category', 'weight'],
+                         name='letterlisting_departure_idx'),
+            models.Index(fields=['arrival_office', 'category', 'weight'],
+                         name='letterlisting_arrival_idx'),
+            models.Index(fields=['sender', 'category'],
+                         name='letterlisting_sender_idx'),
+            models.Index(fields=['recipient', 'category'],
+                         name='letterlisting_recipient_idx'),
+            models.Index(fields=['category', 'weight'],
+                         name='letterlisting_category_idx'),
+        ]
+
+
+class PackageListing(ShipmentListing):
+    """Денормализованная запись посылки"""
+    cost = models.PositiveIntegerField()
+
+    class Meta:
+        verbose_name = 'Запись списка посылок'
+        verbose_name_plural = 'Записи списка посылок'
+        indexes = [
+            models.Index(fields=['departure_office', 'category', 'cost'],
+                         name='packagelisting_departure_idx'),
+            models.Index(fields=['arrival_office', 'category', 'cost'],
+                         name='packagelisting_arrival_idx'),
+            models.Index(fields=['sender', 'category'],
+                         name='packagelisting_sender_idx'),
+            models.Index(fields=['recipient', 'category'],
+                         name='packagelisting_recipient_idx'),
+            models.Index(fields=['category', 'cost'],
+                         name='packagelisting_category_idx'),
+        ]
@@ -0,0 +1,194 @@
+"""Денормализованная модель чтения писем и посылок.
+
+Таблицы ``LetterListing``/``PackageListing`` хранят готовые к выводу
+данные отправлений. Включается настройкой ``SHIPMENT_READ_MODEL``;
+синхронизация выполняется сигналами (см. packages/signals.py),
+полное перестроение — командой ``rebuild_read_model``.
+"""
+from django.conf import settings
+from django.db.models import Max, Q
+
+from letters_packages.transactions import atomic_write
+
+from .cache import clients_cache, post_offices_cache
+from .models import (Client, Letter, LetterListing, Package, PackageListing,
+                     PostOffice)
+
+READ_MODELS = {
+    Letter: LetterListing,
+    Package: PackageListing,
+}
+
+# Поля отправлений, копируемые в модель чтения без изменений
+SHIPMENT_FIELDS = {
+    Letter: ('id', 'sender_id', 'recipient_id', 'departure_office_id',
+             'arrival_office_id', 'category', 'weight', 'version',
+             'updated_at'),
+    Package: ('id', 'sender_id', 'recipient_id', 'departure_office_id',
+              'arrival_office_id', 'category', 'cost', 'version',
+              'updated_at'),
+}
+
+# Поля отправлений, ссылающиеся на клиентов и почтовые пункты
+REFERENCE_FIELDS = {
+    Client: ('sender', 'recipient'),
+    PostOffice: ('departure_office', 'arrival_office'),
+}
+
+# Количество отправлений, обрабатываемых за один проход
+SYNC_CHUNK_SIZE = 2000
+
+
+def is_enabled():
+    return getattr(settings, 'SHIPMENT_READ_MODEL', False)
+
+
+def build_listings(model, rows):
+    """Создание записей модели чтения из кортежей ``SHIPMENT_FIELDS``."""
+    listing_model = READ_MODELS[model]
+    fields = SHIPMENT_FIELDS[model]
+    labels = dict(model._meta.get_field('category').choices)
+    rows = [dict(zip(fields, row)) for row in rows]
+    clients = clients_cache.get_many(
+        {row[key] for row in rows for key in ('sender_id', 'recipient_id')})
+    offices = post_offices_cache.get_many(
+        {row[key] for row in rows
+         for key in ('departure_office_id', 'arrival_office_id')})
+    listings = []
+    for row in rows:
+        sender = clients[row['sender_id']]
+        recipient = clients[row['recipient_id']]
+        departure = offices[row['departure_office_id']]
+        arrival = offices[row['arrival_office_id']]
+        # Время изменения с учётом клиентов и пунктов, как в ETag
+        # обычных списков (см. ``shipment_updated_at`` в api/views.py)
+        row['updated_at'] = max(row['updated_at'], sender.updated_at,
+                                recipient.updated_at, departure.updated_at,
+                                arrival.updated_at)
+        listings.append(listing_model(
+            sender_name=sender.full_name,
+            recipient_name=recipient.full_name,
+            recipient_phone=recipient.phone_number,
+            departure_address=departure.address,
+            departure_index=departure.postal_index,
+            arrival_address=arrival.address,
+            arrival_index=arrival.postal_index,
+            category_label=labels.get(row['category'], row['category']),
+            **row,
+        ))
+    return listings
+
+
+def copy_shipments(model, queryset):
+    """Добавление в модель чтения отправлений из ``queryset`` порциями."""
+    listing_model = READ_MODELS[model]
+    chunk = []
+    for row in queryset.values_list(*SHIPMENT_FIELDS[model]).iterator(
+            SYNC_CHUNK_SIZE):
+        chunk.append(row)
+        if len(chunk) == SYNC_CHUNK_SIZE:
+            listing_model.objects.bulk_create(build_listings(model, chunk))
+            chunk = []
+    listing_model.objects.bulk_create(build_listings(model, chunk))
+
+
+def get_last_pk(model):
+    """Наибольший ключ отправлений перед массовым созданием
+    (см. ``pks_created_after``); None, если модель чтения выключена
+    и ключи созданных записей не нужны."""
+    if not is_enabled():
+        return None
+    return model.objects.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+
+
+def pks_created_after(model, last_pk):
+    """Диапазон ключей отправлений, созданных после ``get_last_pk``:
+    SQLite выдаёт новым записям ключи больше наибольшего. В диапазон
+    могут попасть и записи других процессов — их повторная
+    синхронизация ничего не меняет."""
+    if last_pk is None:
+        return None
+    return range(last_pk + 1, get_last_pk(model) + 1)
+
+
+def sync_shipments(model, pks=None):
+    """Синхронизация модели чтения для отправлений с ключами ``pks``
+    (список или ``range``): записи удалённых отправлений удаляются,
+    остальные пересоздаются. Без ``pks`` добавляются все отправления,
+    отсутствующие в модели чтения (проверка всей таблицы)."""
+    if not is_enabled():
+        return
+    listing_model = READ_MODELS[model]
+    if isinstance(pks, range):
+        condition = {'pk__gte': pks.start, 'pk__lt': pks.stop}
+    else:
+        condition = {'pk__in': pks}
+    with atomic_write():
+        if pks is None:
+            queryset = model.objects.exclude(
+                pk__in=listing_model.objects.values('pk'))
+        else:
+            listing_model.objects.filter(**condition).delete()
+            queryset = model.objects.filter(**condition)
+        copy_shipments(model, queryset)
+
+
+def sync_client(client):
+    """Обновление данных клиента во всех его отправлениях.
+    Время изменения записей — время изменения клиента: оно новее
+    прежнего и совпадает с учитываемым в ETag обычных записей."""
+    if not is_enabled():
+        return
+    touch = {'updated_at': client.updated_at}
+    for listing_model in READ_MODELS.values():
+        listing_model.objects.filter(sender=client.pk).update(
+            sender_name=client.full_name, **touch)
+        listing_model.objects.filter(recipient=client.pk).update(
+            recipient_name=client.full_name,
+            recipient_phone=client.phone_number,
+            **touch
+        )
+
+
+def sync_post_office(post_office):
+    """Обновление данных почтового пункта во всех отправлениях."""
+    if not is_enabled():
+        return
+    touch = {'updated_at': post_office.updated_at}
+    for listing_model in READ_MODELS.values():
+        listing_model.objects.filter(departure_office=post_office.pk).update(
+            departure_address=post_office.address,
+            departure_index=post_office.postal_index,
+            **touch
+        )
+        listing_model.objects.filter(arrival_office=post_office.pk).update(
+            arrival_address=post_office.address,
+            arrival_index=post_office.postal_index,
+            **touch
+        )
+
+
+def remove_reference(reference):
+    """Удаление записей отправлений удалённого клиента или почтового
+    пункта. Сами отправления удаляются каскадом одним запросом, без
+    сигналов по каждой записи, поэтому записи удаляются здесь так же."""
+    if not is_enabled():
+        return
+    condition = Q()
+    for field in REFERENCE_FIELDS[type(reference)]:
+        condition |= Q(**{field: reference.pk})
+    with atomic_write():
+        for listing_model in READ_MODELS.values():
+            listing_model.objects.filter(condition).delete()
+
+
+def rebuild():
+    """Полное перестроение модели чтения из таблиц отправлений.
+    Возвращает количество записей по каждой модели."""
+    counts = {}
+    with atomic_write():
+        for model, listing_model in READ_MODELS.items():
+            listing_model.objects.all().delete()
+            copy_shipments(model, model.objects.order_by('pk'))
+            counts[model] = listing_model.objects.count()
+    return counts
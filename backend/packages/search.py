@@ -0,0 +1,127 @@
+"""Полнотекстовый поиск по адресам почтовых пунктов и ФИО клиентов.
+
+Используются таблицы SQLite FTS5 (создаются миграцией
+0004_fulltext_search), синхронизируемые сигналами сохранения/удаления
+(см. packages/signals.py). На других СУБД поиск выполняется через
+``icontains``.
+"""
+import re
+
+from django.db import connection, connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Client, PostOffice
+
+# Модель -> (таблица FTS5, индексируемые поля)
+FTS_TABLES = {
+    PostOffice: ('packages_postoffice_fts', ('address',)),
+    Client: ('packages_client_fts', ('name', 'lastname', 'middle_name')),
+}
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """Запрос FTS5 из произвольной строки: все слова должны
+    присутствовать, последнее слово ищется по префиксу."""
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words[:-1]) + f' "{words[-1]}"*'
+
+
+def match_subquery(model, text):
+    """Подзапрос первичных ключей объектов, найденных по ``text``,
+    для использования в ``filter(pk__in=...)``."""
+    table, _ = FTS_TABLES[model]
+    return RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s',
+                  (build_match_query(text),))
+
+
+def filter_queryset(queryset, model, text, fields=('pk',)):
+    """Фильтрация ``queryset`` по найденным объектам ``model``:
+    подходят записи, у которых хотя бы одно из полей ``fields``
+    (первичный ключ или внешний ключ на ``model``) ссылается
+    на найденный объект."""
+    if build_match_query(text) is None:
+        return queryset.none()
+    condition = Q()
+    if is_available():
+        for field in fields:
+            condition |= Q(**{f'{field}__in': match_subquery(model, text)})
+        return queryset.filter(condition)
+
+    _, columns = FTS_TABLES[model]
+    for field in fields:
+        prefix = '' if field == 'pk' else f'{field}__'
+        field_condition = Q()
+        for word in re.findall(r'\w+', text):
+            word_condition = Q()
+            for column in columns:
+                word_condition |= Q(
+                    **{f'{prefix}{column}__icontains': word})
+            field_condition &= word_condition
+        condition |= field_condition
+    return queryset.filter(condition)
+
+
+def search(model, text, limit):
+    """Первичные ключи найденных объектов в порядке релевантности."""
+    if not is_available():
+        return list(filter_queryset(model.objects.all(), model, text)
+                    .values_list('pk', flat=True)[:limit])
+    match = build_match_query(text)
+    if match is None:
+        return []
+    table, _ = FTS_TABLES[model]
+    with connections[router.db_for_read(model)].cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {table} WHERE {table} MATCH %s '
+            f'ORDER BY rank LIMIT %s',
+            (match, limit),
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def index_object(instance):
+    if not is_available():
+        return
+    table, columns = FTS_TABLES[type(instance)]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s',
+                       (instance.pk,))
+        cursor.execute(
+            f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+            f'VALUES (%s, {", ".join(["%s"] * len(columns))})',
+            (instance.pk, *(getattr(instance, column) or ''
+                            for column in columns)),
+        )
+
+
+def remove_object(instance):
+    if not is_available():
+        return
+    table, _ = FTS_TABLES[type(instance)]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s',
+                       (instance.pk,))
+
+
+def rebuild(models=tuple(FTS_TABLES)):
+    """Полное перестроение поисковых индексов (например, после
+    массовой загрузки через bulk_create)."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        for model in models:
+            table, columns = FTS_TABLES[model]
+            values = ', '.join(f"COALESCE({column}, '')"
+                               for column in columns)
+            cursor.execute(f'DELETE FROM {table}')
+            cursor.execute(
+                f'INSERT INTO {table} (rowid, {", ".join(columns)}) '
+                f'SELECT id, {values} FROM {model._meta.db_table}'
+            )
@@ -0,0 +1,118 @@
+from django.core.signals import request_started
+from django.db import DatabaseError, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import read_model, search, stats
+from .cache import REFERENCE_CACHES, REFERENCES_QUERY_MAX_KEYS
+from .models import Client, Letter, Package, PostOffice
+
+# Массовое изменение писем/посылок в обход save()/delete():
+# sender — модель, pks — список или диапазон (range) затронутых ключей
+# (None, если ключи не собирались: модель чтения выключена).
+shipments_changed = Signal()
+
+# Массовое изменение выводимых полей клиентов/почтовых пунктов в обход
+# save() (см. ReferenceQuerySet): sender — модель, pks — список ключей
+references_changed = Signal()
+
+
+@receiver(request_started, dispatch_uid='preload_reference_caches')
+def preload_reference_caches(**kwargs):
+    """Однократный прогрев кэшей справочных моделей
+    при первом запросе к процессу."""
+    request_started.disconnect(dispatch_uid='preload_reference_caches')
+    try:
+        for cache in REFERENCE_CACHES.values():
+            cache.preload()
+    except DatabaseError:
+        # БД ещё не создана или без миграций: кэш заполнится по запросам
+        pass
+
+
+@receiver((post_save, post_delete), sender=Client)
+@receiver((post_save, post_delete), sender=PostOffice)
+def invalidate_reference_cache(sender, instance, **kwargs):
+    """Сброс изменённого/удалённого объекта из кэша (в других
+    процессах — по номеру поколения, см. ``ReferenceCache``).
+    Повторный сброс после фиксации транзакции не даёт параллельному
+    запросу закэшировать ещё не зафиксированное старое значение."""
+    cache = REFERENCE_CACHES[sender]
+    pk = instance.pk
+    cache.invalidate(pk)
+    transaction.on_commit(lambda: cache.invalidate(pk))
+
+
+@receiver(references_changed)
+def sync_changed_references(sender, pks, **kwargs):
+    """То же, что сигналы сохранения каждого объекта: сброс кэша
+    справочников (целиком), поисковый индекс и модель чтения."""
+    cache = REFERENCE_CACHES[sender]
+    cache.invalidate()
+    transaction.on_commit(cache.invalidate)
+    sync = {Client: read_model.sync_client,
+            PostOffice: read_model.sync_post_office}[sender]
+    for start in range(0, len(pks), REFERENCES_QUERY_MAX_KEYS):
+        for obj in sender.objects.filter(
+                pk__in=pks[start:start + REFERENCES_QUERY_MAX_KEYS]):
+            search.index_object(obj)
+            sync(obj)
+
+
+# Удаление писем и посылок отправляет ``shipments_changed``
+# (см. VersionedModel.delete): обработчики post_delete отключили бы
+# быстрое каскадное удаление отправлений удаляемого клиента или пункта,
+# которые тогда загружались бы и обрабатывались по одному.
+@receiver(post_save, sender=Letter)
+@receiver(post_save, sender=Package)
+def sync_shipment_listing(sender, instance, **kwargs):
+    read_model.sync_shipments(sender, [instance.pk])
+
+
+@receiver(shipments_changed)
+def sync_changed_shipment_listings(sender, pks, **kwargs):
+    read_model.sync_shipments(sender, pks)
+
+
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=PostOffice)
+def remove_reference_listings(sender, instance, **kwargs):
+    """Записи каскадно удалённых отправлений — одним запросом."""
+    read_model.remove_reference(instance)
+
+
+@receiver(post_save, sender=Client)
+def sync_client_listings(sender, instance, created, **kwargs):
+    """Сами отправления не изменяются: их ETag учитывает время
+    изменения клиента (см. ReferenceModel). Модель чтения обновляется,
+    только если изменились выводимые данные клиента."""
+    if not created and instance.display_changed:
+        read_model.sync_client(instance)
+
+
+@receiver(post_save, sender=PostOffice)
+def sync_post_office_listings(sender, instance, created, **kwargs):
+    if not created and instance.display_changed:
+        read_model.sync_post_office(instance)
+
+
+@receiver(post_save, sender=Letter)
+@receiver(post_save, sender=Package)
+@receiver(post_delete, sender=Client)
+@receiver((post_save, post_delete), sender=PostOffice)
+@receiver(shipments_changed)
+@receiver(references_changed, sender=PostOffice)
+def invalidate_stats(**kwargs):
+    stats.invalidate_stats()
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_save, sender=PostOffice)
+def index_search_object(sender, instance, **kwargs):
+    search.index_object(instance)
+
+
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=PostOffice)
+def remove_search_object(sender, instance, **kwargs):
+    search.remove_object(instance)
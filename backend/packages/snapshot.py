@@ -0,0 +1,397 @@
+"""Двоичный снимок данных: клиенты, почтовые пункты, письма и посылки.
+
+Формат (все числа little-endian)::
+
+    заголовок   MAGIC, версия формата (uint16), количество моделей (uint16)
+    модель      метка модели, количество столбцов (uint16),
+                столбцы: имя, тип (uint8)
+                блоки строк, завершаются блоком из 0 строк
+    блок        количество строк (uint32), словарь строк блока,
+                данные столбцов
+    окончание   END_MARKER и SHA-256 всех предшествующих байтов
+
+Данные хранятся по столбцам: целые числа и время (микросекунды UTC) —
+массивами фиксированной ширины, наименьшей для значений столбца
+в блоке (1, 2, 4 или 8 байт). Строки заменяются номерами в словаре
+уникальных строк блока (0 — NULL). Блоки ограничивают расход памяти
+при выгрузке и загрузке.
+
+Восстановление проверяет контрольную сумму до изменения БД и вставляет
+строки через ``executemany`` в одной транзакции, без создания объектов
+моделей; первичные ключи сохраняются.
+"""
+import hashlib
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+from django.db.models import (AutoField, BigAutoField, CharField,
+                              DateTimeField, ForeignKey, IntegerField,
+                              PositiveIntegerField)
+
+from letters_packages.transactions import atomic_write
+
+from . import read_model, search, stats
+from .cache import REFERENCE_CACHES
+from .models import Client, Letter, Package, PostOffice
+
+MAGIC = b'LPSNAP\x00'
+FORMAT_VERSION = 1
+END_MARKER = b'END'
+
+# Модели в порядке загрузки: справочники раньше ссылающихся на них
+SNAPSHOT_MODELS = (Client, PostOffice, Letter, Package)
+
+# Количество строк в одном блоке
+BLOCK_SIZE = 65536
+
+# Типы столбцов
+INT, STR, DATETIME = 0, 1, 2
+
+COLUMN_TYPES = (
+    ((AutoField, BigAutoField, ForeignKey, IntegerField,
+      PositiveIntegerField), INT),
+    ((CharField,), STR),
+    ((DateTimeField,), DATETIME),
+)
+
+# Коды array по возрастанию ширины (1, 2, 4 и 8 байт)
+INT_TYPECODES = ('b', 'h', 'i', 'q')
+UINT_TYPECODES = ('B', 'H', 'I', 'Q')
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+BIG_ENDIAN = sys.byteorder == 'big'
+
+
+class SnapshotError(Exception):
+    """Повреждённый или несовместимый снимок."""
+
+
+def column_type(field):
+    for classes, kind in COLUMN_TYPES:
+        if isinstance(field, classes):
+            if kind != STR and field.null:
+                raise SnapshotError(
+                    f'{field}: NULL поддерживается только в строках')
+            return kind
+    raise SnapshotError(f'{field}: тип поля не поддерживается снимком')
+
+
+def get_columns(model):
+    """Столбцы снимка модели: (имя атрибута, поле, тип)."""
+    return [(field.attname, field, column_type(field))
+            for field in model._meta.concrete_fields]
+
+
+def to_microseconds(value):
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_microseconds(value):
+    return EPOCH + timedelta(microseconds=value)
+
+
+def pack_ints(values, typecodes=INT_TYPECODES):
+    """Массив целых наименьшей достаточной ширины: код + данные."""
+    values = list(values)
+    low, high = (min(values), max(values)) if values else (0, 0)
+    for typecode in typecodes:
+        bits = array(typecode).itemsize * 8
+        if typecode.isupper():
+            fits = low >= 0 and high < 1 << bits
+        else:
+            fits = -(1 << bits - 1) <= low and high < 1 << bits - 1
+        if fits:
+            data = array(typecode, values)
+            if BIG_ENDIAN:
+                data.byteswap()
+            return typecode.encode() + data.tobytes()
+    raise SnapshotError('Целое значение вне диапазона 64 бит')
+
+
+class SnapshotWriter:
+    """Запись снимка в двоичный файл с подсчётом контрольной суммы."""
+
+    def __init__(self, file):
+        self.file = file
+        self.checksum = hashlib.sha256()
+
+    def write(self, data):
+        self.checksum.update(data)
+        self.file.write(data)
+
+    def write_struct(self, fmt, *values):
+        self.write(struct.pack('<' + fmt, *values))
+
+    def write_string(self, value):
+        data = value.encode()
+        self.write_struct('H', len(data))
+        self.write(data)
+
+    def write_header(self, models):
+        self.write(MAGIC)
+        self.write_struct('HH', FORMAT_VERSION, len(models))
+
+    def write_model(self, model, columns):
+        self.write_string(model._meta.label)
+        self.write_struct('H', len(columns))
+        for name, _, kind in columns:
+            self.write_string(name)
+            self.write_struct('B', kind)
+
+    def write_block(self, columns, rows):
+        self.write_struct('I', len(rows))
+        if not rows:
+            return
+        strings = {}
+        data = []
+        for index, (_, _, kind) in enumerate(columns):
+            values = [row[index] for row in rows]
+            if kind == STR:
+                data.append(pack_ints(
+                    [0 if value is None
+                     else strings.setdefault(value, len(strings) + 1)
+                     for value in values],
+                    UINT_TYPECODES))
+            elif kind == DATETIME:
+                data.append(pack_ints(map(to_microseconds, values)))
+            else:
+                data.append(pack_ints(values))
+        encoded = [value.encode() for value in strings]
+        self.write_struct('I', len(encoded))
+        self.write(pack_ints(map(len, encoded), UINT_TYPECODES))
+        self.write(b''.join(encoded))
+        for column in data:
+            self.write(column)
+
+    def write_end(self):
+        self.file.write(END_MARKER + self.checksum.digest())
+
+
+class SnapshotReader:
+    """Последовательное чтение снимка."""
+
+    def __init__(self, file):
+        self.file = file
+
+    def read(self, size):
+        data = self.file.read(size)
+        if len(data) != size:
+            raise SnapshotError('Снимок обрезан')
+        return data
+
+    def read_struct(self, fmt):
+        fmt = '<' + fmt
+        return struct.unpack(fmt, self.read(struct.calcsize(fmt)))
+
+    def read_string(self):
+        size, = self.read_struct('H')
+        return self.read(size).decode()
+
+    def read_ints(self, count):
+        typecode = self.read(1).decode()
+        if typecode not in INT_TYPECODES + UINT_TYPECODES:
+            raise SnapshotError(f'Неизвестный тип массива {typecode!r}')
+        data = array(typecode)
+        data.frombytes(self.read(data.itemsize * count))
+        if BIG_ENDIAN:
+            data.byteswap()
+        return data
+
+    def read_header(self):
+        if self.read(len(MAGIC)) != MAGIC:
+            raise SnapshotError('Файл не является снимком')
+        version, model_count = self.read_struct('HH')
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f'Неподдерживаемая версия формата {version}')
+        return model_count
+
+    def read_model(self):
+        label = self.read_string()
+        column_count, = self.read_struct('H')
+        columns = []
+        for _ in range(column_count):
+            name = self.read_string()
+            kind, = self.read_struct('B')
+            columns.append((name, kind))
+        return label, columns
+
+    def read_blocks(self, columns):
+        """Блоки модели: списки значений по столбцам."""
+        while True:
+            row_count, = self.read_struct('I')
+            if not row_count:
+                return
+            string_count, = self.read_struct('I')
+            lengths = self.read_ints(string_count)
+            data = self.read(sum(lengths))
+            strings = [None]
+            offset = 0
+            for length in lengths:
+                strings.append(data[offset:offset + length].decode())
+                offset += length
+            block = []
+            for _, kind in columns:
+                values = self.read_ints(row_count)
+                if kind == STR:
+                    block.append([strings[value] for value in values])
+                elif kind == DATETIME:
+                    block.append(list(map(from_microseconds, values)))
+                else:
+                    block.append(values.tolist())
+            yield block
+
+
+def dump(file, models=SNAPSHOT_MODELS, block_size=BLOCK_SIZE):
+    """Запись снимка ``models`` в двоичный файл ``file``.
+    Возвращает количество строк по моделям."""
+    writer = SnapshotWriter(file)
+    writer.write_header(models)
+    counts = {}
+    # Согласованное состояние всех таблиц: отправления не должны
+    # ссылаться на справочники, созданные после их выгрузки.
+    # Транзакция только читает (BEGIN DEFERRED): в режиме WAL выгрузка
+    # не блокирует запись
+    using = router.db_for_read(models[0])
+    with transaction.atomic(using=using):
+        for model in models:
+            counts[model] = dump_model(writer, model, block_size, using)
+    writer.write_end()
+    return counts
+
+
+def dump_model(writer, model, block_size, using):
+    columns = get_columns(model)
+    writer.write_model(model, columns)
+    count = 0
+    rows = []
+    queryset = model.objects.using(using).order_by('pk').values_list(
+        *(name for name, _, _ in columns))
+    for row in queryset.iterator(block_size):
+        rows.append(row)
+        if len(rows) == block_size:
+            writer.write_block(columns, rows)
+            count += len(rows)
+            rows = []
+    if rows:
+        writer.write_block(columns, rows)
+        count += len(rows)
+    writer.write_block(columns, [])
+    return count
+
+
+def verify(file):
+    """Проверка контрольной суммы снимка, файл остаётся в начале."""
+    file.seek(0, 2)
+    size = file.tell() - len(END_MARKER) - hashlib.sha256().digest_size
+    if size < len(MAGIC):
+        raise SnapshotError('Файл не является снимком')
+    file.seek(0)
+    checksum = hashlib.sha256()
+    remaining = size
+    while remaining:
+        data = file.read(min(remaining, 1 << 20))
+        checksum.update(data)
+        remaining -= len(data)
+    end = file.read()
+    file.seek(0)
+    if end[:len(END_MARKER)] != END_MARKER:
+        raise SnapshotError('Снимок обрезан')
+    if end[len(END_MARKER):] != checksum.digest():
+        raise SnapshotError('Контрольная сумма снимка не совпадает')
+
+
+def insert_columns(connection, model, names, columns):
+    """Вставка строк одним ``executemany`` без создания объектов модели:
+    ``columns`` — списки значений полей ``names`` (имена атрибутов),
+    уже приведённых к виду БД. Возвращает количество строк."""
+    opts = model._meta
+    quote = connection.ops.quote_name
+    fields = [opts.get_field(name) for name in names]
+    sql = (f'INSERT INTO {quote(opts.db_table)} '
+           f'({", ".join(quote(field.column) for field in fields)}) '
+           f'VALUES ({", ".join(["%s"] * len(fields))})')
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, zip(*columns))
+    return len(columns[0])
+
+
+def insert_block(connection, model, columns, block):
+    names = [name for name, _ in columns]
+    for index, name in enumerate(names):
+        field = model._meta.get_field(name)
+        if isinstance(field, DateTimeField):
+            block[index] = [field.get_db_prep_save(value, connection)
+                            for value in block[index]]
+    return insert_columns(connection, model, names, block)
+
+
+def is_empty(using, models=SNAPSHOT_MODELS):
+    return not any(model.objects.using(using).exists() for model in models)
+
+
+def flush(connection, models=SNAPSHOT_MODELS):
+    """Удаление всех записей ``models`` и модели чтения одним запросом
+    на таблицу (без загрузки объектов и сигналов удаления)."""
+    tables = [listing_model._meta.db_table
+              for listing_model in read_model.READ_MODELS.values()]
+    tables += [model._meta.db_table for model in reversed(models)]
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(table)}')
+
+
+def restore(file, replace=False):
+    """Загрузка снимка из двоичного файла ``file`` в пустую БД
+    (``replace`` — удалить текущие данные). Возвращает количество
+    строк по моделям."""
+    verify(file)
+    reader = SnapshotReader(file)
+    models = {model._meta.label: model for model in SNAPSHOT_MODELS}
+    connection = connections[router.db_for_write(Client)]
+    counts = {}
+    with atomic_write(using=connection.alias):
+        if replace:
+            flush(connection)
+        elif not is_empty(connection.alias):
+            raise SnapshotError('БД не пуста: загрузка снимка возможна '
+                                'только в пустую БД')
+        for _ in range(reader.read_header()):
+            label, columns = reader.read_model()
+            model = models.get(label)
+            if model is None:
+                raise SnapshotError(f'Неизвестная модель {label}')
+            expected = [(name, kind) for name, _, kind in get_columns(model)]
+            if columns != expected:
+                raise SnapshotError(
+                    f'{label}: столбцы снимка не совпадают с моделью')
+            counts[model] = sum(
+                insert_block(connection, model, columns, block)
+                for block in reader.read_blocks(columns))
+        finish_load(connection)
+    drop_caches()
+    return counts
+
+
+def finish_load(connection, models=SNAPSHOT_MODELS):
+    """Действия после вставки строк с явными первичными ключами
+    в обход ORM: сброс последовательностей ключей (для СУБД, где они
+    есть), перестроение поискового индекса и модели чтения."""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(),
+                                                     list(models)):
+            cursor.execute(sql)
+    search.rebuild()
+    if read_model.is_enabled():
+        read_model.rebuild()
+
+
+def drop_caches():
+    """Сброс кэшей справочников и статистики после загрузки."""
+    for cache in REFERENCE_CACHES.values():
+        cache.invalidate()
+    stats.invalidate_stats()
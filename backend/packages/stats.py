@@ -0,0 +1,88 @@
+"""Сводная статистика по письмам и посылкам для дашбордов.
+
+Статистика считается запросами с GROUP BY и хранится в кэше Django
+до изменения писем, посылок или почтовых пунктов
+(сброс — сигналами, см. packages/signals.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Sum
+
+from .cache import post_offices_cache
+from .models import Letter, Package
+
+STATS_CACHE_KEY = 'shipment_stats'
+# Время жизни кэша, ограничивает устаревание при нескольких процессах
+# с локальным кэшем (сброс сигналами действует только в своём процессе)
+STATS_CACHE_TIMEOUT = getattr(settings, 'STATS_CACHE_TIMEOUT', 300)
+
+
+def category_stats(model, **aggregates):
+    """Количество и агрегаты по каждому типу отправления (один запрос)."""
+    labels = dict(model._meta.get_field('category').choices)
+    rows = (model.objects.order_by('category').values('category')
+            .annotate(count=Count('id'), **aggregates))
+    return [{**row, 'category': labels.get(row['category'], row['category'])}
+            for row in rows]
+
+
+def office_volumes():
+    """Количество отправленных и полученных писем и посылок
+    по почтовым пунктам (по одному запросу на направление)."""
+    volumes = {}
+    for model, prefix in ((Letter, 'letters'), (Package, 'packages')):
+        for field, suffix in (('departure_office', 'sent'),
+                              ('arrival_office', 'received')):
+            rows = (model.objects.order_by().values_list(field)
+                    .annotate(count=Count('id')))
+            for office, count in rows:
+                volumes.setdefault(office, {})[f'{prefix}_{suffix}'] = count
+
+    offices = post_offices_cache.get_many(volumes)
+    keys = ('letters_sent', 'letters_received',
+            'packages_sent', 'packages_received')
+    return [
+        {'id': pk,
+         'address': offices[pk].address,
+         'postal_index': offices[pk].postal_index,
+         **{key: volumes[pk].get(key, 0) for key in keys}}
+        for pk in sorted(volumes)
+    ]
+
+
+def compute_stats():
+    letters = category_stats(Letter, average_weight=Avg('weight'))
+    packages = category_stats(Package, cost_sum=Sum('cost'))
+    letters_total = sum(row['count'] for row in letters)
+    return {
+        'letters': {
+            'total': letters_total,
+            'average_weight': (
+                sum(row['average_weight'] * row['count'] for row in letters)
+                / letters_total if letters_total else None
+            ),
+            'by_category': letters,
+        },
+        'packages': {
+            'total': sum(row['count'] for row in packages),
+            'cost_sum': sum(row['cost_sum'] for row in packages),
+            'by_category': packages,
+        },
+        'post_offices': office_volumes(),
+    }
+
+
+def get_stats():
+    """Статистика из кэша (с вычислением при отсутствии)."""
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is None:
+        stats = compute_stats()
+        cache.set(STATS_CACHE_KEY, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_stats():
+    """Сброс кэша статистики сейчас и после фиксации транзакции."""
+    cache.delete(STATS_CACHE_KEY)
+    transaction.on_commit(lambda: cache.delete(STATS_CACHE_KEY))
@@ -1,6 +1,11 @@
 import pytest
+from django.core.cache import cache
+from django.core.signals import request_started
 from rest_framework.test import APIClient
 
+from api.response_cache import response_cache
+from packages.cache import REFERENCE_CACHES
+
 pytest_plugins = [
     'tests.fixtures.fixture_data',
 ]
@@ -10,3 +15,21 @@ pytest_plugins = [
 def api_client():
     """Фикстура для тестирования API."""
     return APIClient()
+
+
+@pytest.fixture(autouse=True, scope='session')
+def disable_reference_caches_preload():
+    """Отключение прогрева кэшей справочников при первом запросе,
+    чтобы количество запросов к БД в тестах не зависело от их порядка."""
+    request_started.disconnect(dispatch_uid='preload_reference_caches')
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Очистка кэшей между тестами: откат транзакции теста
+    не отправляет сигналов об удалении объектов."""
+    yield
+    for reference_cache in REFERENCE_CACHES.values():
+        reference_cache.clear()
+    response_cache.clear()
+    cache.clear()
@@ -1,6 +1,12 @@
 import pytest
 
-from packages.models import Client, PostOffice
+from packages.models import Client, Letter, Package, PostOffice
+
+# Эндпоинты отправлений: фикстура URL списка, модель и значения полей
+SHIPMENT_ENDPOINTS = [
+    ('url_letters', Letter, {'category': 1, 'weight': 10}),
+    ('url_packages', Package, {'category': 4, 'cost': 500}),
+]
 
 
 @pytest.fixture
@@ -39,3 +45,46 @@ def post_office_1():
 def post_office_2():
     return PostOffice.objects.create(address='address_2',
                                      postal_index='postal_index_2',)
+
+
+@pytest.fixture
+def create_shipments(client_1, client_2, post_office_1, post_office_2):
+    """Фабрика писем/посылок: создаёт заданное количество записей,
+    чередуя направление отправки."""
+    pairs = ((client_1, client_2, post_office_1, post_office_2),
+             (client_2, client_1, post_office_2, post_office_1))
+
+    def create(model, count, **extra):
+        shipments = []
+        for i in range(count):
+            sender, recipient, departure_office, arrival_office = pairs[i % 2]
+            shipments.append(model.objects.create(
+                sender=sender,
+                recipient=recipient,
+                departure_office=departure_office,
+                arrival_office=arrival_office,
+                **extra
+            ))
+        return shipments
+
+    return create
+
+
+@pytest.fixture
+def letter_data(client_1, client_2, post_office_1, post_office_2):
+    """Данные письма для запросов к API."""
+    return {'sender': client_1.id,
+            'recipient': client_2.id,
+            'departure_office': post_office_1.id,
+            'arrival_office': post_office_2.id,
+            'category': 1,
+            'weight': 100}
+
+@pytest.fixture(params=SHIPMENT_ENDPOINTS, ids=['letters', 'packages'])
+def endpoint(request, create_shipments):
+    """URL списка, три созданные записи писем или посылок и фабрика
+    ещё одной записи."""
+    url_fixture, model, extra = request.param
+    return (request.getfixturevalue(url_fixture),
+            create_shipments(model, 3, **extra),
+            lambda: create_shipments(model, 1, **extra)[0])
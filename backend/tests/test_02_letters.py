@@ -167,7 +167,7 @@ def test_get_list_letter(
     response = api_client.get(url_letters)
 
     assert response.status_code == HTTP_200_OK
-    assert len(response.data) == 2
+    assert len(response.data['results']) == 2
 
 
 @pytest.mark.django_db
@@ -168,7 +168,7 @@ def test_get_list_package(
     response = api_client.get(url_packages)
 
     assert response.status_code == HTTP_200_OK
-    assert len(response.data) == 2
+    assert len(response.data['results']) == 2
 
 
 @pytest.mark.django_db
@@ -0,0 +1,140 @@
+import pytest
+
+from packages.models import Letter, Package
+
+LETTER_DATA = {'category': 2, 'weight': 123}
+PACKAGE_DATA = {'category': 2, 'cost': 500}
+
+
+@pytest.fixture(params=[
+    ('url_letters', Letter, LETTER_DATA),
+    ('url_packages', Package, PACKAGE_DATA),
+], ids=['letters', 'packages'])
+def endpoint(request):
+    url_fixture, model, extra = request.param
+    return request.getfixturevalue(url_fixture), model, extra
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('count', [1, 10, 50])
+def test_list_query_count_is_constant(
+        endpoint, count, api_client, django_assert_num_queries,
+        create_shipments, settings,
+):
+    """Тест: количество запросов к БД при получении списка
+    не зависит от количества записей: клиенты и почтовые пункты
+    загружаются в кэш справочников одним запросом на таблицу,
+    при повторном запросе ответ берётся из кэша ответов,
+    а без него — только выборка записей."""
+    url, model, extra = endpoint
+    create_shipments(model, count, **extra)
+
+    with django_assert_num_queries(3):
+        response = api_client.get(url)
+    with django_assert_num_queries(0):
+        assert api_client.get(url).json() == response.json()
+
+    settings.RESPONSE_CACHE = False
+    with django_assert_num_queries(1):
+        assert api_client.get(url).data == response.data
+
+    assert len(response.data['results']) == count
+
+
+@pytest.mark.django_db
+def test_retrieve_query_count(
+        endpoint, api_client, django_assert_num_queries, create_shipments,
+):
+    """Тест: количество запросов к БД при получении одной записи."""
+    url, model, extra = endpoint
+    shipment, = create_shipments(model, 1, **extra)
+
+    with django_assert_num_queries(3):
+        api_client.get(f'{url}{shipment.id}/')
+    with django_assert_num_queries(1):
+        api_client.get(f'{url}{shipment.id}/')
+
+
+@pytest.mark.django_db
+def test_create_query_count(
+        endpoint, api_client, django_assert_num_queries, client_1, client_2,
+        post_office_1, post_office_2,
+):
+    """Тест: количество запросов к БД при создании записи
+    (все связанные объекты одним запросом + INSERT; при записи ссылки
+    проверяются по БД и с прогретым кэшем справочников)."""
+    url, model, extra = endpoint
+    data = {'sender': client_1.id,
+            'recipient': client_2.id,
+            'departure_office': post_office_1.id,
+            'arrival_office': post_office_2.id,
+            **extra}
+
+    with django_assert_num_queries(2):
+        response = api_client.post(url, data, format='json')
+    assert response.status_code == 201
+    assert response.data['sender'] == client_1.full_name
+    with django_assert_num_queries(2):
+        api_client.post(url, data, format='json')
+
+
+@pytest.mark.django_db
+def test_create_unknown_reference_query_count(
+        endpoint, api_client, django_assert_num_queries, client_1,
+        post_office_1, post_office_2,
+):
+    """Тест: несуществующий клиент обнаруживается тем же единственным
+    запросом связанных объектов, запись не создаётся."""
+    url, model, extra = endpoint
+    data = {'sender': client_1.id,
+            'recipient': 777,
+            'departure_office': post_office_1.id,
+            'arrival_office': post_office_2.id,
+            **extra}
+
+    with django_assert_num_queries(1):
+        response = api_client.post(url, data, format='json')
+
+    assert response.status_code == 400
+    assert 'recipient' in response.data
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('method, data', [
+    ('put', None),
+    ('patch', {'category': 1}),
+], ids=['put', 'patch'])
+def test_update_query_count(
+        endpoint, method, data, api_client, django_assert_num_queries,
+        create_shipments, client_1, client_2, post_office_1, post_office_2,
+):
+    """Тест: количество запросов к БД при изменении записи."""
+    url, model, extra = endpoint
+    shipment, = create_shipments(model, 1, **extra)
+    if data is None:
+        data = {'sender': client_2.id,
+                'recipient': client_1.id,
+                'departure_office': post_office_2.id,
+                'arrival_office': post_office_1.id,
+                **extra}
+    # SELECT записи + текущие и новые связанные объекты одним
+    # запросом + UPDATE; ссылки проверяются по БД и с прогретым кэшем
+    with django_assert_num_queries(3):
+        response = getattr(api_client, method)(f'{url}{shipment.id}/', data,
+                                               format='json')
+    assert response.status_code == 200
+    with django_assert_num_queries(3):
+        getattr(api_client, method)(f'{url}{shipment.id}/', data,
+                                    format='json')
+
+
+@pytest.mark.django_db
+def test_delete_query_count(
+        endpoint, api_client, django_assert_num_queries, create_shipments,
+):
+    """Тест: количество запросов к БД при удалении записи."""
+    url, model, extra = endpoint
+    shipment, = create_shipments(model, 1, **extra)
+
+    with django_assert_num_queries(2):
+        api_client.delete(f'{url}{shipment.id}/')
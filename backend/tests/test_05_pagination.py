@@ -0,0 +1,47 @@
+import pytest
+from rest_framework.status import HTTP_200_OK, HTTP_404_NOT_FOUND
+
+from packages.models import Letter, Package
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url_fixture, model, extra', [
+    ('url_letters', Letter, {'category': 1, 'weight': 10}),
+    ('url_packages', Package, {'category': 1, 'cost': 10}),
+], ids=['letters', 'packages'])
+def test_cursor_pagination_walks_all_pages(
+        request, url_fixture, model, extra, api_client,
+        django_assert_num_queries, create_shipments,
+):
+    """Тест: обход всех страниц по ссылкам next/previous,
+    каждая страница — один запрос к БД без COUNT(*)."""
+    url = request.getfixturevalue(url_fixture)
+    shipments = create_shipments(model, 7, **extra)
+    # прогрев кэша справочников
+    api_client.get(url)
+
+    ids = []
+    next_url = f'{url}?page_size=3'
+    while next_url:
+        with django_assert_num_queries(1) as context:
+            response = api_client.get(next_url)
+        assert response.status_code == HTTP_200_OK
+        assert 'COUNT(' not in context.captured_queries[0]['sql']
+        assert 'OFFSET' not in context.captured_queries[0]['sql']
+        ids.extend(item['id'] for item in response.data['results'])
+        next_url = response.data['next']
+
+    assert ids == [shipment.id for shipment in shipments]
+    assert set(response.data) == {'next', 'previous', 'results'}
+
+    response = api_client.get(response.data['previous'])
+    assert ([item['id'] for item in response.data['results']]
+            == ids[3:6])
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_invalid_cursor(url_letters, api_client):
+    """Тест: некорректный токен курсора должен вернуть 404."""
+    response = api_client.get(f'{url_letters}?cursor=garbage')
+
+    assert response.status_code == HTTP_404_NOT_FOUND
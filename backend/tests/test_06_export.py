@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+
+import pytest
+from rest_framework.status import HTTP_200_OK
+
+from packages.models import Letter, Package
+
+ENDPOINTS = [
+    ('url_letters', Letter, {'category': 3, 'weight': 20}),
+    ('url_packages', Package, {'category': 6, 'cost': 7000}),
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url_fixture, model, extra', ENDPOINTS,
+                         ids=['letters', 'packages'])
+def test_export_ndjson(
+        request, url_fixture, model, extra, api_client,
+        django_assert_num_queries, create_shipments,
+):
+    """Тест: потоковая выгрузка в NDJSON совпадает с ответами API
+    и выполняется одним запросом к БД (плюс загрузка кэша справочников)."""
+    url = request.getfixturevalue(url_fixture)
+    shipments = create_shipments(model, 5, **extra)
+
+    with django_assert_num_queries(3):
+        response = api_client.get(f'{url}export/')
+        content = b''.join(response.streaming_content).decode()
+
+    assert response.status_code == HTTP_200_OK
+    assert response['Content-Type'].startswith('application/x-ndjson')
+    rows = [json.loads(line) for line in content.splitlines()]
+    assert len(rows) == len(shipments)
+    for row, shipment in zip(rows, shipments):
+        assert row == api_client.get(f'{url}{shipment.id}/').data
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url_fixture, model, extra', ENDPOINTS,
+                         ids=['letters', 'packages'])
+def test_export_csv(
+        request, url_fixture, model, extra, api_client, create_shipments,
+):
+    """Тест: потоковая выгрузка в CSV с заголовком из полей сериализатора."""
+    url = request.getfixturevalue(url_fixture)
+    shipments = create_shipments(model, 3, **extra)
+
+    response = api_client.get(f'{url}export/?format=csv')
+    content = b''.join(response.streaming_content).decode()
+
+    assert response.status_code == HTTP_200_OK
+    assert response['Content-Type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(content), delimiter=';'))
+    expected = api_client.get(f'{url}{shipments[0].id}/').data
+    assert len(rows) == len(shipments)
+    assert list(rows[0]) == list(expected)
+    assert rows[0] == {key: str(value) for key, value in expected.items()}
+
+
+@pytest.mark.django_db
+def test_export_empty_csv_has_header(url_letters, api_client):
+    """Тест: выгрузка пустой таблицы в CSV содержит только заголовок."""
+    response = api_client.get(f'{url_letters}export/?format=csv')
+    content = b''.join(response.streaming_content).decode()
+
+    assert content.splitlines() == [
+        'id;sender;recipient;departure_office;arrival_office;'
+        'departure_index;arrival_index;category;weight'
+    ]
@@ -0,0 +1,73 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST
+
+from packages.models import Letter, Package
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('size', [1, 20, 200])
+def test_bulk_create_letters_query_count(
+        size, url_letters, api_client, letter_data,
+):
+    """Тест: массовое создание писем — связанные объекты загружаются
+    одним запросом независимо от размера пакета."""
+    with CaptureQueriesContext(connection) as context:
+        response = api_client.post(f'{url_letters}bulk/',
+                                   [letter_data] * size, format='json')
+
+    selects = [query['sql'] for query in context.captured_queries
+               if query['sql'].startswith('SELECT')]
+    assert len(selects) == 1
+    assert response.status_code == HTTP_201_CREATED
+    assert response.data == {'created': size, 'errors': []}
+    assert Letter.objects.count() == size
+
+
+@pytest.mark.django_db
+def test_bulk_create_packages_partial_errors(
+        url_packages, api_client, client_1, client_2, post_office_1,
+        post_office_2,
+):
+    """Тест: некорректные записи не мешают сохранению корректных,
+    ошибки возвращаются с индексом записи."""
+    valid = {'sender': client_1.id,
+             'recipient': client_2.id,
+             'departure_office': post_office_1.id,
+             'arrival_office': post_office_2.id,
+             'category': 2,
+             'cost': 300}
+    data = [
+        valid,
+        {**valid, 'recipient': client_1.id},
+        {**valid, 'arrival_office': post_office_1.id},
+        {**valid, 'sender': 777},
+        {**valid, 'cost': -1},
+        'not an object',
+        {**valid, 'category': 6},
+    ]
+
+    response = api_client.post(f'{url_packages}bulk/', data, format='json')
+
+    assert response.status_code == HTTP_201_CREATED
+    assert response.data['created'] == 2
+    errors = {error['index']: error['errors']
+              for error in response.data['errors']}
+    assert set(errors) == {1, 2, 3, 4, 5}
+    assert 'Отправитель и получатель должны быть разные' in str(errors[1])
+    assert 'Пункты отправления и получения должны быть разные' in str(
+        errors[2])
+    assert 'sender' in errors[3]
+    assert 'cost' in errors[4]
+    assert set(Package.objects.values_list('category', flat=True)) == {2, 6}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('data', [{}, [{}]], ids=['not_list', 'all_invalid'])
+def test_bulk_create_rejected(data, url_letters, api_client):
+    """Тест: запрос без единой корректной записи должен вернуть ошибку."""
+    response = api_client.post(f'{url_letters}bulk/', data, format='json')
+
+    assert response.status_code == HTTP_400_BAD_REQUEST
+    assert Letter.objects.count() == 0
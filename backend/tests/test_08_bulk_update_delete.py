@@ -0,0 +1,132 @@
+import pytest
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+
+from packages.models import Letter, Package, PostOffice
+
+
+@pytest.mark.django_db
+def test_bulk_update_by_filter(
+        url_packages, api_client, django_assert_num_queries, create_shipments,
+):
+    """Тест: массовое изменение посылок по фильтру одним UPDATE
+    (затронутые id выбираются только для модели чтения)."""
+    create_shipments(Package, 4, category=1, cost=100)
+    create_shipments(Package, 2, category=3, cost=100)
+    data = {'filter': {'category': 1}, 'data': {'category': 4}}
+
+    with django_assert_num_queries(3) as context:
+        response = api_client.patch(f'{url_packages}bulk/', data,
+                                    format='json')
+
+    assert response.status_code == HTTP_200_OK
+    assert response.data == {'updated': 4}
+    assert [query['sql'].split()[0] for query in context.captured_queries
+            if 'SAVEPOINT' not in query['sql']] == ['UPDATE']
+    assert Package.objects.filter(category=4).count() == 4
+    assert Package.objects.filter(category=3).count() == 2
+
+
+@pytest.mark.django_db
+def test_bulk_update_office_by_ids(
+        url_letters, api_client, create_shipments,
+):
+    """Тест: массовая смена пункта получения по списку id
+    (например, при закрытии почтового отделения)."""
+    letters = create_shipments(Letter, 4, category=1, weight=10)
+    new_office = PostOffice.objects.create(address='address_3',
+                                           postal_index='postal_index_3')
+    ids = [letter.id for letter in letters[:3]]
+    data = {'ids': ids, 'data': {'arrival_office': new_office.id}}
+
+    response = api_client.patch(f'{url_letters}bulk/', data, format='json')
+
+    assert response.status_code == HTTP_200_OK
+    assert response.data == {'updated': 3}
+    assert list(
+        Letter.objects.filter(arrival_office=new_office)
+        .values_list('id', flat=True)
+    ) == ids
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('data, message', [
+    ({'arrival_office': 'office_1'},
+     'Пункты отправления и получения должны быть разные'),
+    ({'sender': 'client_2'},
+     'Отправитель и получатель должны быть разные'),
+    ({'sender': 'client_1', 'recipient': 'client_1'},
+     'Отправитель и получатель должны быть разные'),
+])
+def test_bulk_update_respects_constraints(
+        data, message, url_letters, api_client, create_shipments, client_1,
+        client_2, post_office_1,
+):
+    """Тест: массовое изменение, нарушающее ограничения моделей,
+    отклоняется целиком."""
+    create_shipments(Letter, 2, category=1, weight=10)
+    objects = {'office_1': post_office_1.id,
+               'client_1': client_1.id,
+               'client_2': client_2.id}
+    data = {key: objects[value] for key, value in data.items()}
+
+    response = api_client.patch(
+        f'{url_letters}bulk/', {'filter': {'category': 1}, 'data': data},
+        format='json',
+    )
+
+    assert response.status_code == HTTP_400_BAD_REQUEST
+    assert message in str(response.data)
+    assert not Letter.objects.exclude(category=1).exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('data', [
+    {'data': {'category': 2}},
+    {'filter': {'unknown': 1}, 'data': {'category': 2}},
+    {'filter': {'category': 'abc'}, 'data': {'category': 2}},
+    {'ids': ['1'], 'data': {'category': 2}},
+    {'filter': {'category': 1}, 'data': {'category': 20}},
+    {'filter': {'category': 1}},
+])
+def test_bulk_update_invalid_request(
+        data, url_letters, api_client, create_shipments,
+):
+    """Тест: некорректный запрос массового изменения."""
+    create_shipments(Letter, 2, category=1, weight=10)
+
+    response = api_client.patch(f'{url_letters}bulk/', data, format='json')
+
+    assert response.status_code == HTTP_400_BAD_REQUEST
+    assert not Letter.objects.exclude(category=1).exists()
+
+
+@pytest.mark.django_db
+def test_bulk_delete(
+        url_letters, api_client, django_assert_num_queries, create_shipments,
+        post_office_1,
+):
+    """Тест: массовое удаление по фильтру и списку id одним DELETE."""
+    letters = create_shipments(Letter, 6, category=1, weight=10)
+    data = {'ids': [letter.id for letter in letters[:4]],
+            'filter': {'departure_office': post_office_1.id}}
+
+    with django_assert_num_queries(3):
+        response = api_client.delete(f'{url_letters}bulk/', data,
+                                     format='json')
+
+    assert response.status_code == HTTP_200_OK
+    assert response.data == {'deleted': 2}
+    assert Letter.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_bulk_delete_requires_selector(
+        url_packages, api_client, create_shipments,
+):
+    """Тест: массовое удаление без условий не удаляет все записи."""
+    create_shipments(Package, 2, category=1, cost=10)
+
+    response = api_client.delete(f'{url_packages}bulk/', {}, format='json')
+
+    assert response.status_code == HTTP_400_BAD_REQUEST
+    assert Package.objects.count() == 2
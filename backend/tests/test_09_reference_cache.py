@@ -0,0 +1,177 @@
+import pytest
+from django.core.cache import cache as django_cache
+from django.db import connection
+from django.utils import timezone
+from rest_framework.status import HTTP_400_BAD_REQUEST
+
+from packages.cache import (LRUCache, ReferenceCache, clients_cache,
+                            get_references, post_offices_cache)
+from packages.models import Client, Letter, PostOffice
+from packages.signals import preload_reference_caches
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """Тест: при превышении размера вытесняется давно не использованный
+    элемент."""
+    cache = LRUCache(max_size=2)
+    cache.set(1, 'a')
+    cache.set(2, 'b')
+    cache.get(1)
+    cache.set(3, 'c')
+
+    assert 2 not in cache
+    assert cache.get(1) == 'a'
+    assert cache.get(3) == 'c'
+    assert len(cache) == 2
+
+
+def test_lru_cache_timeout():
+    """Тест: элементы старше времени жизни считаются отсутствующими."""
+    cache = LRUCache(max_size=2, timeout=0)
+    cache.set(1, 'a')
+    assert cache.get(1) is None
+    assert 1 not in cache
+
+    cache = LRUCache(max_size=2, timeout=60)
+    cache.set(1, 'a')
+    assert cache.get(1) == 'a'
+
+
+@pytest.mark.django_db
+def test_reference_cache_get_many_single_query(
+        client_1, client_2, django_assert_num_queries,
+):
+    """Тест: промахи кэша загружаются одним запросом,
+    повторное обращение не идёт в БД."""
+    cache = ReferenceCache(Client, max_size=10)
+
+    with django_assert_num_queries(1):
+        objects = cache.get_many([client_1.id, client_2.id, 777])
+    with django_assert_num_queries(0):
+        assert cache.get_many([client_1.id, client_2.id]) == objects
+
+    assert objects == {client_1.id: client_1, client_2.id: client_2}
+
+
+@pytest.mark.django_db
+def test_get_references_single_query(
+        client_1, client_2, post_office_1, django_assert_num_queries,
+):
+    """Тест: промахи кэша всех справочников загружаются одним
+    запросом, объекты загружаются полностью и попадают в кэш."""
+    with django_assert_num_queries(1):
+        objects = get_references({Client: {client_1.id, client_2.id, 777},
+                                  PostOffice: {post_office_1.id}})
+    with django_assert_num_queries(0):
+        assert get_references({Client: {client_2.id}}) == {
+            Client: {client_2.id: client_2}}
+
+    assert objects == {
+        Client: {client_1.id: client_1, client_2.id: client_2},
+        PostOffice: {post_office_1.id: post_office_1},
+    }
+    loaded = objects[Client][client_1.id]
+    assert (loaded.full_name, loaded.phone_number) == (
+        client_1.full_name, client_1.phone_number)
+    assert objects[PostOffice][post_office_1.id].address == \
+        post_office_1.address
+    with django_assert_num_queries(1):
+        assert get_references({PostOffice: {777}}) == {PostOffice: {}}
+
+
+@pytest.mark.django_db
+def test_reference_cache_invalidated_on_save_and_delete(
+        url_letters, api_client, create_shipments, client_1, post_office_2,
+):
+    """Тест: изменение и удаление справочных объектов сбрасывает кэш."""
+    letter, = create_shipments(Letter, 1, category=1, weight=10)
+    url = f'{url_letters}{letter.id}/'
+    api_client.get(url)
+    assert client_1.id in clients_cache
+
+    client_1.lastname = 'new_lastname'
+    client_1.save()
+    post_office_2.address = 'new_address'
+    post_office_2.save()
+    response = api_client.get(url)
+
+    assert response.data['sender'] == client_1.full_name
+    assert response.data['arrival_office'] == 'new_address'
+
+    client_1.delete()
+    assert client_1.id not in clients_cache
+
+
+@pytest.mark.django_db
+def test_write_checks_references_in_db(
+        url_letters, api_client, client_1, client_2, post_office_1,
+        post_office_2,
+):
+    """Тест: клиент из кэша процесса, удалённый из БД другим процессом,
+    не проходит проверку при записи (400, а не ошибка целостности)
+    и удаляется из кэша."""
+    clients_cache.get_many([client_2.id])
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM packages_client WHERE id = %s',
+                       [client_2.pk])
+    data = {'sender': client_1.id,
+            'recipient': client_2.id,
+            'departure_office': post_office_1.id,
+            'arrival_office': post_office_2.id,
+            'category': 1,
+            'weight': 10}
+
+    response = api_client.post(url_letters, data, format='json')
+
+    assert response.status_code == HTTP_400_BAD_REQUEST
+    assert 'recipient' in response.data
+    assert client_2.id not in clients_cache
+
+
+@pytest.mark.django_db
+def test_preload_reference_caches(client_1, post_office_1):
+    """Тест: прогрев кэшей загружает клиентов и почтовые пункты."""
+    preload_reference_caches()
+
+    assert client_1.id in clients_cache
+    assert post_office_1.id in post_offices_cache
+
+
+@pytest.mark.django_db
+def test_reference_cache_generation(
+        url_letters, api_client, create_shipments, django_assert_num_queries,
+):
+    """Тест: изменение клиента в другом процессе (новый номер поколения
+    в кэше Django) сбрасывает кэш этого процесса: ответ и ETag
+    отражают новые данные."""
+    letter, = create_shipments(Letter, 1, category=1, weight=10)
+    url = f'{url_letters}{letter.id}/'
+    etag = api_client.get(url)['ETag']
+    with django_assert_num_queries(0):
+        clients_cache.get_many([letter.sender_id])
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE packages_client SET lastname = %s, updated_at = %s '
+            'WHERE id = %s', ['other_process', timezone.now(),
+                              letter.sender_id])
+    django_cache.incr(clients_cache.generation_key)
+    response = api_client.get(url)
+
+    assert response.data['sender'].startswith('other_process')
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_own_invalidation_keeps_cache(client_1, client_2):
+    """Тест: изменение в своём процессе сбрасывает только изменённый
+    объект, остальные остаются в кэше."""
+    clients_cache.get_many([client_1.id, client_2.id])
+
+    client_1.lastname = 'new_lastname'
+    client_1.save()
+    hits = clients_cache.hits
+    objects = clients_cache.get_many([client_1.id, client_2.id])
+
+    assert clients_cache.hits == hits + 1
+    assert objects[client_1.id].lastname == 'new_lastname'
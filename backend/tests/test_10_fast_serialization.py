@@ -0,0 +1,42 @@
+import pytest
+
+from api.serializers import LetterSerializer, PackageSerializer
+from packages.models import Package
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('serializer_class, extra', [
+    (LetterSerializer, {'category': 4, 'weight': 15}),
+    (PackageSerializer, {'category': 5, 'cost': 900}),
+], ids=['letters', 'packages'])
+def test_represent_rows_matches_serializer(
+        serializer_class, extra, create_shipments, client_2,
+):
+    """Тест: быстрый вывод списка через values_list совпадает
+    с выводом ModelSerializer."""
+    client_2.middle_name = None
+    client_2.save()
+    create_shipments(serializer_class.Meta.model, 3, **extra)
+    queryset = serializer_class.Meta.model.objects.order_by('id')
+
+    rows = serializer_class.represent_rows(
+        queryset.values_list(*serializer_class.values_fields))
+
+    assert rows == serializer_class(queryset, many=True).data
+    assert [list(row) for row in rows] == [
+        list(serializer_class.Meta.fields)] * 3
+
+
+@pytest.mark.django_db
+def test_list_uses_values_query(
+        url_packages, api_client, django_assert_num_queries, create_shipments,
+):
+    """Тест: список выбирает только столбцы посылки без JOIN."""
+    create_shipments(Package, 2, category=1, cost=10)
+
+    with django_assert_num_queries(3) as context:
+        api_client.get(url_packages)
+
+    sql = context.captured_queries[0]['sql']
+    assert 'JOIN' not in sql
+    assert sql.startswith(f'SELECT "{Package._meta.db_table}"."id"')
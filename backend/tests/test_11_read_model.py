@@ -0,0 +1,184 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from packages import read_model, stats
+from packages.models import (Client, Letter, LetterListing, Package,
+                             PackageListing, PostOffice)
+
+ENDPOINTS = [
+    ('url_letters', Letter, LetterListing, {'category': 1, 'weight': 10}),
+    ('url_packages', Package, PackageListing, {'category': 4, 'cost': 500}),
+]
+
+
+@pytest.fixture
+def read_model_enabled(settings):
+    settings.SHIPMENT_READ_MODEL = True
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url_fixture, model, listing_model, extra',
+                         ENDPOINTS, ids=['letters', 'packages'])
+def test_read_model_serves_same_data(
+        request, url_fixture, model, listing_model, extra, api_client,
+        create_shipments, django_assert_num_queries,
+):
+    """Тест: список и запись из модели чтения совпадают с обычным выводом,
+    список читается одним запросом без кэша справочников."""
+    url = request.getfixturevalue(url_fixture)
+    shipments = create_shipments(model, 3, **extra)
+    expected_list = api_client.get(url).data
+    expected_detail = api_client.get(f'{url}{shipments[0].id}/').data
+    assert not listing_model.objects.exists()
+
+    request.getfixturevalue('read_model_enabled')
+    call_command('rebuild_read_model')
+
+    with django_assert_num_queries(1):
+        response = api_client.get(url)
+    assert response.data == expected_list
+    assert api_client.get(f'{url}{shipments[0].id}/').data == expected_detail
+    assert api_client.get(f'{url}777/').status_code == 404
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url_fixture, model, listing_model, extra',
+                         ENDPOINTS, ids=['letters', 'packages'])
+def test_read_model_synced_on_writes(
+        request, url_fixture, model, listing_model, extra, api_client,
+        read_model_enabled, client_1, client_2, post_office_1, post_office_2,
+):
+    """Тест: модель чтения синхронизируется при создании, изменении
+    и удалении записей через API."""
+    url = request.getfixturevalue(url_fixture)
+    data = {'sender': client_1.id,
+            'recipient': client_2.id,
+            'departure_office': post_office_1.id,
+            'arrival_office': post_office_2.id,
+            **extra}
+
+    created = api_client.post(url, data, format='json').data
+    assert api_client.get(f'{url}{created["id"]}/').data == created
+
+    updated = api_client.patch(f'{url}{created["id"]}/',
+                               {'sender': client_2.id,
+                                'recipient': client_1.id},
+                               format='json').data
+    listing = listing_model.objects.get(pk=created['id'])
+    assert listing.sender_name == updated['sender'] == client_2.full_name
+
+    api_client.delete(f'{url}{created["id"]}/')
+    assert not listing_model.objects.exists()
+
+
+@pytest.mark.django_db
+def test_read_model_synced_on_reference_changes(
+        read_model_enabled, create_shipments, client_1, post_office_2,
+):
+    """Тест: изменение клиента или пункта обновляет все его отправления."""
+    create_shipments(Letter, 4, category=1, weight=10)
+    create_shipments(Package, 2, category=1, cost=10)
+
+    client_1.phone_number = '+79999999999'
+    client_1.save()
+    post_office_2.address = 'new_address'
+    post_office_2.save()
+
+    assert set(PackageListing.objects.filter(recipient=client_1)
+               .values_list('recipient_phone', flat=True)) == {'+79999999999'}
+    for listing_model in (LetterListing, PackageListing):
+        assert set(
+            listing_model.objects.filter(departure_office=post_office_2)
+            .values_list('departure_address', flat=True)
+        ) == {'new_address'}
+        assert set(
+            listing_model.objects.filter(arrival_office=post_office_2)
+            .values_list('arrival_address', flat=True)
+        ) == {'new_address'}
+
+
+@pytest.mark.django_db
+def test_read_model_synced_on_bulk_operations(
+        url_letters, api_client, read_model_enabled, client_1, client_2,
+        post_office_1, post_office_2,
+):
+    """Тест: модель чтения синхронизируется массовыми операциями."""
+    item = {'sender': client_1.id,
+            'recipient': client_2.id,
+            'departure_office': post_office_1.id,
+            'arrival_office': post_office_2.id,
+            'category': 1,
+            'weight': 10}
+    api_client.post(f'{url_letters}bulk/', [item] * 5, format='json')
+    assert LetterListing.objects.count() == 5
+
+    # Синхронизируются только созданные записи (по диапазону ключей),
+    # без проверки всей таблицы
+    LetterListing.objects.filter(pk=Letter.objects.first().pk).delete()
+    api_client.post(f'{url_letters}bulk/', [item] * 2, format='json')
+    assert LetterListing.objects.count() == 6
+    read_model.sync_shipments(Letter)
+    assert LetterListing.objects.count() == 7
+
+    new_office = PostOffice.objects.create(address='address_3',
+                                           postal_index='postal_index_3')
+    api_client.patch(f'{url_letters}bulk/',
+                     {'filter': {'category': 1},
+                      'data': {'arrival_office': new_office.id,
+                               'category': 2}},
+                     format='json')
+    assert set(LetterListing.objects.values_list(
+        'arrival_address', 'category_label')) == {('address_3',
+                                                   'Заказное письмо')}
+
+    ids = list(Letter.objects.values_list('id', flat=True)[:2])
+    api_client.delete(f'{url_letters}bulk/', {'ids': ids}, format='json')
+    assert (set(LetterListing.objects.values_list('id', flat=True))
+            == set(Letter.objects.values_list('id', flat=True)))
+    assert LetterListing.objects.count() == 5
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('enabled', [False, True], ids=['off', 'on'])
+@pytest.mark.parametrize('reference_fixture', ['client_1', 'post_office_1'])
+def test_reference_delete_cascades_in_one_query(
+        request, settings, enabled, reference_fixture, create_shipments,
+):
+    """Тест: отправления удаляемого клиента или пункта удаляются каскадом
+    без загрузки (одним запросом DELETE на модель), записи модели
+    чтения — одним запросом, статистика сбрасывается."""
+    settings.SHIPMENT_READ_MODEL = enabled
+    reference = request.getfixturevalue(reference_fixture)
+    create_shipments(Letter, 4, category=1, weight=10)
+    create_shipments(Package, 2, category=1, cost=10)
+    stats.get_stats()
+
+    with CaptureQueriesContext(connection) as context:
+        reference.delete()
+
+    tables = (Letter._meta.db_table, Package._meta.db_table)
+    shipment_queries = [query['sql'] for query in context.captured_queries
+                        if any(f'"{table}"' in query['sql']
+                               for table in tables)]
+    assert len(shipment_queries) == 2
+    assert all(sql.startswith('DELETE') for sql in shipment_queries)
+    assert not Letter.objects.exists() and not Package.objects.exists()
+    assert not LetterListing.objects.exists()
+    assert not PackageListing.objects.exists()
+    assert stats.get_stats()['letters']['total'] == 0
+
+
+@pytest.mark.django_db
+def test_read_model_synced_on_queryset_delete(read_model_enabled,
+                                              create_shipments):
+    """Тест: удаление выборки (например, действием админки) удаляет
+    записи модели чтения."""
+    letters = create_shipments(Letter, 4, category=1, weight=10)
+
+    Letter.objects.filter(pk__in=[letters[0].pk, letters[1].pk]).delete()
+    letters[2].delete()
+
+    assert list(LetterListing.objects.values_list('pk', flat=True)) == [
+        letters[3].pk]
@@ -0,0 +1,92 @@
+import pytest
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+
+from api.filters import filter_shipments
+from packages.models import (Letter, LetterListing, Package, PackageListing,
+                             PostOffice)
+
+
+@pytest.mark.django_db
+def test_filter_packages_by_category_office_and_cost(
+        url_packages, api_client, create_shipments, post_office_1,
+):
+    """Тест: «все экспресс-посылки из пункта X стоимостью более 5000»."""
+    create_shipments(Package, 4, category=6, cost=7000)
+    create_shipments(Package, 4, category=6, cost=100)
+    create_shipments(Package, 4, category=1, cost=7000)
+
+    response = api_client.get(
+        url_packages,
+        {'category': 6, 'departure_office': post_office_1.id,
+         'cost_min': 5001},
+    )
+
+    assert response.status_code == HTTP_200_OK
+    ids = [item['id'] for item in response.data['results']]
+    assert ids == list(
+        Package.objects.filter(category=6, departure_office=post_office_1,
+                               cost__gt=5000)
+        .values_list('id', flat=True)
+    )
+    assert len(ids) == 2
+
+
+@pytest.mark.django_db
+def test_filter_letters_by_postal_index_and_weight(
+        url_letters, api_client, create_shipments, post_office_2,
+):
+    """Тест: фильтрация писем по индексу пункта и диапазону веса."""
+    create_shipments(Letter, 4, category=1, weight=50)
+    create_shipments(Letter, 2, category=1, weight=500)
+
+    response = api_client.get(
+        url_letters,
+        {'arrival_index': post_office_2.postal_index,
+         'weight_min': 10, 'weight_max': 100},
+    )
+
+    assert response.status_code == HTTP_200_OK
+    assert len(response.data['results']) == 2
+    assert {item['arrival_index'] for item in response.data['results']} == {
+        post_office_2.postal_index}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [
+    {'category': 'express'},
+    {'weight_min': '-'},
+    {'sender': 'abc'},
+])
+def test_filter_invalid_value(params, url_letters, api_client):
+    """Тест: некорректное значение фильтра должно вернуть ошибку."""
+    response = api_client.get(url_letters, params)
+
+    assert response.status_code == HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.parametrize('model', [Letter, Package, LetterListing,
+                                   PackageListing])
+@pytest.mark.parametrize('params, index', [
+    ({'departure_office': 1}, 'departure_idx'),
+    ({'departure_office': 1, 'category': 6, 'range_min': 5000},
+     'departure_idx'),
+    ({'arrival_office': 1, 'category': 2}, 'arrival_idx'),
+    ({'arrival_index': '125009', 'range_max': 100}, 'arrival_idx'),
+    ({'sender': 1, 'category': 1}, 'sender_idx'),
+    ({'recipient': 1}, 'recipient_idx'),
+    ({'category': 6, 'range_min': 5000}, 'category_idx'),
+])
+@pytest.mark.django_db
+def test_filters_use_composite_indexes(model, params, index):
+    """Тест: каждая поддерживаемая комбинация фильтров использует
+    составной индекс (по плану EXPLAIN)."""
+    field = 'weight' if model in (Letter, LetterListing) else 'cost'
+    params = {key.replace('range', field): value
+              for key, value in params.items()}
+
+    plan = filter_shipments(model.objects.all(), params).explain()
+
+    assert f'USING INDEX {model._meta.model_name}_{index}' in plan
+    assert f'SCAN {model._meta.db_table}' not in plan
+    if 'arrival_index' in params:
+        assert f'INDEX {PostOffice._meta.db_table}_postal_index' in plan
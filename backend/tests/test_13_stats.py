@@ -0,0 +1,96 @@
+import pytest
+from rest_framework.status import HTTP_200_OK
+
+from packages.models import Letter, Package
+
+
+@pytest.fixture
+def url_stats():
+    return '/api/stats/'
+
+
+@pytest.mark.django_db
+def test_stats(url_stats, api_client, create_shipments, post_office_1,
+               post_office_2):
+    """Тест: статистика по типам отправлений, суммам и пунктам."""
+    create_shipments(Letter, 3, category=1, weight=10)
+    create_shipments(Letter, 1, category=4, weight=50)
+    create_shipments(Package, 2, category=6, cost=7000)
+
+    response = api_client.get(url_stats)
+
+    assert response.status_code == HTTP_200_OK
+    assert response.data['letters'] == {
+        'total': 4,
+        'average_weight': 20,
+        'by_category': [
+            {'category': 'Письмо', 'count': 3, 'average_weight': 10},
+            {'category': 'Экспресс-письмо', 'count': 1,
+             'average_weight': 50},
+        ],
+    }
+    assert response.data['packages'] == {
+        'total': 2,
+        'cost_sum': 14000,
+        'by_category': [
+            {'category': 'Экспресс-посылка', 'count': 2, 'cost_sum': 14000},
+        ],
+    }
+    assert response.data['post_offices'] == [
+        {'id': post_office_1.id,
+         'address': post_office_1.address,
+         'postal_index': post_office_1.postal_index,
+         'letters_sent': 3,
+         'letters_received': 1,
+         'packages_sent': 1,
+         'packages_received': 1},
+        {'id': post_office_2.id,
+         'address': post_office_2.address,
+         'postal_index': post_office_2.postal_index,
+         'letters_sent': 1,
+         'letters_received': 3,
+         'packages_sent': 1,
+         'packages_received': 1},
+    ]
+
+
+@pytest.mark.django_db
+def test_stats_empty(url_stats, api_client):
+    """Тест: статистика по пустой базе."""
+    response = api_client.get(url_stats)
+
+    assert response.data == {
+        'letters': {'total': 0, 'average_weight': None, 'by_category': []},
+        'packages': {'total': 0, 'cost_sum': 0, 'by_category': []},
+        'post_offices': [],
+    }
+
+
+@pytest.mark.django_db
+def test_stats_cached_until_change(
+        url_stats, url_letters, api_client, django_assert_num_queries,
+        create_shipments, client_1, client_2, post_office_1, post_office_2,
+):
+    """Тест: повторный запрос статистики не обращается к БД,
+    изменение писем (в том числе массовое) сбрасывает кэш."""
+    create_shipments(Letter, 2, category=1, weight=10)
+    with django_assert_num_queries(7):
+        api_client.get(url_stats)
+    with django_assert_num_queries(0):
+        api_client.get(url_stats)
+
+    item = {'sender': client_1.id,
+            'recipient': client_2.id,
+            'departure_office': post_office_1.id,
+            'arrival_office': post_office_2.id,
+            'category': 2,
+            'weight': 30}
+    api_client.post(url_letters, item, format='json')
+    assert api_client.get(url_stats).data['letters']['total'] == 3
+
+    api_client.post(f'{url_letters}bulk/', [item] * 2, format='json')
+    assert api_client.get(url_stats).data['letters']['total'] == 5
+
+    api_client.delete(f'{url_letters}bulk/', {'filter': {'category': 2}},
+                      format='json')
+    assert api_client.get(url_stats).data['letters']['total'] == 2
@@ -0,0 +1,128 @@
+import pytest
+from django.core.management import call_command
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+
+from packages import search
+from packages.models import Client, Letter, PostOffice
+
+
+@pytest.fixture
+def url_search():
+    return '/api/search/'
+
+
+@pytest.fixture
+def offices():
+    return [
+        PostOffice.objects.create(address='г. Москва, ул. Тверская, д. 10',
+                                  postal_index='125009'),
+        PostOffice.objects.create(address='г. Москва, ул. Арбат, д. 25',
+                                  postal_index='119002'),
+        PostOffice.objects.create(address='г. Казань, ул. Баумана, д. 5',
+                                  postal_index='420111'),
+    ]
+
+
+@pytest.mark.django_db
+def test_search_post_offices_and_clients(
+        url_search, api_client, offices, client_1,
+):
+    """Тест: поиск пунктов по словам адреса (последнее — по префиксу)
+    и клиентов по ФИО."""
+    response = api_client.get(url_search, {'q': 'москва тверс'})
+
+    assert response.status_code == HTTP_200_OK
+    assert response.data['post_offices'] == [
+        {'id': offices[0].id,
+         'address': offices[0].address,
+         'postal_index': offices[0].postal_index},
+    ]
+    assert response.data['clients'] == []
+
+    response = api_client.get(url_search,
+                              {'q': 'lastname_1', 'type': 'clients'})
+    assert response.data == {'clients': [
+        {'id': client_1.id,
+         'full_name': client_1.full_name,
+         'phone_number': client_1.phone_number},
+    ]}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [
+    {'q': 'москва', 'type': 'letters'},
+    {'q': 'москва', 'limit': 0},
+    {'q': 'москва', 'limit': 'abc'},
+])
+def test_search_invalid_params(url_search, api_client, params):
+    """Тест: некорректные параметры поиска."""
+    response = api_client.get(url_search, params)
+
+    assert response.status_code == HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_search_index_synced_by_signals(url_search, api_client, offices):
+    """Тест: изменение и удаление пунктов обновляет поисковый индекс."""
+    offices[2].address = 'г. Самара, ул. Ленина, д. 1'
+    offices[2].save()
+    offices[1].delete()
+
+    def found(text):
+        return [office['id'] for office in api_client.get(
+            url_search, {'q': text, 'type': 'post_offices'}
+        ).data['post_offices']]
+
+    assert found('казань') == []
+    assert found('самара') == [offices[2].id]
+    assert found('москва') == [offices[0].id]
+
+
+@pytest.mark.django_db
+def test_search_rebuild_after_bulk_create():
+    """Тест: после массовой загрузки индекс перестраивается."""
+    Client.objects.bulk_create([
+        Client(name='Алексей', lastname='Иванов', phone_number='+79160000000'),
+    ])
+    assert search.search(Client, 'иванов', 10) == []
+
+    call_command('fill_db')
+
+    assert len(search.search(Client, 'иванов', 10)) == 2
+    assert len(search.search(PostOffice, 'москва', 10)) > 0
+
+
+@pytest.mark.django_db
+def test_search_uses_fulltext_index(offices):
+    """Тест: фильтрация по поиску использует индекс FTS5."""
+    queryset = search.filter_queryset(Letter.objects.all(), PostOffice,
+                                      'арбат',
+                                      ('departure_office', 'arrival_office'))
+
+    assert 'VIRTUAL TABLE INDEX' in queryset.explain()
+
+
+@pytest.mark.django_db
+def test_admin_search_uses_fulltext_index(
+        admin_client, offices, client_1, client_2,
+):
+    """Тест: поиск писем в админке по адресу пункта."""
+    letter = Letter.objects.create(sender=client_1,
+                                   recipient=client_2,
+                                   departure_office=offices[2],
+                                   arrival_office=offices[1],
+                                   category=1,
+                                   weight=10)
+    Letter.objects.create(sender=client_1,
+                          recipient=client_2,
+                          departure_office=offices[0],
+                          arrival_office=offices[2],
+                          category=1,
+                          weight=10)
+
+    response = admin_client.get('/admin/packages/letter/', {'q': 'арбат'})
+    assert list(response.context['cl'].result_list) == [letter]
+
+    response = admin_client.get('/admin/packages/postoffice/',
+                                {'q': 'Баумана'})
+    assert list(response.context['cl'].result_list) == [offices[2]]
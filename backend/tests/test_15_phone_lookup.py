@@ -0,0 +1,192 @@
+import pytest
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test.utils import CaptureQueriesContext
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+
+from api.views import PhoneShipmentsView
+from packages.cache import clients_cache, post_offices_cache
+from packages.models import Client, Letter, Package, normalize_phone
+
+
+@pytest.mark.parametrize('phone_number', [
+    '+79161234567',
+    '89161234567',
+    '79161234567',
+    '9161234567',
+    '+7 (916) 123-45-67',
+    '8-916-123-45-67',
+])
+def test_normalize_phone(phone_number):
+    """Тест: разные форматы номера приводятся к одному ключу."""
+    assert normalize_phone(phone_number) == '+79161234567'
+
+
+@pytest.mark.django_db
+def test_phone_key_filled_on_save_and_bulk_create(client_1):
+    """Тест: ключ номера заполняется при сохранении,
+    массовом создании и массовом изменении."""
+    assert client_1.phone_key == '+71111111111'
+
+    Client.objects.bulk_create([
+        Client(name='name_3', lastname='lastname_3',
+               phone_number='+73333333333'),
+    ])
+    assert Client.objects.filter(phone_key='+73333333333').exists()
+
+    Client.objects.filter(pk=client_1.pk).update(phone_number='+74444444444')
+    client_1.refresh_from_db()
+    assert client_1.phone_key == '+74444444444'
+
+
+@pytest.mark.parametrize('phone_number', [None, '', '12345',
+                                          '+7916123456789'])
+def test_normalize_unparsable_phone(phone_number):
+    """Тест: у пустого номера и номера другой длины ключа нет."""
+    assert normalize_phone(phone_number) is None
+
+
+@pytest.mark.django_db
+def test_phone_number_is_unique(client_1):
+    """Тест: второй клиент с тем же номером не проходит валидацию."""
+    client = Client(name='name_3',
+                    lastname='lastname_3',
+                    phone_number=client_1.phone_number)
+
+    with pytest.raises(ValidationError) as error:
+        client.full_clean()
+    assert 'phone_number' in error.value.message_dict
+
+    client_1.full_clean()
+
+
+@pytest.mark.django_db
+def test_phone_shipments(api_client, create_shipments, client_1, client_2):
+    """Тест: письма и посылки, отправленные и полученные по номеру."""
+    letters = create_shipments(Letter, 2, category=1, weight=10)
+    packages = create_shipments(Package, 2, category=1, cost=100)
+    client_3 = Client.objects.create(name='name_3',
+                                     lastname='lastname_3',
+                                     phone_number='+73333333333')
+    Letter.objects.create(sender=client_2,
+                          recipient=client_3,
+                          departure_office=letters[0].departure_office,
+                          arrival_office=letters[0].arrival_office,
+                          category=1,
+                          weight=10)
+
+    response = api_client.get('/api/phone/8-111-111-11-11/')
+
+    assert response.status_code == HTTP_200_OK
+    assert response.data['phone'] == client_1.phone_number
+    assert [row['id'] for row in response.data['letters']] == [
+        letter.id for letter in letters]
+    assert [row['id'] for row in response.data['packages']] == [
+        package.id for package in packages]
+    assert response.data['packages'][0] == {
+        'id': packages[0].id,
+        'sender': client_1.full_name,
+        'recipient': client_2.full_name,
+        'departure_office': packages[0].departure_office.address,
+        'arrival_office': packages[0].arrival_office.address,
+        'departure_index': packages[0].departure_office.postal_index,
+        'arrival_index': packages[0].arrival_office.postal_index,
+        'phone_number': client_2.phone_number,
+        'category': packages[0].get_category_display(),
+        'cost': 100,
+    }
+
+    response = api_client.get('/api/phone/+79999999999/')
+    assert response.data == {'phone': '+79999999999',
+                             'letters': [],
+                             'packages': []}
+
+
+@pytest.mark.django_db
+def test_phone_shipments_single_query(api_client, create_shipments):
+    """Тест: при заполненном кэше справочников — один запрос к БД."""
+    create_shipments(Letter, 3, category=1, weight=10)
+    create_shipments(Package, 3, category=1, cost=100)
+    clients_cache.preload()
+    post_offices_cache.preload()
+
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get('/api/phone/+71111111111/')
+
+    assert response.status_code == HTTP_200_OK
+    assert len(response.data['letters']) == 3
+    assert len(response.data['packages']) == 3
+    assert len(queries) == 1
+    assert 'UNION ALL' in queries[0]['sql']
+
+
+@pytest.mark.django_db
+def test_phone_shipments_invalid_phone(api_client):
+    """Тест: некорректный номер телефона."""
+    response = api_client.get('/api/phone/12345/')
+
+    assert response.status_code == HTTP_400_BAD_REQUEST
+    assert 'phone' in response.data
+
+
+@pytest.mark.django_db
+def test_phone_lookup_uses_indexes(client_1):
+    """Тест: поиск клиента и его отправлений идёт по индексам."""
+    plan = PhoneShipmentsView.get_queryset(client_1.phone_key).explain()
+
+    assert 'INDEX sqlite_autoindex_packages_client' in plan
+    for index in ('letter_sender_idx', 'letter_recipient_idx',
+                  'package_sender_idx', 'package_recipient_idx'):
+        assert f'INDEX {index}' in plan
+    assert 'SCAN' not in plan
+
+
+@pytest.mark.django_db
+def test_unparsable_phones_do_not_collide():
+    """Тест: клиенты с некорректными номерами (например, из старых
+    данных) сохраняются без ключа и не считаются дубликатами."""
+    for phone_number in ('', '123', '456'):
+        Client.objects.create(name='name', lastname='lastname',
+                              phone_number=phone_number)
+
+    assert Client.objects.filter(phone_key__isnull=True).count() == 3
+    Client(name='name', lastname='lastname', phone_number='').validate_unique()
+
+
+
+def migrate(executor, targets):
+    """Применение (отмена) миграций; модели состояния ``targets``."""
+    executor.loader.build_graph()
+    executor.migrate(targets)
+    return executor.loader.project_state(targets).apps
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fill_phone_keys_migration():
+    """Тест: миграция ключей номеров сообщает обо всех повторах сразу,
+    клиенты с некорректными номерами остаются без ключа."""
+    executor = MigrationExecutor(connection)
+    old_apps = migrate(executor, [('packages', '0004_fulltext_search')])
+    OldClient = old_apps.get_model('packages', 'Client')
+    phone_numbers = ('', 'нет', '+71111111111', '81111111111',
+                     '+72222222222', '+73333333333', '8 (333) 333-33-33')
+    pks = [OldClient.objects.create(name='name', lastname='lastname',
+                                    phone_number=phone_number).pk
+           for phone_number in phone_numbers]
+
+    try:
+        with pytest.raises(ValueError) as error:
+            migrate(executor, [('packages', '0005_client_phone_key')])
+        message = str(error.value)
+        assert f'+71111111111 (клиенты {pks[2]}, {pks[3]})' in message
+        assert f'+73333333333 (клиенты {pks[5]}, {pks[6]})' in message
+        assert '+72222222222' not in message
+
+        OldClient.objects.filter(pk__in=[pks[3], pks[6]]).delete()
+    finally:
+        migrate(executor, executor.loader.graph.leaf_nodes())
+
+    assert dict(Client.objects.values_list('pk', 'phone_key')) == {
+        pks[0]: None, pks[1]: None, pks[2]: '+71111111111',
+        pks[4]: '+72222222222', pks[5]: '+73333333333'}
@@ -0,0 +1,111 @@
+import pytest
+from django.db import OperationalError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from letters_packages.sqlite3.base import DatabaseWrapper
+from letters_packages.transactions import atomic_write
+from packages.models import Client
+
+
+@pytest.fixture
+def file_connections(tmp_path):
+    """Фабрика соединений с файловой БД (в тестах основная БД
+    находится в памяти, а режим WAL доступен только для файла)."""
+    wrappers = []
+
+    def create(**options):
+        settings_dict = {
+            **connection.settings_dict,
+            'NAME': str(tmp_path / 'db.sqlite3'),
+            'OPTIONS': {**connection.settings_dict['OPTIONS'], **options},
+        }
+        wrapper = DatabaseWrapper(settings_dict, alias=f'file_{len(wrappers)}')
+        wrappers.append(wrapper)
+        return wrapper
+
+    yield create
+    for wrapper in wrappers:
+        wrapper.close()
+
+
+def pragma(wrapper, name):
+    with wrapper.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+def test_pragmas_applied_to_new_connection(file_connections):
+    """Тест: PRAGMA профиля выполняются для каждого нового соединения."""
+    wrapper = file_connections()
+
+    assert pragma(wrapper, 'journal_mode') == 'wal'
+    assert pragma(wrapper, 'synchronous') == 1
+    assert pragma(wrapper, 'busy_timeout') == 5000
+    assert pragma(wrapper, 'cache_size') == -64000
+    assert pragma(wrapper, 'foreign_keys') == 1
+
+
+@pytest.mark.django_db
+def test_pragmas_overridden_in_options(file_connections):
+    """Тест: PRAGMA переопределяются и отключаются в OPTIONS."""
+    wrapper = file_connections(pragmas={'journal_mode': None,
+                                        'busy_timeout': 100})
+
+    assert pragma(wrapper, 'journal_mode') == 'delete'
+    assert pragma(wrapper, 'busy_timeout') == 100
+
+
+@pytest.mark.django_db
+def test_immediate_transaction_takes_write_lock(file_connections):
+    """Тест: транзакция записи открывается BEGIN IMMEDIATE, поэтому
+    конкурирующая запись ждёт блокировку, а не начинается параллельно;
+    обычная транзакция (BEGIN DEFERRED) чтению и записи не мешает."""
+    writer = file_connections()
+    other = file_connections(pragmas={'busy_timeout': 0})
+    with writer.cursor() as cursor:
+        cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+
+    writer._start_transaction_under_autocommit()
+    try:
+        with writer.cursor() as cursor:
+            cursor.execute('SELECT * FROM item').fetchall()
+        with other.cursor() as cursor:
+            cursor.execute('INSERT INTO item VALUES (1)')
+    finally:
+        writer.connection.rollback()
+
+    writer.begin_mode = 'IMMEDIATE'
+    writer._start_transaction_under_autocommit()
+    try:
+        with pytest.raises(OperationalError, match='locked'):
+            with other.cursor() as cursor:
+                cursor.execute('INSERT INTO item VALUES (2)')
+    finally:
+        writer.connection.rollback()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_atomic_write_mode():
+    """Тест: atomic_write() открывает транзакцию BEGIN IMMEDIATE,
+    atomic() — BEGIN DEFERRED, вложенные блоки транзакций не открывают."""
+    with CaptureQueriesContext(connection) as queries:
+        with atomic_write():
+            with transaction.atomic():
+                Client.objects.exists()
+        with transaction.atomic():
+            with atomic_write():
+                Client.objects.exists()
+
+    assert [query['sql'] for query in queries
+            if query['sql'].startswith('BEGIN')] == ['BEGIN IMMEDIATE',
+                                                     'BEGIN DEFERRED']
+    assert connection.begin_mode is None
+
+
+@pytest.mark.django_db
+def test_default_connection_uses_profile():
+    """Тест: основное соединение настроено профилем."""
+    assert connection.vendor == 'sqlite'
+    assert connection.transaction_mode == 'DEFERRED'
+    assert pragma(connection, 'busy_timeout') == 5000
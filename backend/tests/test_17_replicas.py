@@ -0,0 +1,88 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED
+
+from letters_packages import routers
+from letters_packages.routers import PrimaryReplicaRouter
+from packages.models import Letter
+
+
+@pytest.fixture
+def replica(transactional_db, tmp_path, settings):
+    """Реплика — вторая файловая БД SQLite, подключаемая на время теста."""
+    connections.settings['replica'] = {
+        **connections.settings[DEFAULT_DB_ALIAS],
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    settings.DATABASE_REPLICAS = ['replica']
+    yield 'replica'
+    connections['replica'].close()
+    del connections['replica']
+    del connections.settings['replica']
+
+
+def test_router_reads_from_replicas_only_in_safe_requests(settings):
+    """Тест: чтение из реплик только когда это разрешено запросом,
+    после записи — из основной БД."""
+    settings.DATABASE_REPLICAS = ['replica']
+    router = PrimaryReplicaRouter()
+
+    assert router.db_for_read(Letter) == DEFAULT_DB_ALIAS
+
+    routers.start_request(use_replicas=True)
+    try:
+        assert router.db_for_read(Letter) == 'replica'
+        assert router.db_for_write(Letter) == DEFAULT_DB_ALIAS
+        assert router.db_for_read(Letter) == DEFAULT_DB_ALIAS
+        assert routers.has_written()
+    finally:
+        routers.finish_request()
+
+    assert router.db_for_read(Letter) == DEFAULT_DB_ALIAS
+
+
+def sync_replicas():
+    call_command('sync_replicas', stdout=StringIO())
+
+
+def test_reads_go_to_replica(
+        replica, api_client, url_letters, create_shipments,
+):
+    """Тест: списки и записи читаются из реплики, пока она не обновлена
+    командой sync_replicas."""
+    letter, = create_shipments(Letter, 1, category=1, weight=10)
+    sync_replicas()
+    create_shipments(Letter, 1, category=1, weight=20)
+
+    response = api_client.get(url_letters)
+
+    assert response.status_code == HTTP_200_OK
+    assert [row['id'] for row in response.data['results']] == [letter.id]
+    assert api_client.get(f'{url_letters}{letter.id}/').status_code == (
+        HTTP_200_OK)
+
+    sync_replicas()
+    response = api_client.get(url_letters)
+    assert len(response.data['results']) == 2
+
+
+def test_client_pinned_to_primary_after_write(
+        replica, api_client, url_letters, letter_data,
+):
+    """Тест: после записи клиент читает из основной БД и видит
+    свои изменения до обновления реплики."""
+    sync_replicas()
+
+    response = api_client.post(url_letters, letter_data, format='json')
+    assert response.status_code == HTTP_201_CREATED
+    assert routers.REPLICA_PIN_COOKIE in response.cookies
+
+    response = api_client.get(f'{url_letters}{response.data["id"]}/')
+    assert response.status_code == HTTP_200_OK
+
+    api_client.cookies.clear()
+    response = api_client.get(url_letters)
+    assert response.data['results'] == []
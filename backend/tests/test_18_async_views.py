@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.status import (HTTP_200_OK, HTTP_404_NOT_FOUND,
+                                   HTTP_405_METHOD_NOT_ALLOWED)
+
+from api import async_views
+from packages.models import Letter, Package
+
+
+@pytest.fixture
+def async_client():
+    """Синхронный вызов AsyncClient (запрос проходит через ASGIHandler)."""
+    client = AsyncClient()
+
+    async def request(method, url, **kwargs):
+        return await getattr(client, method)(url, **kwargs)
+
+    return async_to_sync(request)
+
+
+def test_async_views_are_coroutines():
+    """Тест: представления асинхронные (ASGI не переводит их
+    в общий синхронный поток)."""
+    for view in (async_views.letters_list, async_views.letters_detail,
+                 async_views.packages_list, async_views.packages_detail):
+        assert asyncio.iscoroutinefunction(view)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('model, extra, url', [
+    (Letter, {'weight': 10}, '/api/letters/'),
+    (Package, {'cost': 100}, '/api/packages/'),
+])
+def test_async_list_and_retrieve(
+        api_client, async_client, create_shipments, model, extra, url,
+):
+    """Тест: асинхронные список и запись совпадают с синхронными."""
+    shipments = create_shipments(model, 3, category=1, **extra)
+    async_url = url.replace('/api/', '/api/async/')
+
+    response = async_client('get', f'{async_url}?page_size=2')
+    assert response.status_code == HTTP_200_OK
+    assert response.json()['results'] == (
+        api_client.get(url, {'page_size': 2}).json()['results'])
+    assert async_url in response.json()['next']
+
+    response = async_client('get', f'{async_url}{shipments[0].id}/')
+    assert response.status_code == HTTP_200_OK
+    assert response.json() == api_client.get(
+        f'{url}{shipments[0].id}/').json()
+
+    response = async_client('get', f'{async_url}0/')
+    assert response.status_code == HTTP_404_NOT_FOUND
+
+    response = async_client('post', async_url, data={})
+    assert response.status_code == HTTP_405_METHOD_NOT_ALLOWED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_views_run_in_thread_pool(async_client, monkeypatch):
+    """Тест: работа представления выполняется в потоке пула."""
+    threads = []
+    call_view = async_views.call_view
+
+    def record_thread(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return call_view(*args, **kwargs)
+
+    monkeypatch.setattr(async_views, 'call_view', record_thread)
+    response = async_client('get', '/api/async/letters/')
+
+    assert response.status_code == HTTP_200_OK
+    assert threads[0].startswith('async-views')
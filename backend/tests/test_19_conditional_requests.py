@@ -0,0 +1,211 @@
+import pytest
+from django.db import transaction
+from rest_framework.status import (HTTP_200_OK, HTTP_304_NOT_MODIFIED,
+                                   HTTP_412_PRECONDITION_FAILED)
+
+from packages import read_model
+from packages.models import VersionConflict
+
+
+@pytest.mark.django_db
+def test_detail_not_modified(endpoint, api_client, django_assert_num_queries):
+    """Тест: неизменённая запись — 304 без тела по If-None-Match
+    и If-Modified-Since."""
+    url, shipments, _ = endpoint
+    detail_url = f'{url}{shipments[0].id}/'
+    response = api_client.get(detail_url)
+    etag = response['ETag']
+    assert response.status_code == HTTP_200_OK
+    assert etag.startswith('"1-')
+    assert 'Last-Modified' in response
+
+    with django_assert_num_queries(1):
+        response = api_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTP_304_NOT_MODIFIED
+    assert response['ETag'] == etag
+    assert not response.content
+
+    response = api_client.get(
+        detail_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+    assert response.status_code == HTTP_304_NOT_MODIFIED
+
+    api_client.patch(detail_url, {'category': 2}, format='json')
+    response = api_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTP_200_OK
+    assert response['ETag'].startswith('"2-')
+
+
+@pytest.mark.django_db
+def test_list_not_modified(endpoint, api_client):
+    """Тест: неизменённая страница списка — 304, новая запись
+    и изменение клиента меняют ETag."""
+    url, shipments, create_shipment = endpoint
+    etag = api_client.get(url)['ETag']
+
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTP_304_NOT_MODIFIED
+
+    response = api_client.get(url, {'page_size': 2}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTP_200_OK
+
+    create_shipment()
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTP_200_OK
+    etag = response['ETag']
+
+    client = shipments[0].sender
+    client.name = 'new_name'
+    client.save()
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTP_200_OK
+    assert 'new_name' in response.data['results'][0]['sender']
+
+
+@pytest.mark.django_db
+def test_reference_change_updates_detail_etag(endpoint, api_client):
+    """Тест: изменение почтового пункта меняет версию отправлений."""
+    url, shipments, _ = endpoint
+    detail_url = f'{url}{shipments[0].id}/'
+    etag = api_client.get(detail_url)['ETag']
+
+    office = shipments[0].departure_office
+    office.address = 'new_address'
+    office.save()
+
+    response = api_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTP_200_OK
+    assert response.data['departure_office'] == 'new_address'
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('relation, changes, field, value', [
+    ('departure_office', {'address': 'new_address'}, 'departure_office',
+     'new_address'),
+    ('sender', {'lastname': 'new_lastname'}, 'sender', 'new_lastname'),
+])
+def test_reference_queryset_update_changes_etag(
+        endpoint, api_client, settings, relation, changes, field, value,
+):
+    """Тест: массовое изменение почтовых пунктов и клиентов
+    (``QuerySet.update``) меняет время изменения, ETag отправлений
+    и модель чтения."""
+    url, shipments, _ = endpoint
+    settings.SHIPMENT_READ_MODEL = True
+    read_model.rebuild()
+    detail_url = f'{url}{shipments[0].id}/'
+    etag = api_client.get(detail_url)['ETag']
+    reference = getattr(shipments[0], relation)
+    reference_model = type(reference)
+
+    reference_model.objects.filter(pk=reference.pk).update(**changes)
+
+    assert reference_model.objects.get(
+        pk=reference.pk).updated_at > reference.updated_at
+    response = api_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTP_200_OK
+    assert value in response.data[field]
+
+    reference_model.objects.filter(pk=reference.pk).update(
+        updated_at=reference.updated_at)
+    assert reference_model.objects.get(
+        pk=reference.pk).updated_at == reference.updated_at
+
+
+@pytest.mark.django_db
+def test_reference_save_does_not_touch_shipments(
+        endpoint, api_client, settings, django_assert_num_queries,
+):
+    """Тест: изменение клиента не изменяет сами отправления, а его
+    сохранение без изменения выводимых полей не меняет ETag и не
+    обновляет модель чтения."""
+    url, shipments, _ = endpoint
+    settings.SHIPMENT_READ_MODEL = True
+    read_model.rebuild()
+    detail_url = f'{url}{shipments[0].id}/'
+    etag = api_client.get(detail_url)['ETag']
+    client = type(shipments[0].sender).objects.get(pk=shipments[0].sender_id)
+
+    # UPDATE клиента и переиндексация поиска, без модели чтения
+    with django_assert_num_queries(3):
+        client.save()
+    assert api_client.get(detail_url)['ETag'] == etag
+
+    client.name = 'new_name'
+    client.save()
+    response = api_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTP_200_OK
+    model = type(shipments[0])
+    shipment = model.objects.get(pk=shipments[0].pk)
+    assert (shipment.version, shipment.updated_at) == (
+        shipments[0].version, shipments[0].updated_at)
+
+
+@pytest.mark.django_db
+def test_update_if_match(endpoint, api_client):
+    """Тест: изменение с If-Match только при совпадении ETag."""
+    url, shipments, _ = endpoint
+    detail_url = f'{url}{shipments[0].id}/'
+    etag = api_client.get(detail_url)['ETag']
+
+    response = api_client.patch(detail_url, {'category': 2}, format='json',
+                                HTTP_IF_MATCH=etag)
+    assert response.status_code == HTTP_200_OK
+    new_etag = response['ETag']
+    assert new_etag != etag
+    assert api_client.get(detail_url)['ETag'] == new_etag
+
+    response = api_client.patch(detail_url, {'category': 3}, format='json',
+                                HTTP_IF_MATCH=etag)
+    assert response.status_code == HTTP_412_PRECONDITION_FAILED
+    shipments[0].refresh_from_db()
+    assert shipments[0].category == 2
+
+    response = api_client.patch(detail_url, {'category': 3}, format='json',
+                                HTTP_IF_MATCH='*')
+    assert response.status_code == HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_concurrent_save_raises_conflict(endpoint):
+    """Тест: сохранение записи, изменённой после загрузки, не проходит."""
+    _, shipments, _ = endpoint
+    model = type(shipments[0])
+    stale = model.objects.get(pk=shipments[0].pk)
+
+    model.objects.filter(pk=stale.pk).update(category=2)
+    stale.category = 3
+    with pytest.raises(VersionConflict), transaction.atomic():
+        stale.save()
+
+    current = model.objects.get(pk=stale.pk)
+    assert (current.category, current.version) == (2, 2)
+    current.category = 3
+    current.save()
+    assert current.version == 3
+
+
+@pytest.mark.django_db
+def test_read_model_etags_match(endpoint, api_client, settings):
+    """Тест: ETag из модели чтения совпадают с обычными,
+    в том числе после изменения клиента."""
+    url, shipments, _ = endpoint
+    detail_url = f'{url}{shipments[0].id}/'
+    client = shipments[0].recipient
+    client.name = 'new_name'
+    client.save()
+    expected = (api_client.get(url)['ETag'],
+                api_client.get(detail_url)['ETag'])
+
+    settings.SHIPMENT_READ_MODEL = True
+    read_model.rebuild()
+    assert (api_client.get(url)['ETag'],
+            api_client.get(detail_url)['ETag']) == expected
+
+    client.name = 'other_name'
+    client.save()
+    settings.SHIPMENT_READ_MODEL = False
+    expected = (api_client.get(url)['ETag'],
+                api_client.get(detail_url)['ETag'])
+    settings.SHIPMENT_READ_MODEL = True
+    assert (api_client.get(url)['ETag'],
+            api_client.get(detail_url)['ETag']) == expected
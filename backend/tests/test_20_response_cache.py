@@ -0,0 +1,134 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import SystemCheckError
+from rest_framework.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED
+
+from api.response_cache import CachedResponse, ResponseCache, response_cache
+
+
+@pytest.mark.django_db
+def test_list_served_from_cache(
+        endpoint, api_client, django_assert_num_queries,
+):
+    """Тест: повторный запрос списка отдаётся из кэша без обращения к БД,
+    разные параметры — разные записи кэша."""
+    url, _, _ = endpoint
+    response = api_client.get(url)
+
+    with django_assert_num_queries(0):
+        cached = api_client.get(url)
+    assert cached.status_code == HTTP_200_OK
+    assert cached.content == response.content
+    assert cached['Content-Type'] == response['Content-Type']
+    assert cached['ETag'] == response['ETag']
+    assert cached['Vary'] == response['Vary']
+    assert cached['Allow'] == response['Allow']
+    assert (response_cache.hits, response_cache.misses) == (1, 1)
+
+    with django_assert_num_queries(0):
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=cached['ETag'])
+    assert response.status_code == HTTP_304_NOT_MODIFIED
+    assert response['Vary'] == cached['Vary']
+
+    response = api_client.get(url, {'page_size': 1})
+    assert len(response.json()['results']) == 1
+    assert response_cache.misses == 2
+
+
+@pytest.mark.django_db
+def test_list_cache_invalidated_by_writes(endpoint, api_client):
+    """Тест: изменение отправлений, клиентов и пунктов (в том числе
+    массовое) начинает новое поколение кэша."""
+    url, shipments, create_shipment = endpoint
+
+    def results():
+        return api_client.get(url).json()['results']
+
+    assert len(results()) == 3
+    create_shipment()
+    assert len(results()) == 4
+
+    client = shipments[0].sender
+    client.name = 'new_name'
+    client.save()
+    assert 'new_name' in results()[0]['sender']
+
+    office = shipments[0].departure_office
+    office.address = 'new_address'
+    office.save()
+    assert results()[0]['departure_office'] == 'new_address'
+
+    response = api_client.delete(f'{url}bulk/',
+                                 {'ids': [shipments[0].id]}, format='json')
+    assert response.status_code == HTTP_200_OK
+    assert len(results()) == 3
+
+
+@pytest.mark.django_db
+def test_list_cache_only_for_json(endpoint, api_client, settings):
+    """Тест: кэшируются только ответы JSON и только при включённом кэше."""
+    url, _, _ = endpoint
+    api_client.get(url, {'format': 'api'})
+    assert len(response_cache) == 0
+
+    settings.RESPONSE_CACHE = False
+    api_client.get(url)
+    assert len(response_cache) == 0
+
+
+@pytest.mark.django_db
+def test_list_cache_timeout(endpoint, api_client, monkeypatch):
+    """Тест: устаревший ответ не отдаётся из кэша и удаляется."""
+    url, _, _ = endpoint
+    monkeypatch.setattr('api.response_cache.RESPONSE_CACHE_TIMEOUT', 0)
+    api_client.get(url)
+
+    api_client.get(url)
+
+    assert (response_cache.hits, response_cache.misses) == (0, 2)
+    assert len(response_cache) == 1
+
+
+def test_local_cache_deploy_check(settings, tmp_path):
+    """Тест: при локальном кэше Django check --deploy предупреждает,
+    что сброс кэша ответов и кэшей справочников действует только
+    в своём процессе (справочники кэшируются и без кэша ответов)."""
+    with pytest.raises(SystemCheckError, match='кэш ответов списков'):
+        call_command('check', deploy=True, fail_level='WARNING',
+                     tags=['caches'])
+
+    settings.RESPONSE_CACHE = False
+    with pytest.raises(SystemCheckError,
+                       match='api.W001.*Кэши справочников сбрасываются'):
+        call_command('check', deploy=True, fail_level='WARNING',
+                     tags=['caches'])
+
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(tmp_path),
+    }}
+    call_command('check', deploy=True, fail_level='WARNING',
+                 tags=['caches'])
+
+
+def test_response_cache_size_limits():
+    """Тест: вытеснение по суммарному размеру, крупные ответы
+    не кэшируются."""
+    cache = ResponseCache(max_bytes=10, max_item_bytes=6)
+
+    def entry(size):
+        return CachedResponse(b'x' * size, 'application/json', '"etag"')
+
+    cache.set('a', entry(4))
+    cache.set('b', entry(4))
+    cache.get('a')
+    cache.set('c', entry(4))
+    assert ('a' in cache, 'b' in cache, 'c' in cache) == (True, False, True)
+    assert cache.size == 8
+
+    cache.set('d', entry(7))
+    assert 'd' not in cache
+
+    cache.set('a', entry(2))
+    cache.delete('c')
+    assert cache.size == 2
@@ -0,0 +1,231 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+
+from packages.importers import LetterImporter, PackageImporter
+from packages.models import (Client, Letter, LetterListing, Package,
+                             PostOffice)
+
+
+def write_csv(path, name, lines):
+    csv_file = path / name
+    csv_file.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(csv_file)
+
+
+def fill_db(*args, **options):
+    out = io.StringIO()
+    call_command('fill_db', *args, stdout=out, **options)
+    return out.getvalue()
+
+
+@pytest.mark.django_db
+def test_fill_db_default_files():
+    """Тест: без параметров импортируются все файлы static/data,
+    отправления связываются по телефонам и индексам."""
+    output = fill_db()
+
+    assert Client.objects.count() == 8
+    assert PostOffice.objects.count() == 8
+    assert Letter.objects.count() == 8
+    assert Package.objects.count() == 8
+    letter = Letter.objects.get(sender__phone_number='+79161234567')
+    assert letter.recipient.phone_number == '+79263334455'
+    assert letter.departure_office.postal_index == '125009'
+    assert letter.arrival_office.postal_index == '191186'
+    assert 'строк/с' in output
+
+
+@pytest.mark.django_db
+def test_fill_db_repeat_skips_existing_references():
+    """Тест: повторный импорт не создаёт дубликатов клиентов
+    и почтовых пунктов, ошибки выводятся с номерами строк."""
+    fill_db()
+    output = fill_db('--clients', 'static/data/clients.csv',
+                     '--post-offices', 'static/data/post_offices.csv')
+
+    assert Client.objects.count() == 8
+    assert PostOffice.objects.count() == 8
+    assert 'строка 2: phone_number: Клиент с таким номером' in output
+    assert 'строка 2: postal_index: Почтовый пункт с таким индексом' in output
+
+
+@pytest.mark.django_db
+def test_fill_db_repeat_skips_shipments():
+    """Тест: повторный импорт не дублирует письма и посылки,
+    с --append записи добавляются."""
+    fill_db()
+    output = fill_db()
+
+    assert Letter.objects.count() == 8
+    assert Package.objects.count() == 8
+    assert 'Модель Letter уже заполнена' in output
+    assert 'Модель Package уже заполнена' in output
+
+    fill_db('--letters', 'static/data/letters.csv', '--append')
+    assert Letter.objects.count() == 16
+
+
+@pytest.mark.django_db
+def test_fill_db_row_errors(tmp_path):
+    """Тест: ошибочные строки пропускаются, остальные сохраняются."""
+    clients = write_csv(tmp_path, 'clients.csv', [
+        'name;lastname;middle_name;phone_number',
+        'Иван;Иванов;;+79160000001',
+        'Пётр;Петров;Петрович;+79160000002',
+        'Павел;Павлов;;+7916',
+        'Иван;Иванов;;79160000001',
+    ])
+    offices = write_csv(tmp_path, 'offices.csv', [
+        'address;postal_index',
+        'г. Москва;125009',
+        'г. Казань;420111',
+        'г. Самара;4430',
+    ])
+    letters = write_csv(tmp_path, 'letters.csv', [
+        'sender_phone;recipient_phone;departure_index;arrival_index;'
+        'category;weight',
+        '+79160000001;89160000002;125009;420111;1;20',
+        '+79160000001;+79169999999;125009;420111;1;20',
+        '+79160000001;+79160000002;125009;125009;1;20',
+        '+79160000001;+79160000001;125009;420111;1;20',
+        '+79160000001;+79160000002;125009;420111;9;20',
+        '+79160000001;+79160000002;125009;000000;2;0',
+        '+79160000002;+79160000001;420111;125009;2;35',
+    ])
+
+    output = fill_db('--clients', clients, '--post-offices', offices,
+                     '--letters', letters, '--batch-size', '2')
+
+    assert Client.objects.count() == 2
+    assert PostOffice.objects.count() == 2
+    assert Letter.objects.count() == 2
+    assert Client.objects.filter(phone_key='+79160000002').exists()
+    assert 'создано 2, ошибок 5' in output
+    assert 'строка 3: recipient: Клиент с номером телефона' in output
+    assert 'строка 4: Пункты отправления и получения' in output
+    assert 'строка 5: Отправитель и получатель' in output
+    assert 'строка 6: category:' in output
+    assert ('строка 7: arrival_office: Почтовый пункт с индексом 000000 '
+            'не найден; weight: Вес письма') in output
+
+
+@pytest.mark.django_db
+def test_fill_db_missing_columns(tmp_path):
+    """Тест: файл без обязательных столбцов не импортируется."""
+    packages = write_csv(tmp_path, 'packages.csv', [
+        'sender_phone;recipient_phone;category;cost',
+        '+79160000001;+79160000002;1;100',
+    ])
+
+    output = fill_db('--packages', packages)
+
+    assert Package.objects.count() == 0
+    assert 'Нет столбцов: departure_index, arrival_index' in output
+
+
+@pytest.mark.django_db
+def test_fill_db_max_errors(tmp_path):
+    """Тест: в отчёт попадает не больше --max-errors ошибок."""
+    offices = write_csv(tmp_path, 'offices.csv', [
+        'address;postal_index', *[f'Пункт {i};{i}' for i in range(5)],
+    ])
+
+    output = fill_db('--post-offices', offices, '--max-errors', '2')
+
+    assert 'ошибок 5' in output
+    assert output.count('строка') == 2
+    assert 'и ещё 3 ошибок' in output
+
+
+@pytest.mark.django_db
+def test_import_batches(
+        client_1, client_2, post_office_1, post_office_2,
+):
+    """Тест: на каждую порцию — запросы внешних ключей и одна вставка
+    (executemany) в отдельной транзакции."""
+    lines = ['sender_phone;recipient_phone;departure_index;arrival_index;'
+             'category;cost']
+    lines += [f'{client_1.phone_number};{client_2.phone_number};'
+              f'{post_office_1.postal_index};{post_office_2.postal_index};'
+              f'1;{cost}' for cost in range(1, 31)]
+    progress = []
+
+    with CaptureQueriesContext(connection) as queries:
+        result = PackageImporter().run(io.StringIO('\n'.join(lines)),
+                                       batch_size=10,
+                                       progress=progress.append)
+
+    assert result.created == 30
+    assert result.error_count == 0
+    assert Package.objects.count() == 30
+    assert len(progress) == 3
+    inserts = [query for query in queries.captured_queries
+               if 'INSERT INTO "packages_package"' in query['sql']]
+    assert len(inserts) == 3
+    lookups = [query for query in queries.captured_queries
+               if 'FROM "packages_client"' in query['sql']]
+    assert len(lookups) == 3
+
+
+@pytest.mark.django_db
+def test_import_ambiguous_postal_index(client_1, client_2, post_office_1):
+    """Тест: индекс нескольких пунктов не связывает отправление."""
+    PostOffice.objects.create(address='Дубль', postal_index='000001')
+    PostOffice.objects.create(address='Дубль 2', postal_index='000001')
+    data = ('sender_phone;recipient_phone;departure_index;arrival_index;'
+            'category;weight\n'
+            f'{client_1.phone_number};{client_2.phone_number};'
+            f'{post_office_1.postal_index};000001;1;10\n')
+
+    result = LetterImporter().run(io.StringIO(data))
+
+    assert result.created == 0
+    assert result.errors[0].line == 2
+    assert 'не единственный' in result.errors[0].message
+
+
+@pytest.mark.django_db
+def test_import_error_updates_saved_batches(
+        settings, monkeypatch, client_1, client_2, post_office_1,
+        post_office_2,
+):
+    """Тест: при ошибке записи порции модель чтения обновляется
+    для уже сохранённых порций, ошибка не скрывается."""
+    settings.SHIPMENT_READ_MODEL = True
+    lines = ['sender_phone;recipient_phone;departure_index;arrival_index;'
+             'category;weight']
+    lines += [f'{client_1.phone_number};{client_2.phone_number};'
+              f'{post_office_1.postal_index};{post_office_2.postal_index};'
+              f'1;{weight}' for weight in range(1, 21)]
+    insert = LetterImporter.insert
+
+    def failing_insert(importer, rows):
+        if Letter.objects.exists():
+            raise DatabaseError('disk I/O error')
+        insert(importer, rows)
+
+    monkeypatch.setattr(LetterImporter, 'insert', failing_insert)
+
+    with pytest.raises(DatabaseError):
+        LetterImporter().run(io.StringIO('\n'.join(lines)), batch_size=10)
+
+    assert Letter.objects.count() == 10
+    assert LetterListing.objects.count() == 10
+
+
+@pytest.mark.django_db
+def test_fill_db_file_error(tmp_path):
+    """Тест: ошибка чтения файла выводится, импорт остальных
+    файлов продолжается."""
+    offices = write_csv(tmp_path, 'post_offices.csv', [
+        'address;postal_index', 'Адрес;123456'])
+
+    output = fill_db('--clients', str(tmp_path / 'missing.csv'),
+                     '--post-offices', offices)
+
+    assert 'при записи Client' in output
+    assert PostOffice.objects.count() == 1
@@ -0,0 +1,116 @@
+import io
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+from packages import search, snapshot
+from packages.models import Client, Letter, LetterListing, Package
+
+
+def table_rows():
+    return {model: list(model.objects.order_by('pk').values_list())
+            for model in snapshot.SNAPSHOT_MODELS}
+
+
+@pytest.fixture
+def dataset(create_shipments, client_1):
+    Client.objects.create(name='Без', lastname='Отчества',
+                          phone_number='+73333333333')
+    create_shipments(Letter, 5, category=2, weight=70000)
+    create_shipments(Package, 3, category=4, cost=10 ** 10)
+    return table_rows()
+
+
+def dump(**options):
+    file = io.BytesIO()
+    snapshot.dump(file, **options)
+    file.seek(0)
+    return file
+
+
+@pytest.mark.django_db
+def test_snapshot_round_trip(dataset):
+    """Тест: снимок восстанавливает все строки, включая первичные
+    ключи, NULL, версии и время изменения."""
+    file = dump(block_size=2)
+    snapshot.flush(connection)
+    assert not any(table_rows().values())
+
+    counts = snapshot.restore(file)
+
+    assert table_rows() == dataset
+    assert counts == {model: len(rows) for model, rows in dataset.items()}
+    assert Client.objects.get(phone_number='+73333333333').middle_name is None
+    assert search.search(Client, 'отчества', 10)
+
+
+@pytest.mark.django_db
+def test_snapshot_is_deterministic(dataset):
+    """Тест: повторная выгрузка восстановленных данных даёт тот же файл."""
+    data = dump().getvalue()
+    snapshot.restore(io.BytesIO(data), replace=True)
+
+    assert dump().getvalue() == data
+
+
+@pytest.mark.django_db
+def test_snapshot_rebuilds_read_model(settings, dataset):
+    """Тест: модель чтения перестраивается после загрузки."""
+    settings.SHIPMENT_READ_MODEL = True
+    file = dump()
+
+    snapshot.restore(file, replace=True)
+
+    assert LetterListing.objects.count() == len(dataset[Letter])
+
+
+@pytest.mark.django_db
+def test_snapshot_requires_empty_database(dataset):
+    """Тест: без replace снимок загружается только в пустую БД."""
+    with pytest.raises(snapshot.SnapshotError, match='БД не пуста'):
+        snapshot.restore(dump())
+
+    assert table_rows() == dataset
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('corrupt, message', [
+    (lambda data: data[:20] + bytes([data[20] ^ 1]) + data[21:],
+     'Контрольная сумма'),
+    (lambda data: data[:-10], 'Снимок обрезан'),
+    (lambda data: b'JSON' + data[4:], 'Контрольная сумма'),
+    (lambda data: b'', 'не является снимком'),
+])
+def test_snapshot_corrupted(dataset, corrupt, message):
+    """Тест: повреждённый снимок не изменяет БД."""
+    data = corrupt(dump().getvalue())
+
+    with pytest.raises(snapshot.SnapshotError, match=message):
+        snapshot.restore(io.BytesIO(data), replace=True)
+
+    assert table_rows() == dataset
+
+
+def test_pack_ints_uses_smallest_width():
+    """Тест: ширина столбца выбирается по диапазону значений."""
+    assert snapshot.pack_ints([0, 127])[:1] == b'b'
+    assert snapshot.pack_ints([-129, 1])[:1] == b'h'
+    assert snapshot.pack_ints([0, 255], snapshot.UINT_TYPECODES)[:1] == b'B'
+    assert snapshot.pack_ints([1 << 40])[:1] == b'q'
+    assert len(snapshot.pack_ints(range(1000))) == 1 + 2 * 1000
+
+
+@pytest.mark.django_db
+def test_snapshot_commands(dataset, tmp_path):
+    """Тест: команды выгрузки и загрузки снимка."""
+    path = str(tmp_path / 'data.snapshot')
+    out = io.StringIO()
+
+    call_command('dump_snapshot', path, stdout=out)
+    with pytest.raises(CommandError, match='БД не пуста'):
+        call_command('restore_snapshot', path, stdout=out)
+    call_command('restore_snapshot', path, '--flush', stdout=out)
+
+    assert table_rows() == dataset
+    assert f'Letter: {len(dataset[Letter])}' in out.getvalue()
@@ -0,0 +1,36 @@
+from benchmarks.bench_endpoints import find_regressions
+
+BASELINE = {
+    'letters.list': {'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 1,
+                     'peak_kb': 800},
+}
+
+
+def metrics(**changes):
+    return {'letters.list': {**BASELINE['letters.list'], **changes}}
+
+
+def test_no_regressions_within_threshold():
+    """Тест: рост в пределах порога или абсолютного допуска
+    не считается регрессией, новые сценарии пропускаются."""
+    results = {**metrics(p50_ms=12.0, p95_ms=24.0, peak_kb=860),
+               'letters.export': {'p50_ms': 1.0, 'p95_ms': 1.0,
+                                  'queries': 9, 'peak_kb': 1}}
+
+    assert find_regressions(results, BASELINE, 0.25) == []
+    assert find_regressions(metrics(p50_ms=0.4),
+                            {'letters.list': {**BASELINE['letters.list'],
+                                              'p50_ms': 0.2}}, 0.25) == []
+
+
+def test_regressions_flagged():
+    """Тест: рост задержки, памяти сверх порога и любой рост
+    количества запросов — регрессии."""
+    regressions = find_regressions(
+        metrics(p95_ms=30.0, queries=2, peak_kb=2000), BASELINE, 0.25)
+
+    assert regressions == [
+        'letters.list queries: 1 -> 2',
+        'letters.list p95_ms: 20.0 -> 30.0 (+50%)',
+        'letters.list peak_kb: 800 -> 2000 (+150%)',
+    ]
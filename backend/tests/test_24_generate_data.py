@@ -0,0 +1,151 @@
+import io
+from collections import Counter
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+
+from packages import generator, search, snapshot
+from packages.models import (Client, Letter, LetterListing, Package,
+                             PostOffice)
+
+
+def table_rows():
+    """Строки таблиц без времени изменения, которое зависит от момента
+    генерации."""
+    rows = {}
+    for model in snapshot.SNAPSHOT_MODELS:
+        fields = [field.attname for field in model._meta.concrete_fields
+                  if field.name != 'updated_at']
+        rows[model] = list(model.objects.order_by('pk').values_list(*fields))
+    return rows
+
+
+def generate(seed=0, **options):
+    data_generator = generator.DataGenerator(seed=seed, batch_size=70,
+                                             **options)
+    return data_generator.run(clients=50, offices=20, letters=300,
+                              packages=200)
+
+
+def index_names(model):
+    with connection.cursor() as cursor:
+        return {name for name, info in connection.introspection
+                .get_constraints(cursor, model._meta.db_table).items()
+                if info['index']}
+
+
+@pytest.mark.django_db
+def test_generated_data_is_valid():
+    """Тест: сгенерированные записи проходят проверку полей
+    и ограничения моделей."""
+    timings = generate()
+
+    assert {model: count for model, (count, _) in timings.items()} == {
+        Client: 50, PostOffice: 20, Letter: 300, Package: 200}
+    for model in snapshot.SNAPSHOT_MODELS:
+        for obj in model.objects.all():
+            obj.full_clean()
+    for model in (Letter, Package):
+        assert not model.objects.filter(sender=F('recipient')).exists()
+        assert not model.objects.filter(
+            departure_office=F('arrival_office')).exists()
+        assert set(model.objects.values_list('version', flat=True)) == {1}
+    assert PostOffice.objects.values('postal_index').distinct().count() == 20
+
+
+@pytest.mark.django_db
+def test_generation_is_deterministic():
+    """Тест: одинаковое зерно даёт одинаковые данные, другое — другие."""
+    generate(seed=1)
+    first = table_rows()
+    snapshot.flush(connection)
+    generate(seed=1)
+    second = table_rows()
+    snapshot.flush(connection)
+    generate(seed=2)
+
+    assert first == second
+    assert table_rows() != first
+
+
+@pytest.mark.django_db
+def test_skewed_references():
+    """Тест: при skew > 0 отправления сосредоточены у небольшой части
+    клиентов, при skew = 0 распределены равномерно."""
+    generate(skew=1.5)
+    senders = Counter(Letter.objects.values_list('sender_id', flat=True))
+    assert senders.most_common(1)[0][1] > 300 / 50 * 5
+
+    snapshot.flush(connection)
+    generate(skew=0)
+    senders = Counter(Letter.objects.values_list('sender_id', flat=True))
+    assert senders.most_common(1)[0][1] < 300 / 50 * 4
+
+
+def test_weighted_choice():
+    """Тест: частоты выборки соответствуют весам, медиана логнормальных
+    значений — exp(mu)."""
+    rnd = generator.random.Random(0)
+    # Веса 1, 1 и 4
+    choice = generator.WeightedChoice('abc', [1, 2, 6], rnd)
+    counts = Counter(choice.sample(60000))
+    assert counts.keys() == {'a', 'b', 'c'}
+    assert 9000 < counts['a'] < 11000
+    assert 9000 < counts['b'] < 11000
+
+    amounts = sorted(generator.lognormal_amounts(3.0, 1.0, rnd).sample(
+        10001))
+    assert amounts[0] >= 1
+    assert 18 <= amounts[5000] <= 23
+
+
+@pytest.mark.django_db
+def test_generation_restores_indexes_and_rebuilds(settings):
+    """Тест: индексы отправлений восстанавливаются после вставки,
+    поисковый индекс и модель чтения перестраиваются."""
+    settings.SHIPMENT_READ_MODEL = True
+    indexes = index_names(Letter)
+
+    generate()
+
+    assert index_names(Letter) == indexes
+    assert {index.name for index in Letter._meta.indexes} <= indexes
+    assert LetterListing.objects.count() == 300
+    client = Client.objects.get(pk=1)
+    assert search.search(Client, client.lastname, 100)
+    assert Letter.objects.create(
+        sender_id=1, recipient_id=2, departure_office_id=1,
+        arrival_office_id=2, category=1, weight=10).pk == 301
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('counts, message', [
+    ((1, 10), 'двух клиентов'),
+    ((10, generator.INDEX_RANGE + 1), 'почтовых пунктов'),
+])
+def test_generation_limits(counts, message):
+    """Тест: недопустимые объёмы отклоняются до вставки."""
+    with pytest.raises(ValueError, match=message):
+        generator.DataGenerator().run(*counts)
+
+    assert not Client.objects.exists()
+
+
+@pytest.mark.django_db
+def test_generate_data_command(create_shipments):
+    """Тест: команда требует пустую БД или --flush."""
+    create_shipments(Letter, 2, category=1, weight=10)
+    out = io.StringIO()
+    options = ['--clients', '10', '--offices', '5', '--letters', '40',
+               '--packages', '30']
+
+    with pytest.raises(CommandError, match='БД не пуста'):
+        call_command('generate_data', *options, stdout=out)
+    call_command('generate_data', *options, '--flush', stdout=out)
+
+    assert Client.objects.count() == 10
+    assert Letter.objects.count() == 40
+    assert Package.objects.count() == 30
+    assert 'Letter: 40 за' in out.getvalue()
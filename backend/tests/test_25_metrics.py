@@ -0,0 +1,164 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from rest_framework.status import HTTP_200_OK
+
+from letters_packages import metrics
+from packages.models import Client, Letter
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.registry.reset()
+    yield
+    metrics.registry.reset()
+
+
+def samples(api_client):
+    """Значения метрик ``/api/_metrics`` по строке имени с метками."""
+    response = api_client.get('/api/_metrics', HTTP_ACCEPT='text/plain')
+    assert response.status_code == HTTP_200_OK
+    assert response['Content-Type'] == metrics.CONTENT_TYPE
+    values = {}
+    for line in response.content.decode().splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            values[name] = float(value)
+    return values
+
+
+def test_histogram_buckets():
+    """Тест: корзины гистограммы накопленные, граница включается."""
+    histogram = metrics.Histogram((1, 5))
+    for value in (0, 1, 2, 7):
+        histogram.observe(value)
+
+    assert list(histogram.samples('x', 'a="b"')) == [
+        'x_bucket{a="b",le="1"} 2',
+        'x_bucket{a="b",le="5"} 3',
+        'x_bucket{a="b",le="+Inf"} 4',
+        'x_sum{a="b"} 10',
+        'x_count{a="b"} 4',
+    ]
+
+
+@pytest.mark.django_db
+def test_request_metrics(api_client, create_shipments):
+    """Тест: длительность, запросы к БД, размер и статус ответа
+    учитываются по маршруту и методу."""
+    create_shipments(Letter, 3, category=1, weight=10)
+    with CaptureQueriesContext(connection) as queries:
+        response = api_client.get('/api/letters/')
+    # Журнал запросов соединения очищается в начале каждого HTTP-запроса
+    query_count = len(queries)
+    api_client.get('/api/letters/0/')
+
+    values = samples(api_client)
+
+    labels = 'route="api:letters-list",method="GET"'
+    assert values[f'http_requests_total{{{labels},status="200"}}'] == 1
+    assert values[f'http_request_duration_seconds_count{{{labels}}}'] == 1
+    assert values[f'http_request_duration_seconds_sum{{{labels}}}'] > 0
+    assert values[f'http_request_db_queries_sum{{{labels}}}'] == (
+        query_count)
+    assert values[f'http_request_db_seconds_total{{{labels}}}'] > 0
+    assert values[f'http_response_size_bytes_sum{{{labels}}}'] == len(
+        response.content)
+    assert values['http_requests_total{route="api:letters-detail",'
+                  'method="GET",status="404"}'] == 1
+
+
+@pytest.mark.django_db
+def test_unmatched_route_and_method(api_client):
+    """Тест: неизвестные пути и методы не создают новых рядов."""
+    api_client.get('/unknown/')
+    api_client.generic('PROPFIND', '/api/letters/')
+
+    values = samples(api_client)
+
+    assert values['http_requests_total{route="unmatched",method="GET",'
+                  'status="404"}'] == 1
+    assert values['http_requests_total{route="api:letters-list",'
+                  'method="other",status="405"}'] == 1
+
+
+@pytest.mark.django_db
+def test_queries_outside_requests_are_not_recorded(api_client):
+    """Тест: запросы к БД вне HTTP-запроса не учитываются."""
+    Client.objects.count()
+    assert metrics._current.get() is None
+
+    values = samples(api_client)
+
+    assert not any(name.startswith('http_request_db') for name in values)
+
+
+@pytest.mark.django_db
+def test_cache_metrics(api_client, create_shipments):
+    """Тест: попадания и промахи кэшей справочников и ответов."""
+    create_shipments(Letter, 2, category=1, weight=10)
+    api_client.get('/api/letters/')
+    api_client.get('/api/letters/')
+
+    values = samples(api_client)
+
+    assert values['cache_hits_total{cache="responses"}'] == 1
+    assert values['cache_misses_total{cache="responses"}'] == 1
+    assert values['cache_entries{cache="responses"}'] == 1
+    assert values['cache_entries{cache="clients"}'] == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_view_queries_are_recorded(api_client, create_shipments):
+    """Тест: запросы к БД в потоке пула асинхронных представлений
+    учитываются в метриках запроса."""
+    create_shipments(Letter, 2, category=1, weight=10)
+    client = AsyncClient()
+
+    async def request():
+        return await client.get('/api/async/letters/')
+
+    response = async_to_sync(request)()
+
+    assert response.status_code == HTTP_200_OK
+    values = samples(api_client)
+    labels = 'route="api:async-letters-list",method="GET"'
+    assert values[f'http_request_db_queries_sum{{{labels}}}'] > 0
+
+
+@pytest.mark.django_db
+def test_streaming_response_metrics(api_client, create_shipments):
+    """Тест: потоковый ответ учитывается после чтения содержимого —
+    с запросами к БД при чтении и размером ответа."""
+    create_shipments(Letter, 5, category=1, weight=10)
+    labels = 'route="api:letters-export",method="GET"'
+
+    response = api_client.get('/api/letters/export/')
+    assert f'http_requests_total{{{labels},status="200"}}' not in samples(
+        api_client)
+    with CaptureQueriesContext(connection) as queries:
+        content = b''.join(response.streaming_content)
+    query_count = len(queries)
+
+    values = samples(api_client)
+    assert values[f'http_requests_total{{{labels},status="200"}}'] == 1
+    assert query_count > 0
+    assert values[f'http_request_db_queries_sum{{{labels}}}'] == (
+        query_count)
+    assert values[f'http_response_size_bytes_sum{{{labels}}}'] == len(
+        content)
+
+
+@pytest.mark.django_db
+def test_closed_streaming_response_metrics(api_client, create_shipments):
+    """Тест: закрытый без чтения потоковый ответ тоже учитывается."""
+    create_shipments(Letter, 2, category=1, weight=10)
+
+    api_client.get('/api/letters/export/').close()
+
+    values = samples(api_client)
+    labels = 'route="api:letters-export",method="GET"'
+    assert values[f'http_requests_total{{{labels},status="200"}}'] == 1
+    assert values[f'http_response_size_bytes_sum{{{labels}}}'] == 0
@@ -0,0 +1,129 @@
+import pstats
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from rest_framework.status import HTTP_200_OK
+
+from letters_packages import profiling
+from packages.models import Letter
+
+
+@pytest.fixture
+def profile_dir(settings, tmp_path):
+    settings.PROFILE_DIR = tmp_path
+    settings.PROFILE_TOKEN = 'secret'
+    return tmp_path
+
+
+def profiles(directory):
+    return sorted(path.name for path in directory.iterdir())
+
+
+@pytest.mark.django_db
+def test_profile_by_header(api_client, create_shipments, profile_dir):
+    """Тест: запрос с токеном в заголовке профилируется, профиль
+    открывается pstats, запросы к БД записываются."""
+    create_shipments(Letter, 2, category=1, weight=10)
+
+    response = api_client.get('/api/letters/', HTTP_X_PROFILE='secret')
+
+    assert response.status_code == HTTP_200_OK
+    name = response[profiling.PROFILE_ID_HEADER]
+    assert name.endswith('-GET-api.letters-list')
+    assert profiles(profile_dir) == [f'{name}.prof', f'{name}.sql']
+    stats = pstats.Stats(str(profile_dir / f'{name}.prof'))
+    assert any(filename.endswith('api/views.py') and function == 'list'
+               for filename, _, function in stats.stats)
+    sql = (profile_dir / f'{name}.sql').read_text(encoding='utf-8')
+    assert 'FROM "packages_letter"' in sql
+    assert sql.startswith('-- 3 запросов')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('path, headers, sample_rate', [
+    ('/api/letters/', {}, 0),
+    ('/api/letters/', {'HTTP_X_PROFILE': 'wrong'}, 0),
+    ('/api/letters/', {'HTTP_X_PROFILE': 'wrong'}, 1),
+    ('/api/letters/', {'HTTP_X_PROFILE': 's\xe9cret'}, 0),
+    ('/api/letters/', {'HTTP_X_PROFILE': 'секрет'}, 0),
+    ('/admin/login/', {'HTTP_X_PROFILE': 'secret'}, 1),
+])
+def test_request_is_not_profiled(api_client, settings, profile_dir, path,
+                                 headers, sample_rate):
+    """Тест: без верного токена и выборки, а также вне API запросы
+    не профилируются."""
+    settings.PROFILE_SAMPLE_RATE = sample_rate
+
+    response = api_client.get(path, **headers)
+
+    assert profiling.PROFILE_ID_HEADER not in response
+    assert profiles(profile_dir) == []
+
+
+@pytest.mark.django_db
+def test_profile_by_non_ascii_token(api_client, settings, profile_dir):
+    """Тест: токен вне ASCII сравнивается байтами UTF-8, как его
+    передаёт клиент (значение заголовка декодировано как latin-1)."""
+    settings.PROFILE_TOKEN = 'sécret'
+
+    response = api_client.get(
+        '/api/letters/',
+        HTTP_X_PROFILE='sécret'.encode().decode('latin-1'))
+
+    assert profiling.PROFILE_ID_HEADER in response
+
+
+@pytest.mark.django_db
+def test_header_profiling_disabled_without_token(api_client, settings,
+                                                 profile_dir):
+    """Тест: без PROFILE_TOKEN заголовок не включает профилирование."""
+    settings.PROFILE_TOKEN = None
+
+    api_client.get('/api/letters/', HTTP_X_PROFILE='')
+
+    assert profiles(profile_dir) == []
+
+
+@pytest.mark.django_db
+def test_sampled_profiles_rotate(api_client, settings, profile_dir):
+    """Тест: выборочное профилирование, хранятся последние профили."""
+    settings.PROFILE_SAMPLE_RATE = 1
+    settings.PROFILE_MAX_REQUESTS = 2
+
+    names = [api_client.get('/api/letters/')[profiling.PROFILE_ID_HEADER]
+             for _ in range(3)]
+
+    assert profiles(profile_dir) == [f'{name}{suffix}' for name in names[1:]
+                                     for suffix in ('.prof', '.sql')]
+
+
+@pytest.mark.django_db
+def test_profile_write_error(api_client, settings, tmp_path):
+    """Тест: ошибка записи профиля не ломает ответ."""
+    settings.PROFILE_DIR = tmp_path / 'file'
+    settings.PROFILE_DIR.write_text('')
+    settings.PROFILE_SAMPLE_RATE = 1
+
+    response = api_client.get('/api/letters/')
+
+    assert response.status_code == HTTP_200_OK
+    assert profiling.PROFILE_ID_HEADER not in response
+
+
+@pytest.mark.django_db(transaction=True)
+def test_profile_async_view(create_shipments, profile_dir):
+    """Тест: запросы к БД асинхронного представления попадают
+    в профиль."""
+    create_shipments(Letter, 2, category=1, weight=10)
+    client = AsyncClient()
+
+    async def request():
+        return await client.get('/api/async/letters/',
+                                **{'x-profile': 'secret'})
+
+    response = async_to_sync(request)()
+
+    name = response[profiling.PROFILE_ID_HEADER]
+    sql = (profile_dir / f'{name}.sql').read_text(encoding='utf-8')
+    assert 'FROM "packages_letter"' in sql
@@ -0,0 +1,140 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from letters_packages import slow_queries
+from packages.models import Client, Letter
+
+
+@pytest.fixture
+def slow_log(settings, tmp_path):
+    """Журнал всех запросов (порог 0 мс) во временном файле."""
+    settings.SLOW_QUERY_LOG = tmp_path / 'slow.log'
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+    return settings.SLOW_QUERY_LOG
+
+
+def entries(path):
+    return list(slow_queries.read_log(path))
+
+
+def test_normalize():
+    """Тест: значения заменяются, списки значений сворачиваются."""
+    assert slow_queries.normalize(
+        "SELECT  a FROM t1 WHERE b = 'it''s' AND c IN (%s, %s,%s)\n"
+        'LIMIT 21'
+    ) == "SELECT a FROM t1 WHERE b = ? AND c IN (...) LIMIT ?"
+    assert slow_queries.normalize(
+        'INSERT INTO "t" ("a", "b") VALUES (%s, %s), (%s, %s), (%s, %s)'
+    ) == 'INSERT INTO "t" ("a", "b") VALUES (...)'
+
+
+@pytest.mark.django_db
+def test_disabled_without_threshold(settings, slow_log):
+    """Тест: без порога запросы не замеряются."""
+    settings.SLOW_QUERY_THRESHOLD_MS = None
+
+    Client.objects.count()
+
+    assert not slow_log.exists()
+
+
+@pytest.mark.django_db
+def test_slow_query_entry(api_client, create_shipments, slow_log):
+    """Тест: запись содержит представление, нормализованный запрос
+    без значений параметров и план запроса."""
+    create_shipments(Letter, 2, category=1, weight=12345)
+    Letter.objects.filter(weight=12345).count()
+    api_client.get('/api/letters/')
+
+    logged = entries(slow_log)
+    view_entries = [entry for entry in logged
+                    if entry['source'] == 'LetterViewSet.list']
+    assert view_entries
+    assert '12345' not in slow_log.read_text(encoding='utf-8')
+    count_entry = next(entry for entry in logged
+                       if entry['sql'].startswith('SELECT COUNT(*)'))
+    assert count_entry['source'].startswith('tests/test_27_slow_queries.py:')
+    assert count_entry['plan'] and 'packages_letter' in (
+        count_entry['plan'][0])
+    assert count_entry['duration_ms'] >= 0
+    assert count_entry['database'] == 'default'
+
+
+@pytest.mark.django_db
+def test_same_fingerprint_for_different_values(slow_log):
+    """Тест: запросы с разными значениями попадают в одну группу."""
+    Client.objects.filter(pk__in=[1, 2, 3]).exists()
+    Client.objects.filter(pk__in=[4]).exists()
+
+    first, second = entries(slow_log)
+    assert first['fingerprint'] == second['fingerprint']
+
+
+@pytest.mark.django_db
+def test_explain_is_not_recorded(slow_log):
+    """Тест: EXPLAIN QUERY PLAN не выполняется как запрос соединения."""
+    with CaptureQueriesContext(connection) as queries:
+        Client.objects.count()
+
+    assert len(queries) == 1
+
+
+@pytest.mark.django_db
+def test_command_source(slow_log):
+    """Тест: источник запросов команды — имя команды."""
+    call_command('generate_data', '--clients', '5', '--offices', '3',
+                 '--letters', '10', '--packages', '10', stdout=io.StringIO())
+
+    assert {entry['source'] for entry in entries(slow_log)} == {
+        'command:generate_data'}
+
+
+@pytest.mark.django_db
+def test_log_rotation(settings, slow_log):
+    """Тест: переполненный журнал переносится в файл .1, сводка
+    читает оба файла."""
+    settings.SLOW_QUERY_LOG_MAX_BYTES = 1000
+    for _ in range(5):
+        Client.objects.count()
+
+    assert slow_log.with_name('slow.log.1').exists()
+    assert slow_log.stat().st_size <= 1000
+    assert 1 < len(entries(slow_log)) <= 5
+
+
+def test_summary_command(tmp_path):
+    """Тест: сводка группирует записи по fingerprint и сортирует
+    по суммарному времени."""
+    path = tmp_path / 'slow.log'
+    rows = [
+        ('a', 'SELECT a', 'LetterViewSet.list', 10, ['SCAN a']),
+        ('a', 'SELECT a', 'command:fill_db', 30, ['SCAN a']),
+        ('b', 'SELECT b', 'LetterViewSet.list', 35, []),
+    ]
+    with open(path, 'w', encoding='utf-8') as file:
+        for key, sql, source, duration, plan in rows:
+            file.write(json.dumps({
+                'fingerprint': key, 'sql': sql, 'source': source,
+                'duration_ms': duration, 'plan': plan}) + '\n')
+        file.write('не JSON\n')
+    out = io.StringIO()
+
+    call_command('slow_queries', '--path', str(path), stdout=out)
+
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith('#1 a: 2 раз, всего 40.0 мс, среднее 20.0')
+    assert lines[1] == ('  источники: LetterViewSet.list (1), '
+                        'command:fill_db (1)')
+    assert lines[3:5] == ['  план:', '    SCAN a']
+    assert lines[5].startswith('#2 b: 1 раз')
+
+    out = io.StringIO()
+    call_command('slow_queries', '--path', str(path), '--sort', 'max',
+                 '--limit', '1', stdout=out)
+    assert out.getvalue().startswith('#1 b:')
+    assert '... и ещё 1 групп' in out.getvalue()